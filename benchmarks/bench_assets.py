@@ -0,0 +1,189 @@
+"""Bytes on the wire and time to an interactive FIR form for the officer UI.
+
+Usage: python -m benchmarks.bench_assets [--bandwidth-kbps 256] [--rtt-ms 300] [--runs 5]
+
+Serves static/ over a real socket in three ways: the previous setup
+(StaticFiles plus FileResponse for /), the app's asset routes without a
+build, and the same routes with a fresh build in a temporary directory.
+A browser is emulated for each: it loads /, then the stylesheet and
+module script the page links, then the modules they import, then the FIR
+form template app.js fetches when the form is opened, always sending
+Accept-Encoding: gzip, deflate, br. The repeat visit reuses what the
+first one cached: responses marked immutable are not requested again,
+the rest are revalidated with If-None-Match (as a browser does with
+no-cache; without any Cache-Control it may instead revalidate on its own
+heuristic schedule).
+
+Each visit reports requests sent, bytes received (headers and body as
+sent, before decompression), the median measured wall time over the
+loopback interface, and a modelled time on a slow link: each level costs
+one round trip plus its bytes at the given bandwidth, since the requests
+of one level go out together.
+"""
+import argparse
+import asyncio
+import posixpath
+import re
+import socket
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+HTML_REFERENCE = re.compile(r"""(?:href|src)=["'](/static/[^"']+)["']""")
+JS_REFERENCE = re.compile(r"""(?:\bfrom\s*|\bimport\s*|\bfetch\()["']([^"']+\.(?:js|mjs|html|css|json))["']""")
+ACCEPT_ENCODING = "gzip, deflate, br"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _references(url: str, response) -> list[str]:
+    content_type = response.headers.get("content-type", "")
+    if "html" in content_type and url == "/":
+        return HTML_REFERENCE.findall(response.text)
+    if "javascript" in content_type:
+        return [
+            reference if reference.startswith("/") else posixpath.normpath(posixpath.join(posixpath.dirname(url), reference))
+            for reference in JS_REFERENCE.findall(response.text)
+        ]
+    return []
+
+
+def _wire_bytes(response) -> int:
+    status_line = len(f"HTTP/1.1 {response.status_code} {response.reason_phrase}\r\n")
+    headers = sum(len(name) + len(value) + 4 for name, value in response.headers.raw)
+    return status_line + headers + 2 + response.num_bytes_downloaded
+
+
+async def visit(client, cache: dict) -> dict:
+    """Loads the page level by level, filling `cache` with URL -> (ETag, Cache-Control, body)."""
+    levels, requests, total_bytes = [], 0, 0
+    urls, seen = ["/"], set()
+    start = time.perf_counter()
+    while urls:
+        level_bytes, sent, next_urls = 0, 0, []
+        responses = []
+        for url in urls:
+            seen.add(url)
+            cached = cache.get(url)
+            if cached and "immutable" in cached[1]:
+                responses.append((url, None))
+                continue
+            headers = {"Accept-Encoding": ACCEPT_ENCODING}
+            if cached and cached[0]:
+                headers["If-None-Match"] = cached[0]
+            responses.append((url, client.get(url, headers=headers)))
+        fetched = await asyncio.gather(*(request for _, request in responses if request is not None))
+        fetched = iter(fetched)
+        for url, request in responses:
+            if request is None:
+                body = cache[url][2]
+            else:
+                response = next(fetched)
+                sent += 1
+                level_bytes += _wire_bytes(response)
+                if response.status_code == 304:
+                    body = cache[url][2]
+                else:
+                    response.raise_for_status()
+                    body = response
+                    cache[url] = (response.headers.get("etag"), response.headers.get("cache-control", ""), response)
+            next_urls += [reference for reference in _references(url, body) if reference not in seen]
+        levels.append((sent, level_bytes))
+        requests += sent
+        total_bytes += level_bytes
+        urls = list(dict.fromkeys(next_urls))
+    return {"wall": time.perf_counter() - start, "requests": requests, "bytes": total_bytes, "levels": levels}
+
+
+def modelled_seconds(levels: list, bandwidth_kbps: float, rtt_ms: float) -> float:
+    return sum(rtt_ms / 1000 + level_bytes * 8 / (bandwidth_kbps * 1000) for sent, level_bytes in levels if sent)
+
+
+def previous_app(static_dir: Path):
+    from fastapi import FastAPI
+    from fastapi.responses import FileResponse
+    from fastapi.staticfiles import StaticFiles
+
+    app = FastAPI()
+
+    @app.get("/")
+    async def root():
+        return FileResponse(static_dir / "index.html")
+
+    app.mount("/static", StaticFiles(directory=static_dir), name="static")
+    return app
+
+
+def assets_app(static_dir: Path, build_dir: Path | None):
+    from fastapi import FastAPI
+
+    from fir_agent.assets import StaticAssets
+    from main import router
+
+    app = FastAPI()
+    app.state.assets = StaticAssets(static_dir, build_dir)
+    app.include_router(router)
+    return app
+
+
+async def measure(app, runs: int) -> dict:
+    import httpx
+    import uvicorn
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    results = {"first": [], "repeat": []}
+    try:
+        for _ in range(runs):
+            cache = {}
+            for kind in ("first", "repeat"):
+                # A fresh client per visit: no connection is reused from the previous one.
+                async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+                    results[kind].append(await visit(client, cache))
+    finally:
+        server.should_exit = True
+        await server_task
+    return results
+
+
+async def run(args):
+    from fir_agent.assets import STATIC_DIR, build
+
+    with tempfile.TemporaryDirectory() as tmp:
+        build_dir = Path(tmp) / "static"
+        build(STATIC_DIR, build_dir)
+        configurations = {
+            "StaticFiles (previous)": previous_app(STATIC_DIR),
+            "assets, no build": assets_app(STATIC_DIR, None),
+            "assets, built": assets_app(STATIC_DIR, build_dir),
+        }
+        print(f"{'configuration':<24} {'visit':<7} {'requests':>8} {'bytes':>9} {'wall':>9} {'modelled':>10}")
+        for name, app in configurations.items():
+            results = await measure(app, args.runs)
+            for kind, visits in results.items():
+                last = visits[-1]
+                wall = statistics.median(v["wall"] for v in visits)
+                modelled = modelled_seconds(last["levels"], args.bandwidth_kbps, args.rtt_ms)
+                print(f"{name:<24} {kind:<7} {last['requests']:>8} {last['bytes']:>9} "
+                      f"{wall * 1000:>6.1f} ms {modelled * 1000:>7.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bandwidth-kbps", type=float, default=256, help="modelled link bandwidth")
+    parser.add_argument("--rtt-ms", type=float, default=300, help="modelled round-trip time")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Measures repeat uploads against the content cache.
+
+Usage: python -m benchmarks.bench_cache [--pages 400] [--latency 0.5]
+
+Boots benchmarks.fake_gemini, runs the FastAPI app in-process with a fresh
+cache file and sends the same PDF to /upload and the same recording to
+/transcribe_audio three times: cold, from the memory tier, and from the disk
+tier after the process-local cache is replaced (as after a restart).
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_chat import _free_port
+from benchmarks.bench_parse import write_pdf
+
+
+async def _upload(client, data: bytes) -> float:
+    start = time.perf_counter()
+    resp = await client.post("/upload/bench", files={"file": ("case.pdf", data, "application/pdf")})
+    resp.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def _transcribe(client, data: bytes) -> float:
+    start = time.perf_counter()
+    resp = await client.post("/transcribe_audio", files={"audio_file": ("interview.webm", data, "audio/webm")})
+    resp.raise_for_status()
+    job = resp.json()
+    while job["status"] not in ("done", "failed"):
+        await asyncio.sleep(0.01)
+        job = (await client.get(f"/transcribe_audio/{job['job_id']}")).json()
+    if job["status"] != "done":
+        raise RuntimeError(job["error"])
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    import httpx
+    import uvicorn
+
+    tmp = tempfile.TemporaryDirectory()
+    port = _free_port()
+    os.environ["FAKE_GEMINI_LATENCY"] = str(args.latency)
+    os.environ["GEMINI_BASE_URL"] = f"http://127.0.0.1:{port}"
+    os.environ["FIR_CACHE_DB"] = str(Path(tmp.name) / "cache.db")
+    os.environ.setdefault("GOOGLE_API_KEY", "fake-key")
+    os.environ.setdefault("FIR_STORAGE_BACKEND", "fs")
+
+    from benchmarks import fake_gemini
+    server = uvicorn.Server(uvicorn.Config(fake_gemini.app, port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    from fir_agent.cache import ContentCache
+    from main import create_app
+
+    app = create_app()
+    pdf_path = Path(tmp.name) / "case.pdf"
+    write_pdf(pdf_path, args.pages)
+    pdf = pdf_path.read_bytes()
+    audio = os.urandom(256 * 1024)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            print(f"{args.pages}-page PDF ({len(pdf) // 1024} KiB), model latency {args.latency:.2f}s")
+            print(f"{'':>8} {'upload':>10} {'transcribe':>12}")
+            for label in ("cold", "memory", "disk"):
+                if label == "disk":
+                    # A new cache and service drop everything held in this process.
+                    app.state.cache = ContentCache.from_env()
+                    app.state.transcriptions = type(app.state.transcriptions)(
+                        app.state.gemini, cache=app.state.cache
+                    )
+                upload = await _upload(client, pdf)
+                transcribe = await _transcribe(client, audio)
+                print(f"{label:>8} {upload * 1000:>8.1f}ms {transcribe * 1000:>10.1f}ms")
+            stats = app.state.cache.stats()
+            print(f"hit rate on the final cache: {stats['hit_rate']:.2f}")
+
+    server.should_exit = True
+    await server_task
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
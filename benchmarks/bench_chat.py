@@ -0,0 +1,77 @@
+"""Measures /chat throughput against the local fake Gemini server.
+
+Usage: python -m benchmarks.bench_chat [--latency 0.5] [--requests 64]
+
+Boots benchmarks.fake_gemini on a local port, runs the FastAPI app in-process
+and fires /chat requests at increasing concurrency. With non-blocking model
+calls, throughput should scale roughly linearly with concurrent users until
+GEMINI_MAX_CONCURRENCY is reached.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import time
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _run_level(client, concurrency: int, total: int) -> float:
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def user():
+        while not queue.empty():
+            i = queue.get_nowait()
+            resp = await client.post(f"/chat/bench-{i}", json={"message": f"Complaint number {i}"})
+            resp.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return total / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--levels", default="1,2,4,8,16,32")
+    args = parser.parse_args()
+
+    import httpx
+    import uvicorn
+
+    port = _free_port()
+    os.environ["FAKE_GEMINI_LATENCY"] = str(args.latency)
+    os.environ["GEMINI_BASE_URL"] = f"http://127.0.0.1:{port}"
+    os.environ.setdefault("GOOGLE_API_KEY", "fake-key")
+
+    from benchmarks import fake_gemini
+    server = uvicorn.Server(uvicorn.Config(fake_gemini.app, port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    from main import create_app
+
+    app = create_app()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            print(f"model latency {args.latency:.2f}s, {args.requests} requests per level")
+            print(f"{'users':>6} {'req/s':>8}")
+            for level in [int(x) for x in args.levels.split(",")]:
+                rps = await _run_level(client, level, args.requests)
+                print(f"{level:>6} {rps:>8.2f}")
+
+    server.should_exit = True
+    await server_task
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
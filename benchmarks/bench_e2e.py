@@ -0,0 +1,387 @@
+"""End-to-end load benchmark: mixed officer sessions against local fakes.
+
+Usage: python -m benchmarks.bench_e2e [--officers 8] [--sessions 32] [--latency 0.3]
+                                      [--live-ratio 0.25] [--save-baseline] [--max-regression 0.25]
+
+Starts benchmarks.fake_gemini in a subprocess (so the fake never competes
+with the app for the event loop), stores FIR PDFs with the filesystem
+storage backend in a temporary directory, and serves the FastAPI app with
+uvicorn in this process. Each simulated officer loads the page, sometimes
+uploads a complaint document and an audio recording, holds a few chat turns
+(plain or streamed), sometimes runs a live interview over the WebSocket
+against the scripted FakeLiveBackend, then submits the FIR. The sequence is
+seeded, so runs with the same arguments issue the same requests.
+
+Reports p50/p95/p99 latency, throughput and the largest resident set size
+seen when a request finished, per endpoint. The results are compared with
+the baseline in benchmarks/baselines/ (written by --save-baseline), and
+with --max-regression the run exits with status 1 if any endpoint's p95 or
+throughput regressed by more than that fraction. Endpoints with failed
+requests are left out of a saved baseline and listed in its meta, as is the
+outbox drain time when submissions failed (no PDFs were queued), so a host
+without WeasyPrint's system libraries records no /submit_fir figures rather
+than the time it takes to fail.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+
+MESSAGES = [
+    "I want to report a theft of my mobile phone",
+    "It happened on 12 March 2024 at around 9:30 pm near the Cyber City metro station",
+    "My name is Ramesh Kumar, I live at 14 Sector 21, Gurugram",
+    "The phone is a black Samsung Galaxy worth about 18000 rupees",
+    "Two men on a motorcycle snatched it and drove towards the highway",
+    "Sorry, the time was 10:15 pm, not 9:30",
+    "My phone number is 9876543210",
+    "Police station Cyber City, district Gurugram",
+]
+COMPLAINT = (
+    "To the SHO, Police Station Cyber City, District Gurugram.\n"
+    "Subject: Complaint regarding theft of mobile phone.\n"
+    "Sir, I, {name}, resident of {address}, wish to report that on 12/03/2024 at about "
+    "21:30 hrs two unknown persons on a motorcycle snatched my mobile phone near the "
+    "Cyber City metro station. Reference {ref}.\n"
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_mb() -> float:
+    """Current resident set size of this process in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        # Peak rather than current RSS; ru_maxrss is bytes on macOS, KB elsewhere.
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+
+
+def _docx(text: str) -> bytes:
+    import docx
+
+    document = docx.Document()
+    for line in text.splitlines():
+        document.add_paragraph(line)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {}
+        self.rss: dict[str, float] = {}
+        self.errors: dict[str, int] = {}
+
+    def add(self, name: str, seconds: float, ok: bool = True):
+        self.samples.setdefault(name, []).append(seconds)
+        self.rss[name] = max(self.rss.get(name, 0.0), _rss_mb())
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    async def timed(self, name: str, request):
+        start = time.perf_counter()
+        resp = await request
+        self.add(name, time.perf_counter() - start, resp.status_code < 400)
+        return resp
+
+    def summary(self, wall: float) -> dict:
+        results = {}
+        for name, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            if len(ordered) > 1:
+                cuts = statistics.quantiles(ordered, n=100, method="inclusive")
+                p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+            else:
+                p50 = p95 = p99 = ordered[0]
+            results[name] = {
+                "count": len(ordered),
+                "errors": self.errors.get(name, 0),
+                "p50_ms": round(p50 * 1000, 1),
+                "p95_ms": round(p95 * 1000, 1),
+                "p99_ms": round(p99 * 1000, 1),
+                "rps": round(len(ordered) / wall, 2),
+                "rss_mb": round(self.rss[name], 1),
+            }
+        return results
+
+
+async def officer_session(client, recorder: Recorder, rng: random.Random, index: int, document: bytes, args):
+    user_id = f"officer-{index}"
+    await recorder.timed("GET /", client.get("/"))
+
+    if rng.random() < args.upload_ratio:
+        await recorder.timed(
+            "POST /upload", client.post(f"/upload/{user_id}", files={"file": (f"complaint-{index}.docx", document)})
+        )
+
+    if rng.random() < args.audio_ratio:
+        # Distinct bytes per session, so every recording is a cache miss.
+        audio = rng.randbytes(args.audio_kb * 1024)
+        start = time.perf_counter()
+        resp = await recorder.timed(
+            "POST /transcribe_audio",
+            client.post("/transcribe_audio", files={"audio_file": (f"rec-{index}.webm", audio, "audio/webm")}),
+        )
+        status = resp.json().get("status")
+        if resp.status_code == 200 and status not in ("done", "failed"):
+            async with client.stream("GET", f"/transcribe_audio/{resp.json()['job_id']}/events") as events:
+                async for line in events.aiter_lines():
+                    if line.startswith("data:"):
+                        status = json.loads(line[5:]).get("status")
+                        if status in ("done", "failed"):
+                            break
+        recorder.add("transcription (until done)", time.perf_counter() - start, status == "done")
+
+    for turn in range(max(1, args.turns + rng.randint(-1, 1))):
+        message = {"message": rng.choice(MESSAGES)}
+        if rng.random() < args.stream_ratio:
+            start = time.perf_counter()
+            first = None
+            async with client.stream("POST", f"/chat_stream/{user_id}", json=message) as resp:
+                async for line in resp.aiter_lines():
+                    if first is None and line.startswith("data:"):
+                        first = time.perf_counter() - start
+            ok = resp.status_code < 400
+            recorder.add("POST /chat_stream", time.perf_counter() - start, ok)
+            recorder.add("POST /chat_stream (first event)", first if first is not None else 0.0, ok)
+        else:
+            await recorder.timed("POST /chat", client.post(f"/chat/{user_id}", json=message))
+
+    if rng.random() < args.live_ratio:
+        await live_interview(client, recorder, user_id, args.live_seconds)
+
+    info = (await client.get(f"/get_extracted_info/{user_id}")).json()
+    await recorder.timed("POST /submit_fir", client.post("/submit_fir", json=info))
+
+
+async def live_interview(client, recorder: Recorder, user_id: str, seconds: float):
+    """Streams `seconds` of silent PCM in 100 ms frames, then stops and waits for the server to finish."""
+    import websockets
+
+    url = f"ws://{client.base_url.host}:{client.base_url.port}/ws/live/{user_id}"
+    start = time.perf_counter()
+    ok = False
+    async with websockets.connect(url) as ws:
+        for _ in range(int(seconds * 10)):
+            await ws.send(bytes(3200))
+        await ws.send(json.dumps({"type": "stop"}))
+        stopped = time.perf_counter()
+        async for message in ws:
+            kind = json.loads(message)["type"]
+            if kind in ("done", "error"):
+                ok = kind == "done"
+                break
+    recorder.add("WS /ws/live (stop to done)", time.perf_counter() - stopped, ok)
+    recorder.add("WS /ws/live (whole interview)", time.perf_counter() - start, ok)
+
+
+async def run(args) -> tuple[dict, dict]:
+    import httpx
+    import uvicorn
+
+    from main import create_app
+
+    app = create_app()
+    rng = random.Random(args.seed)
+    plans = [random.Random(rng.random()) for _ in range(args.sessions)]
+    # Built up front: python-docx would otherwise block the loop the app runs on.
+    documents = [
+        _docx(COMPLAINT.format(name="Ramesh Kumar", address=f"{index} Sector 21, Gurugram", ref=index))
+        for index in range(args.sessions)
+    ]
+    recorder = Recorder()
+    pending = asyncio.Queue()
+    for index in range(args.sessions):
+        pending.put_nowait(index)
+
+    async def officer(client):
+        while not pending.empty():
+            index = pending.get_nowait()
+            await officer_session(client, recorder, plans[index], index, documents[index], args)
+
+    # Served over a real socket: httpx's ASGI transport buffers whole
+    # responses, which would hide streaming time to first event.
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    # Measure the warm app: Gemini client, schema and worker pools load in the background.
+    await app.state.readiness.wait()
+    peak_rss = _rss_mb()
+    limits = httpx.Limits(max_connections=args.officers * 2)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None, limits=limits) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(officer(client) for _ in range(args.officers)))
+            wall = time.perf_counter() - start
+            drain_start = time.perf_counter()
+            while (await client.get("/outbox/stats")).json()["pending"]:
+                await asyncio.sleep(0.05)
+            drain = time.perf_counter() - drain_start
+        peak_rss = max(peak_rss, *recorder.rss.values())
+    finally:
+        server.should_exit = True
+        await server_task
+
+    total = sum(len(s) for s in recorder.samples.values())
+    run_info = {
+        "wall_s": round(wall, 2),
+        "outbox_drain_s": round(drain, 2),
+        "peak_rss_mb": round(peak_rss, 1),
+        "requests": total,
+    }
+    return recorder.summary(wall), run_info
+
+
+def _settings(args) -> dict:
+    return {k: v for k, v in vars(args).items() if k not in ("baseline", "save_baseline", "max_regression")}
+
+
+def compare(results: dict, baseline: dict, settings: dict, max_regression: float | None) -> bool:
+    """Prints the change against the baseline; False if a regression exceeds the limit."""
+    print(f"\nvs baseline ({baseline['meta']['recorded']}, {baseline['meta']['python']})")
+    if baseline["meta"]["settings"] != settings:
+        print("warning: the baseline was recorded with different settings:", baseline["meta"]["settings"])
+    print(f"{'endpoint':<34} {'p95':>9} {'req/s':>9} {'rss':>9}")
+    ok = True
+    for name, row in results.items():
+        old = baseline["endpoints"].get(name)
+        if old is None:
+            reason = baseline["meta"].get("excluded", {}).get(name)
+            print(f"{name:<34} {'not in baseline: ' + reason if reason else 'new':>9}")
+            continue
+        p95 = row["p95_ms"] / old["p95_ms"] - 1 if old["p95_ms"] else 0.0
+        rps = row["rps"] / old["rps"] - 1 if old["rps"] else 0.0
+        rss = row["rss_mb"] / old["rss_mb"] - 1 if old["rss_mb"] else 0.0
+        flag = ""
+        if max_regression is not None and (p95 > max_regression or rps < -max_regression):
+            flag, ok = "  REGRESSION", False
+        print(f"{name:<34} {p95:>+9.1%} {rps:>+9.1%} {rss:>+9.1%}{flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--officers", type=int, default=8, help="concurrent officer sessions")
+    parser.add_argument("--sessions", type=int, default=32, help="total sessions to run")
+    parser.add_argument("--turns", type=int, default=4, help="chat turns per session (+/- 1)")
+    parser.add_argument("--stream-ratio", type=float, default=0.5, help="share of turns sent to /chat_stream")
+    parser.add_argument("--upload-ratio", type=float, default=0.5, help="share of sessions uploading a document")
+    parser.add_argument("--audio-ratio", type=float, default=0.3, help="share of sessions transcribing audio")
+    parser.add_argument("--audio-kb", type=int, default=256)
+    parser.add_argument("--live-ratio", type=float, default=0.25, help="share of sessions running a live interview")
+    parser.add_argument("--live-seconds", type=float, default=4.0, help="audio streamed per live interview")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake model latency in seconds")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="fake delay between streamed chunks")
+    parser.add_argument("--file-processing", type=float, default=0.5, help="fake audio processing time")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", default="e2e", help="baseline name under benchmarks/baselines/")
+    parser.add_argument("--save-baseline", action="store_true", help="record this run as the baseline")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="exit 1 if p95 or throughput is worse than the baseline by this fraction")
+    args = parser.parse_args()
+
+    port = _free_port()
+    fake_env = {
+        **os.environ,
+        "FAKE_GEMINI_LATENCY": str(args.latency),
+        "FAKE_GEMINI_TOKEN_DELAY": str(args.token_delay),
+        "FAKE_GEMINI_FILE_PROCESSING": str(args.file_processing),
+    }
+    fake = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.fake_gemini:app", "--port", str(port), "--log-level", "warning"],
+        env=fake_env,
+    )
+    workdir = tempfile.TemporaryDirectory(prefix="fir-bench-")
+    try:
+        deadline = time.monotonic() + 15
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline or fake.poll() is not None:
+                    raise SystemExit("fake Gemini server did not start")
+                time.sleep(0.1)
+
+        root = Path(workdir.name)
+        os.environ.update({
+            "GEMINI_BASE_URL": f"http://127.0.0.1:{port}",
+            "GOOGLE_API_KEY": os.getenv("GOOGLE_API_KEY", "fake-key"),
+            "FIR_STORAGE_BACKEND": "fs",
+            "FIR_STORAGE_FS_ROOT": str(root / "gcs"),
+            "FIR_OUTBOX_DIR": str(root / "outbox"),
+            "FIR_CACHE_DB": str(root / "cache.db"),
+            "FIR_SESSION_DB": str(root / "sessions.db"),
+            "FIR_STORE_DB": str(root / "firs.db"),
+            "FIR_LOG_LEVEL": os.getenv("FIR_LOG_LEVEL", "WARNING"),
+            "FIR_LIVE_BACKEND": "fake",
+        })
+        results, run_info = asyncio.run(run(args))
+    finally:
+        fake.terminate()
+        fake.wait()
+        workdir.cleanup()
+
+    print(f"{args.sessions} sessions, {args.officers} concurrent, model latency {args.latency:g}s, "
+          f"{run_info['requests']} requests in {run_info['wall_s']}s "
+          f"(outbox drained {run_info['outbox_drain_s']}s later), peak RSS {run_info['peak_rss_mb']} MB")
+    print(f"{'endpoint':<34} {'n':>5} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>7} {'rss MB':>7}")
+    for name, row in results.items():
+        print(f"{name:<34} {row['count']:>5} {row['errors']:>4} {row['p50_ms']:>8} {row['p95_ms']:>8} "
+              f"{row['p99_ms']:>8} {row['rps']:>7} {row['rss_mb']:>7}")
+
+    path = BASELINE_DIR / f"{args.baseline}.json"
+    ok = True
+    if path.exists() and not args.save_baseline:
+        ok = compare(results, json.loads(path.read_text()), _settings(args), args.max_regression)
+    if args.save_baseline:
+        excluded = {
+            name: f"{row['errors']} of {row['count']} requests failed"
+            for name, row in results.items() if row["errors"]
+        }
+        if "POST /submit_fir" in excluded:
+            run_info.pop("outbox_drain_s")
+            excluded["outbox_drain_s"] = "submissions failed, so the outbox was not exercised"
+        meta = {
+            "recorded": time.strftime("%Y-%m-%d"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "settings": _settings(args),
+            **run_info,
+            "excluded": excluded,
+        }
+        endpoints = {name: row for name, row in results.items() if name not in excluded}
+        BASELINE_DIR.mkdir(exist_ok=True)
+        path.write_text(json.dumps({"meta": meta, "endpoints": endpoints}, indent=2) + "\n")
+        print(f"baseline written to {path}")
+        for name, reason in excluded.items():
+            print(f"warning: {name} left out of the baseline: {reason}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Scores the fast-path extractor on a synthetic Hindi/English corpus.
+
+Usage: python -m benchmarks.bench_extract [--messages 2000] [--seed 7]
+
+Messages are generated from English, Hindi and Hinglish phrasings of FIR
+numbers, dates, police stations, districts and act/section references, half
+of them with a free-text sentence appended that only the model can handle;
+some of those sentences mention places, numbers and dates that must not be
+taken as fields, and some are negative answers ("no") that reject them.
+
+Reports per-field precision and recall, how often the model call was skipped
+(and whether it should have been), and extraction latency.
+"""
+import argparse
+import random
+import statistics
+import time
+from collections import Counter
+
+from fir_agent.extraction import FastPathExtractor
+
+STATIONS = [("Cyber City", "साइबर सिटी", "Gurugram"), ("Sushant Lok", "सुशांत लोक", "Gurugram"),
+            ("Sohna", "सोहना", "Gurugram"), ("Ballabgarh", "बल्लभगढ़", "Faridabad")]
+DISTRICTS = [("Gurugram", "गुरुग्राम"), ("Faridabad", "फरीदाबाद"), ("Rohtak", "रोहतक"), ("Hisar", "हिसार")]
+MONTHS_EN = ["January", "February", "March", "April", "May", "June", "July", "August", "September",
+             "October", "November", "December"]
+MONTHS_HI = ["जनवरी", "फरवरी", "मार्च", "अप्रैल", "मई", "जून", "जुलाई", "अगस्त", "सितंबर", "अक्टूबर",
+             "नवंबर", "दिसंबर"]
+ACTS = [("IPC", "भादवि", ["379", "420", "406", "506", "323"]), ("BNS", "बीएनएस", ["303(2)", "318(4)", "115(2)"]),
+        ("IT Act", "आईटी एक्ट", ["66C", "66D", "67"])]
+NARRATIVE = [
+    "The complainant says his motorcycle was stolen from outside the gym.",
+    "Shikayatkarta ne bataya ki unka purse bazaar mein chheena gaya.",
+    "शिकायतकर्ता ने बताया कि उसके खाते से पैसे निकाल लिए गए।",
+    "Accused fled towards the highway after the incident.",
+    # Distractors: places, numbers and dates that are not FIR fields.
+    "Main Sector 40 Gurugram mein rehta hoon, mera phone 9876543210 hai.",
+    "He paid 420 rupees for the phone in 2023 and was called to the Sohna market.",
+    "The accused was last seen near Cyber City metro station on 3rd March.",
+    # Negative answers: the fields before them are being rejected, not confirmed.
+    "no",
+    "no, not this one",
+    "नहीं, यह गलत है",
+]
+HINDI_DIGITS = str.maketrans("0123456789", "०१२३४५६७८९")
+
+
+def _date(rng, lang):
+    day, month, year = rng.randint(1, 28), rng.randint(1, 12), rng.choice([2024, 2025])
+    iso = f"{year}-{month:02d}-{day:02d}"
+    style = rng.randrange(3)
+    if style == 0:
+        sep = rng.choice("-/.")
+        text = f"{day:02d}{sep}{month:02d}{sep}{year}"
+    elif style == 1:
+        text = f"{day} {(MONTHS_HI if lang == 'hi' else MONTHS_EN)[month - 1]} {year}"
+    else:
+        text = f"{day}/{month}/{year}"
+    return text, iso
+
+
+def make_message(rng) -> tuple[str, dict, bool]:
+    lang = rng.choice(["en", "hi", "mixed"])
+    parts, truth = [], {}
+    if rng.random() < 0.7:
+        no, year = str(rng.randint(1, 999)), rng.choice(["2024", "2025"])
+        date_text, iso = _date(rng, lang)
+        truth.update(firNo=no, firYear=year, firDate=iso)
+        if lang == "hi":
+            digits = rng.random() < 0.5
+            no_text = f"{no}/{year}".translate(HINDI_DIGITS) if digits else f"{no}/{year}"
+            parts.append(f"एफआईआर नंबर {no_text} दिनांक {date_text}")
+        else:
+            parts.append(rng.choice([f"FIR no {no}/{year} dated {date_text}",
+                                     f"F.I.R. No. {no} of {year} dt. {date_text}"]))
+    if rng.random() < 0.6:
+        en, hi, district = rng.choice(STATIONS)
+        truth.update(policeStation=en, district=district)
+        parts.append({"en": f"PS {en}", "hi": f"थाना {hi}", "mixed": f"{en} police station"}[lang])
+    elif rng.random() < 0.5:
+        en, hi = rng.choice(DISTRICTS)
+        truth["district"] = en
+        parts.append({"en": f"district {en}", "hi": f"जिला {hi}", "mixed": f"{en} district"}[lang])
+    if rng.random() < 0.5:
+        act, act_hi, sections = rng.choice(ACTS)
+        picked = rng.sample(sections, rng.randint(1, 2))
+        truth["acts"] = [{"act": act, "sections": ", ".join(picked)}]
+        parts.append({"en": f"u/s {', '.join(picked)} {act}", "hi": f"धारा {', '.join(picked)} {act_hi}",
+                      "mixed": f"{act} section {'/'.join(picked)}"}[lang])
+    if not parts:
+        date_text, iso = _date(rng, lang)
+        truth["offenceDateFrom"] = iso
+        parts.append(f"incident date {date_text}" if lang != "hi" else f"घटना दिनांक {date_text}")
+    structured_only = rng.random() < 0.5
+    if not structured_only:
+        parts.append(rng.choice(NARRATIVE))
+    return ", ".join(parts), truth, structured_only
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [make_message(rng) for _ in range(args.messages)]
+    extractor = FastPathExtractor()
+    extractor.extract("warm up")
+
+    tp, fp, fn = Counter(), Counter(), Counter()
+    skips = Counter()
+    latencies = []
+    for text, truth, structured_only in corpus:
+        start = time.perf_counter()
+        result = extractor.extract(text)
+        latencies.append((time.perf_counter() - start) * 1e6)
+        for key in set(truth) | set(result.fields):
+            if key in result.fields and result.fields[key] == truth.get(key):
+                tp[key] += 1
+            else:
+                if key in result.fields:
+                    fp[key] += 1
+                if key in truth:
+                    fn[key] += 1
+        skips[(structured_only, result.complete)] += 1
+
+    print(f"{args.messages} messages")
+    print(f"{'field':<16} {'precision':>9} {'recall':>7}")
+    for key in sorted(set(tp) | set(fp) | set(fn)):
+        precision = tp[key] / ((tp[key] + fp[key]) or 1)
+        recall = tp[key] / ((tp[key] + fn[key]) or 1)
+        print(f"{key:<16} {precision:>9.3f} {recall:>7.3f}")
+    structured = skips[(True, True)] + skips[(True, False)]
+    free_text = skips[(False, True)] + skips[(False, False)]
+    print(f"model skipped for {skips[(True, True)]}/{structured} structured-only messages, "
+          f"wrongly skipped for {skips[(False, True)]}/{free_text} messages with free text")
+    latencies.sort()
+    print(f"latency p50 {statistics.median(latencies):.0f} us, "
+          f"p99 {latencies[int(len(latencies) * 0.99)]:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Tracks estimated prompt size over a long chat session, old prompts versus HistoryManager.
+
+Usage: python -m benchmarks.bench_history [--turns 50] [--document-pages 40]
+
+Replays a scripted session in which the FIR data gains a field every turn and
+a multi-page document is uploaded on turn 3. "old" rebuilds prompts the way
+/chat used to: the last 10 history entries, each user entry carrying a full
+copy of the FIR data, and the document text sent as a chat message. "managed"
+goes through HistoryManager with its truncating summarizer, so no model is
+needed.
+"""
+import argparse
+import asyncio
+import json
+
+from fir_agent.cache import ContentCache, content_key
+from fir_agent.history import HistoryManager, estimate_tokens
+from fir_agent.sessions import InMemorySessionStore
+
+USER_TURN = ("Turn {n}: the complainant adds that the accused was seen near the market around "
+             "{n} pm and that a neighbour, witness number {n}, can confirm the description.")
+ASSISTANT_TURN = ("Noted. I have recorded the details from turn {n}. Could you also tell me whether "
+                  "anything else was taken, the approximate value, and whether the witness gave a "
+                  "written statement at the police station? " * 2)
+DOCUMENT_LINE = "Page {page}: statement of the complainant regarding the theft of articles from the residence."
+
+
+def old_prompt_tokens(history: list, extracted_info: dict, user_text: str) -> int:
+    history.append({"role": "user", "content": f"Current FIR Data: {json.dumps(extracted_info)}\n"
+                                               f"User Message: \"{user_text}\""})
+    return sum(estimate_tokens(msg["content"]) for msg in history[-10:])
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--document-pages", type=int, default=40)
+    args = parser.parse_args()
+
+    document = "\n".join(DOCUMENT_LINE.format(page=p) for p in range(1, args.document_pages * 30 + 1))
+    store = InMemorySessionStore()
+    cache = ContentCache(path=None)
+    manager = HistoryManager(store, cache)
+    session = store.get("bench")
+    old_history = []
+    extracted_info = {}
+
+    print(f"{'turn':>5} {'old':>8} {'managed':>8}")
+    for n in range(1, args.turns + 1):
+        if n == 3:
+            key = content_key("document", "bench")
+            cache.put(key, document)
+            manager.attach_document(session, "statement.pdf", key, document)
+            old_history.append({"role": "user", "content": f"I have uploaded a document (statement.pdf). "
+                                                           f"Here is the content: {document}"})
+            user_text = f"I have uploaded a document (statement.pdf). Here is the content: {document}"
+            managed_text = "I have uploaded a document (statement.pdf). Please extract the FIR details from it."
+        else:
+            user_text = managed_text = USER_TURN.format(n=n)
+
+        old = old_prompt_tokens(old_history, extracted_info, user_text)
+        _, managed, read = await manager.build_messages(session, managed_text)
+
+        reply = ASSISTANT_TURN.format(n=n)
+        old_history.append({"role": "assistant", "content": reply})
+        manager.record_turn(session, managed_text, reply, managed, read)
+        extracted_info[f"field_{n}"] = f"value recorded on turn {n} of the interview"
+        session.extracted_info = dict(extracted_info)
+        if manager.needs_compaction(session):
+            await manager.compact(session)
+
+        if n in (1, 2, 3, 4, 5) or n % 5 == 0:
+            print(f"{n:>5} {old:>8} {managed:>8}")
+
+    steady = session.prompt_tokens[5:]
+    print(f"managed prompt after turn 5: min {min(steady)}, max {max(steady)} tokens "
+          f"(FIR data alone is {estimate_tokens(json.dumps(extracted_info))})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,139 @@
+"""Compares document parsing, serial versus the page-parallel DocumentParser.
+
+Usage: python -m benchmarks.bench_parse [--pages 400] [--workers 4]
+
+Generates a multi-hundred-page text PDF and a DOCX of similar length, then
+times the old path (PdfReader over every page in the request's process)
+against DocumentParser, reporting total time, time to the first page and the
+peak memory the parsing side allocated in the server process (a separate,
+untimed run under tracemalloc).
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from fir_agent.parsing import DocumentParser
+
+LINE = "The complainant stated that on the night of the incident the accused entered the house"
+LINES_PER_PAGE = 40
+
+
+def write_pdf(path: Path, pages: int):
+    """Writes a plain-text PDF with `pages` pages of Helvetica, without any PDF library."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for page in range(pages):
+        lines = [f"BT /F1 10 Tf 40 {800 - 18 * i} Td (Page {page + 1} line {i + 1}: {LINE}) Tj ET"
+                 for i in range(LINES_PER_PAGE)]
+        stream = "\n".join(lines).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref)
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(out)
+
+
+def write_docx(path: Path, pages: int):
+    import docx
+
+    document = docx.Document()
+    for page in range(pages):
+        for i in range(LINES_PER_PAGE):
+            document.add_paragraph(f"Page {page + 1} line {i + 1}: {LINE}")
+    document.save(path)
+
+
+def parse_serial(path: Path) -> tuple[float, int]:
+    if path.suffix == ".pdf":
+        from PyPDF2 import PdfReader
+
+        with open(path, "rb") as f:
+            reader = PdfReader(f)
+            start = time.perf_counter()
+            first = None
+            parts = []
+            for page in reader.pages:
+                parts.append(page.extract_text() or "")
+                first = first or time.perf_counter() - start
+    else:
+        import docx
+
+        start = time.perf_counter()
+        parts = [p.text for p in docx.Document(path).paragraphs]
+        first = time.perf_counter() - start
+    return first, sum(len(part) for part in parts)
+
+
+async def parse_parallel(parser: DocumentParser, path: Path) -> tuple[float, int]:
+    start = time.perf_counter()
+    first = None
+    chars = 0
+    async for text in parser.iter_pages(path):
+        first = first or time.perf_counter() - start
+        chars += len(text)
+    return first, chars
+
+
+def measure(fn):
+    # Timings and memory come from separate runs, since tracing allocations
+    # slows down whatever runs in this process far more than the workers.
+    start = time.perf_counter()
+    first, chars = fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, first, chars, peak
+
+
+async def main():
+    parser_args = argparse.ArgumentParser()
+    parser_args.add_argument("--pages", type=int, default=400)
+    parser_args.add_argument("--workers", type=int, default=4)
+    args = parser_args.parse_args()
+
+    parser = DocumentParser(workers=args.workers, max_pages=args.pages)
+    loop = asyncio.get_running_loop()
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path, docx_path = Path(tmp) / "case.pdf", Path(tmp) / "case.docx"
+        write_pdf(pdf_path, args.pages)
+        write_docx(docx_path, args.pages)
+        print(f"{args.pages} pages: PDF {pdf_path.stat().st_size // 1024} KiB, "
+              f"DOCX {docx_path.stat().st_size // 1024} KiB")
+
+        await parse_parallel(parser, docx_path)  # start the worker processes outside the timings
+        for path in (pdf_path, docx_path):
+            for label, fn in (
+                ("serial", lambda: parse_serial(path)),
+                (f"parallel ({args.workers} workers)",
+                 lambda: asyncio.run_coroutine_threadsafe(parse_parallel(parser, path), loop).result()),
+            ):
+                elapsed, first, chars, peak = await asyncio.to_thread(measure, fn)
+                print(f"{path.suffix[1:]:>4} {label:<22} total {elapsed:6.2f}s  first page {first * 1000:7.1f} ms  "
+                      f"{chars:>9} chars  peak alloc {peak / 2 ** 20:6.1f} MiB")
+    parser.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
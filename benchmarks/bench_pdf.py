@@ -0,0 +1,67 @@
+"""Compares FIR PDF submissions per second, cold versus warm.
+
+Usage: python -m benchmarks.bench_pdf [--submissions 40] [--workers 2]
+
+"cold" reproduces the old path for every submission: a fresh WeasyPrint
+font configuration, the template's inline CSS parsed again, and the PDF
+written to a temp file and deleted. "warm" goes through RenderPool, whose
+worker processes keep fonts and parsed stylesheets loaded and return bytes.
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+from fir_agent.pdf import STATIC_DIR, RenderPool
+from fir_agent.templates import registry as templates
+
+SAMPLE_FIR = {
+    "district": "Gurugram",
+    "policeStation": "Cyber City",
+    "firYear": "2025",
+    "firNo": "123",
+    "firDate": "12-03-2025",
+    "complainantName": "Rohan Sharma",
+    "complainantAddress": "House 12, Sector 45, Gurugram",
+    "acts": [{"act": "IPC", "sections": "420, 406"}],
+    "firContents": "शिकायतकर्ता ने बताया कि उसके खाते से ऑनलाइन धोखाधड़ी की गई। " * 20,
+}
+
+
+def cold_submission():
+    from weasyprint import HTML
+    from weasyprint.text.fonts import FontConfiguration
+
+    html = templates.html_template.render(SAMPLE_FIR)
+    path = f"temp_fir_{uuid.uuid4()}.pdf"
+    HTML(string=html, base_url=str(STATIC_DIR)).write_pdf(path, font_config=FontConfiguration())
+    os.remove(path)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--submissions", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    cold_submission()  # import WeasyPrint outside the timed loop
+    start = time.perf_counter()
+    for _ in range(args.submissions):
+        cold_submission()
+    cold_rate = args.submissions / (time.perf_counter() - start)
+
+    pool = RenderPool(workers=args.workers, max_pending=args.submissions)
+    await pool.warm_up()
+    start = time.perf_counter()
+    sizes = await asyncio.gather(*(pool.render(SAMPLE_FIR) for _ in range(args.submissions)))
+    warm_rate = args.submissions / (time.perf_counter() - start)
+    pool.shutdown()
+
+    print(f"cold (serial, temp file):         {cold_rate:6.2f} submissions/s")
+    print(f"warm ({args.workers} workers, in memory): {warm_rate:6.2f} submissions/s")
+    print(f"PDF size {len(sizes[0])} bytes")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,57 @@
+"""Compares the compiled FIR template renderer with the old str.replace loop.
+
+Usage: python -m benchmarks.bench_render [--iterations 2000]
+
+The legacy loop needs literal {{key}} placeholders, so it runs against a copy
+of static/fir_template.html with one placeholder per form field; the compiled
+renderer binds the same fields straight from the form inputs.
+"""
+import argparse
+import re
+import time
+
+from fir_agent.templates import HTML_TEMPLATE_PATH, CompiledTemplate
+
+
+def legacy_render(html_template: str, fir_data: dict) -> str:
+    populated_html = html_template
+    for key, value in fir_data.items():
+        placeholder = f"{{{{{key}}}}}"
+        populated_html = populated_html.replace(placeholder, str(value or 'N/A'))
+    return populated_html
+
+
+def sample_data(fields, count: int) -> dict:
+    data = {key: f"Value for {key} " * 3 for key in sorted(fields)[:count]}
+    data["acts"] = [{"act": "IPC", "sections": "420, 406"}, {"act": "IT Act", "sections": "66D"}]
+    return data
+
+
+def timed(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    source = HTML_TEMPLATE_PATH.read_text(encoding="utf-8")
+    placeholder_source = re.sub(r'(<input\b[^>]*?\bid="(\w+)"[^>]*?)>', r'\1 value="{{\2}}">', source)
+
+    compile_us = timed(lambda: CompiledTemplate(source), 50)
+    compiled = CompiledTemplate(source)
+    print(f"template {len(source)} bytes, {len(compiled.fields)} fields, compile {compile_us:.0f} us (once per edit)")
+    print(f"{'fields':>6} {'replace loop us':>16} {'compiled us':>12} {'speedup':>8}")
+    for count in (8, 25, len(compiled.fields)):
+        data = sample_data(compiled.fields, count)
+        legacy = timed(lambda: legacy_render(placeholder_source, data), args.iterations)
+        fast = timed(lambda: compiled.render(data), args.iterations)
+        print(f"{count:>6} {legacy:>16.1f} {fast:>12.1f} {legacy / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Measures cold start: import time of the app module and time until it serves and is warm.
+
+Usage: python -m benchmarks.bench_startup [--runs 5] [--module main] [--top 12]
+
+Runs `python -X importtime -c "import main"` in fresh interpreters and
+reports the median total import time, with the import time attributed to
+each top-level package (google.* namespaces are kept apart, so google.genai
+and google.adk show separately). Then starts `uvicorn --factory
+main:create_app` the same number of times, in a temporary directory for
+its databases and storage, and reports how long after process start the
+first GET / succeeded and when /ready first answered 200, with each
+subsystem's warm-up time.
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _package(module: str) -> str:
+    parts = module.split(".")
+    return ".".join(parts[:2]) if parts[0] == "google" and len(parts) > 1 else parts[0]
+
+
+def import_profile(module: str, env: dict) -> tuple[float, Counter]:
+    """Total import seconds of `module` and self time per top-level package."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    total, packages = 0.0, Counter()
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        packages[_package(name)] += int(self_us) / 1e6
+        if name == module and len(indent) <= 1:
+            total = int(cumulative_us) / 1e6
+    return total, packages
+
+
+def _get(url: str) -> tuple[int, bytes]:
+    try:
+        with urllib.request.urlopen(url, timeout=2) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def serve_profile(module: str, env: dict, timeout: float) -> dict:
+    """Seconds from process start to the first GET / and the first ready /ready."""
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "--factory", f"{module}:create_app",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    first_response = ready = None
+    subsystems = {}
+    try:
+        while time.perf_counter() - started < timeout and ready is None:
+            try:
+                if first_response is None:
+                    status, _ = _get(f"{base}/")
+                    if status == 200:
+                        first_response = time.perf_counter() - started
+                if first_response is not None:
+                    status, body = _get(f"{base}/ready")
+                    if status == 404:
+                        break  # an app without /ready
+                    if status == 200:
+                        ready = time.perf_counter() - started
+                        subsystems = json.loads(body)["subsystems"]
+            except (urllib.error.URLError, ConnectionError, OSError):
+                pass
+            time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+    return {"first_response": first_response, "ready": ready, "subsystems": subsystems}
+
+
+def _median(values: list):
+    values = [v for v in values if v is not None]
+    return statistics.median(values) if values else None
+
+
+def _seconds(value) -> str:
+    return f"{value * 1000:8.0f} ms" if value is not None else "     n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=12, help="packages to list by import time")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        env = {
+            **os.environ,
+            "GOOGLE_API_KEY": os.getenv("GOOGLE_API_KEY", "bench"),
+            "GEMINI_BASE_URL": os.getenv("GEMINI_BASE_URL", "http://127.0.0.1:9"),
+            "FIR_STORAGE_BACKEND": "fs",
+            "FIR_STORAGE_FS_ROOT": str(root / "gcs"),
+            "FIR_OUTBOX_DIR": str(root / "outbox"),
+            "FIR_CACHE_DB": str(root / "cache.db"),
+            "FIR_SESSION_DB": str(root / "sessions.db"),
+            "FIR_STORE_DB": str(root / "firs.db"),
+            "FIR_LOG_LEVEL": os.getenv("FIR_LOG_LEVEL", "WARNING"),
+        }
+
+        totals, packages = [], Counter()
+        for _ in range(args.runs):
+            total, per_package = import_profile(args.module, env)
+            totals.append(total)
+            packages.update(per_package)
+        print(f"import {args.module:<28} {_seconds(_median(totals))}  (median of {args.runs})")
+        for package, seconds in packages.most_common(args.top):
+            print(f"  {package:<34} {_seconds(seconds / args.runs)}")
+
+        runs = [serve_profile(args.module, env, args.timeout) for _ in range(args.runs)]
+        print(f"{'first GET / after start':<35} {_seconds(_median([r['first_response'] for r in runs]))}")
+        print(f"{'/ready 200 after start':<35} {_seconds(_median([r['ready'] for r in runs]))}")
+        names = {name for r in runs for name in r["subsystems"]}
+        for name in sorted(names):
+            seconds = _median([r["subsystems"].get(name, {}).get("seconds") for r in runs])
+            print(f"  {name + ' warm-up':<33} {_seconds(seconds)}")
+
+
+if __name__ == "__main__":
+    main()
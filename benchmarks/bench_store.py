@@ -0,0 +1,94 @@
+"""Measures FIR store autosave and search latency on a populated database.
+
+Usage: python -m benchmarks.bench_store [--records 50000] [--turns 2000]
+
+Fills a temporary FIRStore with submitted FIRs spread over districts,
+police stations and years, then times field-level autosave of chat turns
+(one or two changed fields each, the way /chat calls it) and paginated
+searches by district, police station, FIR number and complainant name.
+Autosave should stay under a millisecond per turn.
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from fir_agent.store import FIRStore
+
+DISTRICTS = ["Gurugram", "Faridabad", "Hisar", "Rohtak", "Panipat", "Karnal", "Ambala", "Sonipat"]
+FIRST_NAMES = ["Ramesh", "Sunita", "Amit", "Priya", "Irfan", "Kavita", "Rajesh", "Anjali", "Suresh", "Neha",
+               "Vikram", "Pooja", "Harpreet", "Deepak", "Meena", "Arjun", "Sakshi", "Manoj", "Rekha", "Imran"]
+LAST_NAMES = ["Kumar", "Devi", "Sharma", "Singh", "Khan", "Rani", "Yadav", "Gupta", "Verma", "Malik",
+              "Chauhan", "Saini", "Jain", "Arora", "Bansal", "Dahiya", "Hooda", "Sangwan", "Mehta", "Kaur"]
+
+
+def _fir(rng: random.Random, n: int) -> dict:
+    district = rng.choice(DISTRICTS)
+    return {
+        "district": district,
+        "policeStation": f"{district} PS {rng.randint(1, 12)}",
+        "firYear": str(rng.randint(2015, 2024)),
+        "firNo": str(n),
+        "firDate": "2024-03-12",
+        "complainantName": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "complainantAddress": f"{n} Sector {rng.randint(1, 60)}, {district}",
+        "firContents": "Complaint regarding theft of a mobile phone near the metro station. " * 5,
+        "acts": [{"act": "BNS", "sections": "303(2)"}],
+    }
+
+
+def _percentiles(samples: list) -> str:
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return f"p50 {cuts[49] * 1000:.3f} ms  p99 {cuts[98] * 1000:.3f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--searches", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FIRStore(str(Path(tmp) / "firs.db"))
+        start = time.perf_counter()
+        for n in range(args.records):
+            store.submit(None, _fir(rng, n), f"id{n:07d}", f"fir_{n:07d}.pdf")
+        print(f"{args.records} FIRs stored in {time.perf_counter() - start:.1f}s")
+
+        template = _fir(rng, 0)
+        keys = list(template)
+        autosave = []
+        for turn in range(args.turns):
+            changes = {key: template[key] for key in rng.sample(keys, rng.randint(1, 2))}
+            start = time.perf_counter()
+            store.save_fields(f"draft-{turn // 10}", changes)
+            autosave.append(time.perf_counter() - start)
+        print(f"{'autosave per turn':<28} {_percentiles(autosave)}")
+
+        queries = {
+            "district": lambda: {"district": rng.choice(DISTRICTS).lower()},
+            "police station": lambda: {"police_station": f"{rng.choice(DISTRICTS)} PS {rng.randint(1, 12)}"},
+            "FIR year/number": lambda: {"fir_year": rng.randint(2015, 2024), "fir_no": str(rng.randrange(args.records))},
+            "complainant prefix": lambda: {"complainant": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)[:3]}"},
+        }
+        for name, query in queries.items():
+            first, second = [], []
+            for _ in range(args.searches):
+                params = query()
+                start = time.perf_counter()
+                page = store.search(**params, limit=20)
+                first.append(time.perf_counter() - start)
+                if page["next_cursor"]:
+                    start = time.perf_counter()
+                    store.search(**params, limit=20, cursor=page["next_cursor"])
+                    second.append(time.perf_counter() - start)
+            print(f"{'search ' + name:<28} {_percentiles(first)}"
+                  + (f"  (next page p50 {statistics.median(second) * 1000:.3f} ms)" if second else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Compares model output size and merge cost, '---JSON---' text splitting versus structured output.
+
+Usage: python -m benchmarks.bench_structured [--turns 30] [--tokens-per-second 150]
+
+Replays a scripted session in which every turn sets one or two FIR fields.
+"old" is the reply the model used to write: prose, the marker, then the
+whole FIR object with every field filled in or null. "structured" is the
+`{"reply", "updates"}` object holding only the changed fields. Generation
+time is estimated from output tokens at the given decode rate; merge time is
+measured for splitting and merging the old reply versus ChatStreamParser
+plus FIRSchema.merge_field.
+"""
+import argparse
+import json
+import statistics
+import time
+
+from fir_agent.history import estimate_tokens
+from fir_agent.schema import fir_schema
+from fir_agent.streaming import ChatStreamParser
+from fir_agent.templates import registry as templates
+
+REPLY = ("Thank you. I have recorded the {fields}. To proceed, please provide the following "
+         "required details:\n* complainantAddress\n* firContents")
+VALUES = {"string": "Recorded value {n}", "date": "2024-03-{day:02d}", "time": "14:{minute:02d}",
+          "array": [{"act": "IPC", "sections": "379, 411"}]}
+
+
+def old_merge(text: str, extracted_info: dict):
+    parts = text.split("---JSON---")
+    if len(parts) < 2:
+        return
+    nested = json.loads(parts[1].strip())
+    for key, value in {**nested["required_fields"], **nested["optional_fields"]}.items():
+        if value and value != "null" and str(value).strip():
+            extracted_info[key] = value
+
+
+def new_merge(text: str, extracted_info: dict):
+    schema = fir_schema()
+    parser = ChatStreamParser()
+    for event in parser.feed(text) + parser.close():
+        if event[0] == "field":
+            schema.merge_field(event[1], event[2], extracted_info)
+
+
+def timed(merge, text: str, repeat: int = 200) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        merge(text, {})
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--tokens-per-second", type=float, default=150)
+    args = parser.parse_args()
+
+    schema = templates.fir_template.schema
+    sections = {name: dict.fromkeys(schema[name]) for name in ("required_fields", "optional_fields")}
+    keys = [(name, key) for name in sections for key in sections[name]]
+    kinds = fir_schema().kinds
+
+    old_tokens, new_tokens, old_us, new_us = [], [], [], []
+    for n in range(args.turns):
+        updates = {}
+        for name, key in keys[n * 2 % len(keys):][:2]:
+            value = VALUES.get(kinds[key], VALUES["string"])
+            if isinstance(value, str):
+                value = value.format(n=n, day=n % 28 + 1, minute=n % 60)
+            sections[name][key] = value
+            updates[key] = value
+        reply = REPLY.format(fields=" and ".join(updates))
+        old = f"{reply}\n---JSON---\n{json.dumps(sections, indent=4)}"
+        new = json.dumps({"reply": reply, "updates": updates})
+        old_tokens.append(estimate_tokens(old))
+        new_tokens.append(estimate_tokens(new))
+        old_us.append(timed(old_merge, old))
+        new_us.append(timed(new_merge, new))
+
+    rate = args.tokens_per_second
+    print(f"{args.turns} turns, decode rate {rate:g} tokens/s")
+    print(f"{'':<12} {'out tokens':>10} {'gen ms':>8} {'merge us':>9}")
+    for name, tokens, merge_us in (("old", old_tokens, old_us), ("structured", new_tokens, new_us)):
+        mean = statistics.mean(tokens)
+        print(f"{name:<12} {mean:>10.0f} {mean / rate * 1000:>8.0f} {statistics.median(merge_us):>9.1f}")
+    print(f"output tokens cut by {1 - sum(new_tokens) / sum(old_tokens):.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Local stand-in for the Gemini REST API, used by the benchmarks.
+
+Run with `uvicorn benchmarks.fake_gemini:app --port 8765` and point the app
+at it with GEMINI_BASE_URL=http://127.0.0.1:8765. FAKE_GEMINI_LATENCY controls
+the simulated generation time in seconds; FAKE_GEMINI_FILE_PROCESSING how
+long uploaded audio files stay in the PROCESSING state. Chat requests for
+JSON output get STRUCTURED_REPLY, other JSON requests (document extraction)
+EXTRACTED_FIELDS, and plain-text requests REPLY. Batch jobs succeed
+LATENCY seconds after they are created.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+
+LATENCY = float(os.getenv("FAKE_GEMINI_LATENCY", "0.5"))
+TOKEN_DELAY = float(os.getenv("FAKE_GEMINI_TOKEN_DELAY", "0.01"))
+FILE_PROCESSING = float(os.getenv("FAKE_GEMINI_FILE_PROCESSING", "1.0"))
+USAGE = {"promptTokenCount": 900, "candidatesTokenCount": 60, "totalTokenCount": 960}
+
+REPLY = (
+    "Thank you. I have updated the district and police station. To proceed, "
+    "please provide the following required details:\n* firYear\n* firNo\n"
+    "* firDate\n* complainantAddress\n* firContents"
+)
+STRUCTURED_REPLY = json.dumps({
+    "reply": REPLY,
+    "updates": {"district": "Gurugram", "policeStation": "Cyber City"},
+})
+EXTRACTED_FIELDS = json.dumps({
+    "firNo": "112", "firYear": "2024", "firDate": "2024-03-12", "complainantName": "Ramesh Kumar",
+    "acts": [{"act": "BNS", "sections": "303(2)"}],
+})
+
+TRANSCRIPT = (
+    "Investigating Officer: Please tell me what happened.\n"
+    "Complainant: Mera phone 12 March ko Cyber City ke paas chori ho gaya."
+)
+
+app = FastAPI()
+files = {}
+batches = {}
+
+
+@app.post("/{api_version}/models/{model_action}")
+async def generate_content(api_version: str, model_action: str, request: Request):
+    """Answers generateContent after a fixed delay, like a slow model turn.
+
+    streamGenerateContent splits the same reply into small chunks: the first
+    arrives after LATENCY/4 and the rest follow every TOKEN_DELAY seconds.
+    """
+    body = await request.json()
+    if model_action.endswith(":batchGenerateContent"):
+        return _create_batch(body)
+    reply = _reply(body)
+    if model_action.endswith(":streamGenerateContent"):
+        return StreamingResponse(_stream_reply(reply), media_type="text/event-stream")
+    await asyncio.sleep(LATENCY)
+    has_file = any(
+        "fileData" in part or "file_data" in part
+        for content in body.get("contents", [])
+        for part in content.get("parts", [])
+    )
+    return _response(TRANSCRIPT if has_file else reply, "STOP")
+
+
+@app.get("/{api_version}/batches/{batch_id}")
+async def get_batch(api_version: str, batch_id: str):
+    batch = batches[batch_id]
+    if time.monotonic() < batch["ready_at"]:
+        return {"name": f"batches/{batch_id}", "metadata": {"state": "BATCH_STATE_RUNNING"}}
+    return {
+        "name": f"batches/{batch_id}",
+        "metadata": {
+            "state": "BATCH_STATE_SUCCEEDED",
+            "output": {"inlinedResponses": {"inlinedResponses": batch["responses"]}},
+        },
+    }
+
+
+@app.post("/{api_version}/cachedContents")
+async def create_cached_content(api_version: str, request: Request):
+    """Accepts a context cache so the app exercises its cached-prompt path."""
+    body = await request.json()
+    return {"name": "cachedContents/fake-system-prompt", "model": body.get("model"), "ttl": body.get("ttl")}
+
+
+@app.post("/upload/{api_version}/files")
+async def start_file_upload(api_version: str, request: Request):
+    """Starts a resumable upload and hands back the URL to send bytes to."""
+    body = await request.json()
+    file_id = uuid.uuid4().hex[:12]
+    files[file_id] = {**body.get("file", {}), "name": f"files/{file_id}"}
+    upload_url = f"{request.base_url}upload-session/{api_version}/{file_id}"
+    return Response(headers={"x-goog-upload-url": upload_url})
+
+
+@app.post("/upload-session/{api_version}/{file_id}")
+async def upload_file_chunk(api_version: str, file_id: str, request: Request):
+    await request.body()
+    if "finalize" not in request.headers.get("x-goog-upload-command", ""):
+        return Response(headers={"x-goog-upload-status": "active"})
+    files[file_id]["ready_at"] = time.monotonic() + FILE_PROCESSING
+    return Response(
+        content=json.dumps({"file": _file(file_id)}),
+        media_type="application/json",
+        headers={"x-goog-upload-status": "final"},
+    )
+
+
+@app.get("/{api_version}/files/{file_id}")
+async def get_file(api_version: str, file_id: str):
+    return _file(file_id)
+
+
+@app.delete("/{api_version}/files/{file_id}")
+async def delete_file(api_version: str, file_id: str):
+    files.pop(file_id, None)
+    return {}
+
+
+def _file(file_id: str) -> dict:
+    meta = files[file_id]
+    state = "ACTIVE" if time.monotonic() >= meta.get("ready_at", 0) else "PROCESSING"
+    info = {k: v for k, v in meta.items() if k != "ready_at"}
+    return {**info, "state": state, "uri": f"https://fake-gemini/{meta['name']}"}
+
+
+def _reply(request: dict) -> str:
+    config = request.get("generationConfig", {})
+    if config.get("responseMimeType") != "application/json":
+        return REPLY
+    schema = config.get("responseSchema") or config.get("responseJsonSchema") or {}
+    return STRUCTURED_REPLY if "reply" in schema.get("properties", {}) else EXTRACTED_FIELDS
+
+
+def _create_batch(body: dict) -> dict:
+    batch_id = uuid.uuid4().hex[:12]
+    requests = body["batch"]["inputConfig"]["requests"]["requests"]
+    batches[batch_id] = {
+        "ready_at": time.monotonic() + LATENCY,
+        "responses": [
+            {"response": _response(_reply(item["request"]), "STOP"), "metadata": item.get("metadata")}
+            for item in requests
+        ],
+    }
+    return {"name": f"batches/{batch_id}", "metadata": {"state": "BATCH_STATE_PENDING"}}
+
+
+def _response(text: str, finish_reason: str | None) -> dict:
+    candidate = {"content": {"role": "model", "parts": [{"text": text}]}}
+    if finish_reason:
+        candidate["finishReason"] = finish_reason
+    return {"candidates": [candidate], "usageMetadata": USAGE}
+
+
+async def _stream_reply(reply: str):
+    await asyncio.sleep(LATENCY / 4)
+    chunks = [reply[i:i + 8] for i in range(0, len(reply), 8)]
+    for i, chunk in enumerate(chunks):
+        finish = "STOP" if i == len(chunks) - 1 else None
+        yield f"data: {json.dumps(_response(chunk, finish))}\n\n"
+        await asyncio.sleep(TOKEN_DELAY)
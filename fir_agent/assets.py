@@ -0,0 +1,329 @@
+"""Build and serve the officer UI's static assets.
+
+Usage: python -m fir_agent.assets [--source static] [--out build/static]
+
+The build copies every file under the source directory to the output
+directory under a content-hashed name (app.js becomes app.3f9c2a7d1b.js),
+rewriting the references between them (/static/... URLs, ./relative
+imports and new URL() worklet paths) so each file's hash covers the
+files it loads. Text files get gzip and, when the brotli package is
+installed, brotli variants. The Devanagari font used for FIR PDFs is
+pinned to its default instance and subset to the Devanagari, Latin-1 and
+punctuation ranges plus every character of the FIR templates. A
+manifest.json maps each file to its built name, ETag and variants, and
+records the source digests so the server can tell when a build is stale.
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .logs import configure_logging
+from .templates import APP_DIR, FIR_TEMPLATE_PATH, GAZETTEER_PATH, HTML_TEMPLATE_PATH
+
+STATIC_DIR = APP_DIR / "static"
+BUILD_DIR = APP_DIR / "build" / "static"
+MANIFEST = "manifest.json"
+HASH_LENGTH = 10
+FONT_NAME = "NotoSansDevanagari-Regular.ttf"
+TEXT_SUFFIXES = (".html", ".css", ".js", ".mjs", ".json", ".svg", ".txt")
+COMPRESSIBLE_SUFFIXES = TEXT_SUFFIXES + (".ttf", ".otf")
+# Variants in order of preference when the client accepts several equally.
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+# Quoted or url() references to other static files: /static/..., ./... or ../...
+REFERENCE = re.compile(r"""(?<=["'(])(?:/static/|\.{1,2}/)[^"'()\s?#]+""")
+# Kept in the font whatever the templates contain: officers type free text.
+FONT_UNICODES = frozenset(
+    [*range(0x20, 0x7F), *range(0xA0, 0x100), *range(0x900, 0x980), *range(0x1CD0, 0x1D00),
+     *range(0x2000, 0x2070), *range(0xA8E0, 0xA900), *range(0x11B00, 0x11B60), 0x20B9, 0x25CC]
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _source_files(source_dir: Path, exclude: Path | None = None) -> dict[str, Path]:
+    files = {}
+    for path in sorted(source_dir.rglob("*")):
+        if not path.is_file() or path.name.startswith("."):
+            continue
+        if exclude is not None and path.resolve().is_relative_to(exclude):
+            continue
+        files[path.relative_to(source_dir).as_posix()] = path
+    return files
+
+
+def _hashed_name(name: str, digest: str) -> str:
+    directory, base = posixpath.split(name)
+    stem, dot, suffix = base.rpartition(".")
+    hashed = f"{stem}.{digest[:HASH_LENGTH]}.{suffix}" if dot else f"{base}.{digest[:HASH_LENGTH]}"
+    return posixpath.join(directory, hashed)
+
+
+def _resolve_reference(reference: str, name: str) -> str:
+    if reference.startswith("/static/"):
+        return reference[len("/static/"):]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(name), reference))
+
+
+def subset_font(data: bytes, text: str = "") -> bytes:
+    """Pins a variable font to its default instance and drops glyphs outside FONT_UNICODES and `text`.
+
+    All OpenType layout features are kept, so conjuncts and matras still
+    shape; hinting is dropped, as PDFs are rendered from outlines.
+    """
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+    from fontTools.varLib import instancer
+
+    font = TTFont(io.BytesIO(data))
+    if "fvar" in font:
+        font = instancer.instantiateVariableFont(font, {axis.axisTag: axis.defaultValue for axis in font["fvar"].axes})
+    options = subset.Options()
+    options.layout_features = ["*"]
+    options.hinting = False
+    options.notdef_outline = True
+    options.drop_tables += ["STAT"]
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=FONT_UNICODES | {ord(c) for c in text})
+    subsetter.subset(font)
+    out = io.BytesIO()
+    font.save(out)
+    return out.getvalue()
+
+
+def _template_text() -> str:
+    return "".join(path.read_text(encoding="utf-8") for path in (FIR_TEMPLATE_PATH, HTML_TEMPLATE_PATH, GAZETTEER_PATH)
+                   if path.exists())
+
+
+def _write(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.part")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def build(source_dir: Path = STATIC_DIR, out_dir: Path = BUILD_DIR) -> dict:
+    """Builds the assets of `source_dir` into `out_dir` and returns the manifest.
+
+    Earlier builds' hashed files are left in place, so pages still open
+    in a browser keep loading the assets they reference.
+    """
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        logger.warning("brotli is not installed; building gzip variants only")
+    source_dir, out_dir = Path(source_dir), Path(out_dir)
+    sources = _source_files(source_dir, exclude=out_dir.resolve() if out_dir.resolve() != source_dir.resolve() else None)
+    built: dict[str, tuple[str, bytes]] = {}
+
+    def emit(name: str, loading: tuple = ()) -> str:
+        if name in built:
+            return built[name][0]
+        data = sources[name].read_bytes()
+        if name == FONT_NAME:
+            data = subset_font(data, _template_text())
+        elif name.endswith(TEXT_SUFFIXES):
+            def rewrite(match):
+                target = _resolve_reference(match.group(), name)
+                if target not in sources or target in loading or target == name:
+                    return match.group()
+                prefix = match.group()[:match.group().rfind("/") + 1]
+                return prefix + posixpath.basename(emit(target, loading + (name,)))
+
+            data = REFERENCE.sub(rewrite, data.decode("utf-8")).encode("utf-8")
+        hashed = _hashed_name(name, _digest(data))
+        built[name] = (hashed, data)
+        return hashed
+
+    assets = {}
+    for name, path in sources.items():
+        hashed = emit(name)
+        data = built[name][1]
+        _write(out_dir / hashed, data)
+        entry = {"path": hashed, "etag": _digest(data)[:20], "size": len(data),
+                 "source": _digest(path.read_bytes()), "encodings": {}}
+        if name.endswith(COMPRESSIBLE_SUFFIXES):
+            variants = {"gzip": gzip.compress(data, 9, mtime=0)}
+            if brotli is not None:
+                variants["br"] = brotli.compress(data, quality=11)
+            for encoding, compressed in variants.items():
+                if len(compressed) < len(data):
+                    _write(out_dir / (hashed + ENCODINGS[encoding]), compressed)
+                    entry["encodings"][encoding] = len(compressed)
+        assets[name] = entry
+    manifest = {"assets": assets}
+    _write(out_dir / MANIFEST, json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"))
+    return manifest
+
+
+def negotiate_encoding(accept_encoding: str, available) -> str | None:
+    """The preferred encoding of `available` that Accept-Encoding allows, or None for identity."""
+    quality = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        q = 1.0
+        key, _, value = params.strip().partition("=")
+        if key.strip() == "q":
+            try:
+                q = float(value)
+            except ValueError:
+                q = 0.0
+        if coding.strip():
+            quality[coding.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        if encoding in available:
+            q = quality.get(encoding, quality.get("*", 0.0))
+            if q > best_q:
+                best, best_q = encoding, q
+    return best
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _content_type(name: str) -> str:
+    if name.endswith((".js", ".mjs")):
+        return "text/javascript; charset=utf-8"
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    return f"{content_type}; charset=utf-8" if content_type.startswith("text/") else content_type
+
+
+@dataclass
+class Asset:
+    name: str
+    path: Path
+    etag: str
+    hashed_name: str | None = None
+    encodings: dict = field(default_factory=dict)
+
+
+class StaticAssets:
+    """The UI's static files, served with ETags, cache headers and precompressed variants.
+
+    With a current build, a file requested by its content-hashed name is
+    cacheable for a year as immutable; requested by its plain name (as
+    index.html always is) it must be revalidated, which costs a 304 when
+    it has not changed. Brotli or gzip variants are chosen by
+    Accept-Encoding. Without a build, or when static/ has changed since
+    the last one, files are served from the source directory with ETags
+    only.
+    """
+
+    def __init__(self, source_dir: Path = STATIC_DIR, build_dir: Path | None = BUILD_DIR):
+        self.source_dir = Path(source_dir)
+        self.build_dir = Path(build_dir) if build_dir else None
+        self._assets: dict[str, Asset] = {}
+        self._bodies: dict[Path, tuple] = {}
+        self.built = self._load_build()
+
+    @classmethod
+    def from_env(cls) -> "StaticAssets":
+        return cls(Path(os.getenv("FIR_STATIC_DIR", str(STATIC_DIR))), Path(os.getenv("FIR_ASSET_DIR", str(BUILD_DIR))))
+
+    def _load_build(self) -> bool:
+        if self.build_dir is None or not (self.build_dir / MANIFEST).exists():
+            logger.info("No static asset build in %s; serving %s as is", self.build_dir, self.source_dir)
+            return False
+        manifest = json.loads((self.build_dir / MANIFEST).read_text(encoding="utf-8"))["assets"]
+        sources = _source_files(self.source_dir, exclude=self.build_dir.resolve())
+        if set(sources) != set(manifest) or any(
+            _digest(path.read_bytes()) != manifest[name]["source"] for name, path in sources.items()
+        ):
+            logger.warning("Static assets changed since the last build; serving %s as is. "
+                           "Rebuild with: python -m fir_agent.assets", self.source_dir)
+            return False
+        for name, entry in manifest.items():
+            path = self.build_dir / entry["path"]
+            encodings = {encoding: Path(f"{path}{ENCODINGS[encoding]}") for encoding in entry["encodings"]}
+            asset = Asset(name, path, entry["etag"], entry["path"], encodings)
+            self._assets[name] = self._assets[entry["path"]] = asset
+        return True
+
+    def file_path(self, name: str) -> Path:
+        """The file to read for asset `name`: its built version when the build is current."""
+        asset = self._assets.get(name)
+        return asset.path if asset else self.source_dir / name
+
+    def _source_asset(self, name: str) -> Asset | None:
+        path = (self.source_dir / name).resolve()
+        if not path.is_relative_to(self.source_dir.resolve()) or not path.is_file():
+            return None
+        return Asset(name, path, "")
+
+    def _read(self, path: Path, check_mtime: bool) -> tuple[bytes, str]:
+        mtime = os.stat(path).st_mtime_ns if check_mtime else None
+        cached = self._bodies.get(path)
+        if cached is None or cached[0] != mtime:
+            data = path.read_bytes()
+            cached = self._bodies[path] = (mtime, data, _digest(data)[:20])
+        return cached[1], cached[2]
+
+    async def respond(self, name: str, headers) -> tuple[int, dict, bytes]:
+        """Status, headers and body for a GET of asset `name`, given the request headers."""
+        name = posixpath.normpath(name).lstrip("/")
+        asset = self._assets.get(name) if self.built else self._source_asset(name)
+        if asset is None:
+            return 404, {"Content-Type": "text/plain; charset=utf-8"}, b"Not Found"
+        encoding = negotiate_encoding(headers.get("accept-encoding", ""), asset.encodings)
+        path = asset.encodings[encoding] if encoding else asset.path
+        if self.built:
+            # Built files never change in place, so once read they are served from memory.
+            cached = self._bodies.get(path)
+            body = cached[1] if cached else (await asyncio.to_thread(self._read, path, False))[0]
+            etag = asset.etag
+        else:
+            body, etag = await asyncio.to_thread(self._read, path, True)
+        etag = f'"{etag}-{encoding}"' if encoding else f'"{etag}"'
+        response_headers = {
+            "ETag": etag,
+            "Cache-Control": IMMUTABLE if name == asset.hashed_name else REVALIDATE,
+            "Content-Type": _content_type(asset.name),
+        }
+        if asset.encodings:
+            response_headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            response_headers["Content-Encoding"] = encoding
+        if _etag_matches(headers.get("if-none-match", ""), etag):
+            return 304, response_headers, b""
+        response_headers["Content-Length"] = str(len(body))
+        return 200, response_headers, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build content-hashed, precompressed static assets for the UI.")
+    parser.add_argument("--source", type=Path, default=STATIC_DIR)
+    parser.add_argument("--out", type=Path, default=BUILD_DIR)
+    args = parser.parse_args()
+
+    configure_logging()
+    logging.getLogger("fontTools").setLevel(logging.WARNING)
+    manifest = build(args.source, args.out)
+    print(f"{'asset':<36} {'bytes':>9} {'gzip':>9} {'br':>9}  built as")
+    for name, entry in manifest["assets"].items():
+        encodings = entry["encodings"]
+        print(f"{name:<36} {entry['size']:>9} {encodings.get('gzip', '-'):>9} {encodings.get('br', '-'):>9}  {entry['path']}")
+    print(f"Wrote {len(manifest['assets'])} assets and {MANIFEST} to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,459 @@
+"""Bulk FIR ingestion for backlogs of complaint documents and recordings.
+
+Usage: python -m fir_agent.batch SOURCE [--checkpoint FILE] [--concurrency 16]
+                                        [--batch-api] [--batch-size 100]
+
+SOURCE is a directory (searched recursively for PDF, DOCX and audio files)
+or a manifest listing one path per line. Every file is parsed or
+transcribed, its FIR fields are extracted by the fast-path rules and then
+the model, and the rendered PDF is uploaded to the configured storage
+backend and recorded in the FIR store (FIR_STORE_DB) for search. Progress
+is appended to a checkpoint file, so an interrupted run picks up where it
+stopped: uploaded files are skipped, and extracted ones, including those
+that later failed to render or upload, go straight to rendering without
+another model call. Worker counts for parsing, transcription, rendering
+and model calls come from the same environment variables as the server.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+from google.genai import types
+
+from .cache import default_cache, file_digest
+from .extraction import FastPathExtractor
+from .history import chunk_text, estimate_tokens
+from .llm import GeminiClient
+from .logs import configure_logging
+from .parsing import SUPPORTED_EXTENSIONS, DocumentParser
+from .pdf import RenderPool
+from .schema import fir_schema
+from .store import FIRStore
+from .templates import registry as templates
+from .transcription import TranscriptionService
+from .uploader import Uploader, default_backend, new_fir_blob_name
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".m4a", ".ogg", ".webm", ".flac", ".aac")
+STAGES = ("hash", "parse", "transcribe", "extract", "render", "upload")
+BATCH_DONE_STATES = ("JOB_STATE_SUCCEEDED", "JOB_STATE_PARTIALLY_SUCCEEDED", "JOB_STATE_FAILED",
+                     "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED")
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_PROMPT = (
+    "Below is the {source} of a complaint made to the police. Extract every First Information Report "
+    "field it states and leave out anything it does not mention; do not guess. Write dates as YYYY-MM-DD "
+    "and times as 24-hour HH:MM, and give `acts` as the complete list of acts and sections.\n\n"
+    "Fields already found: {known}\n\n{title}:\n{text}"
+)
+
+
+def discover(source: Path) -> list:
+    """Lists the files to ingest from a directory or a manifest of paths."""
+    extensions = SUPPORTED_EXTENSIONS + AUDIO_EXTENSIONS
+    if source.is_dir():
+        return sorted(p for p in source.rglob("*") if p.is_file() and p.suffix.lower() in extensions)
+    paths = []
+    for line in source.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            path = Path(line)
+            paths.append(path if path.is_absolute() else source.parent / path)
+    return paths
+
+
+class Checkpoint:
+    """Append-only JSON-lines record of each file's progress, keyed by content hash.
+
+    The last record for a key wins, so a crash mid-write loses at most the
+    stage that was being recorded.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.records = {}
+        if path.exists():
+            for line in path.read_text(encoding="utf-8").splitlines():
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.records[record["key"]] = record
+        self._file = open(path, "a", encoding="utf-8")
+
+    def get(self, key: str) -> dict | None:
+        return self.records.get(key)
+
+    def write(self, key: str, path: Path, stage: str, **fields):
+        record = {"key": key, "path": str(path), "stage": stage, "at": time.time(), **fields}
+        self.records[key] = record
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class StageStats:
+    """Item counts, failures and latencies for one pipeline stage."""
+
+    def __init__(self):
+        self.count = 0
+        self.failed = 0
+        self.latencies = []
+        self.first_start = None
+        self.last_end = None
+
+    def timer(self):
+        return _StageTimer(self)
+
+    def row(self, name: str) -> str:
+        if not self.count and not self.failed:
+            return f"{name:<11} {'-':>6}"
+        span = (self.last_end - self.first_start) or 1e-9
+        latencies = sorted(self.latencies) or [0.0]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return (f"{name:<11} {self.count:>6} {self.failed:>6} {self.count / span:>9.2f} "
+                f"{statistics.median(latencies):>8.2f} {p95:>8.2f}")
+
+
+class _StageTimer:
+    def __init__(self, stats: StageStats):
+        self.stats = stats
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        if self.stats.first_start is None:
+            self.stats.first_start = self.start
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        self.stats.last_end = end
+        if exc_type is None:
+            self.stats.count += 1
+            self.stats.latencies.append(end - self.start)
+        else:
+            self.stats.failed += 1
+
+
+class ModelExtractor:
+    """Extracts FIR fields with one generate_content call per file, on `model`
+    or else the model the router picks for the prompt's size."""
+
+    deferred = False
+
+    def __init__(self, gemini, model: str | None = None):
+        self.gemini = gemini
+        self.model = model
+
+    async def submit(self, key: str, prompt: str, config) -> str:
+        model = self.model or self.gemini.route("extraction", estimate_tokens(prompt))
+        response = await self.gemini.generate_content(prompt, model=model, config=config)
+        return response.text or ""
+
+    def flush(self):
+        pass
+
+
+class BatchExtractor:
+    """Extracts FIR fields through Gemini batch jobs, which cost half as much
+    per token as online calls but may take hours to complete.
+
+    Requests are collected until `batch_size` are waiting, `max_wait` seconds
+    have passed since the first one, or `flush` is called; each batch is then
+    submitted as one inline job and polled with exponential backoff.
+    """
+
+    def __init__(self, gemini, model: str | None = None, batch_size: int = 100, max_wait: float = 60.0,
+                 poll_initial: float = 10.0, poll_max: float = 300.0):
+        self.gemini = gemini
+        # One job runs on one model, so batches use the standard tier rather than routing per file.
+        self.model = model or gemini.router.models["standard"]
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self._pending = []
+        self._timer = None
+        self._jobs = set()
+
+    deferred = True
+
+    def submit(self, key: str, prompt: str, config) -> asyncio.Future:
+        """Queues a request and returns a future for the model's reply text."""
+        future = asyncio.get_running_loop().create_future()
+        request = types.InlinedRequest(contents=prompt, config=config, metadata={"key": key})
+        self._pending.append((request, future))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self.flush)
+        return future
+
+    def flush(self):
+        """Submits everything waiting as a batch job now."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._run(batch))
+        self._jobs.add(task)
+        task.add_done_callback(self._jobs.discard)
+
+    async def _run(self, batch: list):
+        try:
+            job = await self.gemini.aio.batches.create(
+                model=self.model,
+                src=[request for request, _ in batch],
+                config={"display_name": f"fir-ingest-{int(time.time())}"},
+            )
+            logger.info("Submitted batch job %s with %d requests", job.name, len(batch))
+            delay = self.poll_initial
+            while job.state.name not in BATCH_DONE_STATES:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.poll_max)
+                job = await self.gemini.aio.batches.get(name=job.name)
+            if job.state.name not in BATCH_DONE_STATES[:2]:
+                raise RuntimeError(f"Batch job {job.name} ended in state {job.state.name}")
+            responses = (job.dest.inlined_responses if job.dest else None) or []
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        # Responses carry their request's metadata; their order is not relied on.
+        futures = {request.metadata["key"]: future for request, future in batch}
+        for response in responses:
+            future = futures.pop((response.metadata or {}).get("key"), None)
+            if future is None:
+                logger.warning("Batch job %s returned a response for no pending request", job.name)
+            elif response.error:
+                future.set_exception(RuntimeError(response.error.message or "batch request failed"))
+            else:
+                future.set_result(response.response.text or "")
+        for future in futures.values():
+            future.set_exception(RuntimeError("batch job returned no response for this request"))
+
+
+class IngestPipeline:
+    """Runs files through hash, parse or transcribe, extract, render and upload.
+
+    At most `concurrency` files are in flight; each stage is further bounded
+    by its own pool (the document parser, transcription service, Gemini
+    client, render pool and uploader), so a slow stage throttles the files
+    feeding it rather than piling up work. With a deferred (batch) extractor
+    a file gives up its slot while its extraction waits on the batch job.
+    """
+
+    def __init__(self, checkpoint: Checkpoint, extractor, parser: DocumentParser, transcriptions: TranscriptionService,
+                 render_pool: RenderPool, uploader: Uploader, cache, firs: FIRStore | None = None,
+                 concurrency: int = 16, max_extract_tokens: int = 30000):
+        self.checkpoint = checkpoint
+        self.extractor = extractor
+        self.parser = parser
+        self.transcriptions = transcriptions
+        self.render_pool = render_pool
+        self.uploader = uploader
+        self.cache = cache
+        self.firs = firs
+        self.max_extract_tokens = max_extract_tokens
+        self.fast_path = FastPathExtractor()
+        self.stats = {stage: StageStats() for stage in STAGES}
+        self.outcomes = {"uploaded": 0, "skipped": 0, "duplicate": 0, "failed": 0}
+        self._slots = asyncio.Semaphore(concurrency)
+        self._render_slots = asyncio.Semaphore(render_pool.max_pending)
+        self._seen = set()
+
+    async def run(self, paths: list):
+        self._unread = len(paths)
+        await asyncio.gather(*(self._ingest(path) for path in paths))
+
+    def _read_done(self):
+        self._unread -= 1
+        # No more requests will reach the extractor once every file is read.
+        if self._unread == 0:
+            self.extractor.flush()
+
+    async def _ingest(self, path: Path):
+        stage, key, read = "hash", None, False
+        try:
+            async with self._slots:
+                with self.stats["hash"].timer():
+                    key = await asyncio.to_thread(file_digest, path)
+                record = self.checkpoint.get(key)
+                if key in self._seen or (record and record["stage"] == "uploaded"):
+                    self.outcomes["duplicate" if key in self._seen else "skipped"] += 1
+                    return
+                self._seen.add(key)
+                # Set on "extracted" records and on failures after extraction.
+                fields = record.get("fields") if record else None
+                if fields is None:
+                    audio = path.suffix.lower() in AUDIO_EXTENSIONS
+                    stage = "transcribe" if audio else "parse"
+                    with self.stats[stage].timer():
+                        text = await (self._transcribe(path) if audio else self._parse(path, key))
+                    stage = "extract"
+                    fields, prompt, config = self._extraction_request(text, "transcript" if audio else "text")
+                    reply = self.extractor.submit(key, prompt, config)
+                    read = True
+                    self._read_done()
+                    if not self.extractor.deferred:
+                        await self._merge_reply(fields, reply, key, path)
+            if stage == "extract" and self.extractor.deferred:
+                # Batched extraction can take hours; wait for it without holding a slot.
+                await self._merge_reply(fields, reply, key, path)
+
+            async with self._slots:
+                stage = "render"
+                with self.stats["render"].timer():
+                    async with self._render_slots:
+                        pdf_bytes = await self.render_pool.render(fields)
+                stage = "upload"
+                with self.stats["upload"].timer():
+                    fir_id, blob_name = new_fir_blob_name()
+                    await self.uploader.upload(blob_name, pdf_bytes)
+                if self.firs is not None:
+                    await asyncio.to_thread(self.firs.submit, None, fields, fir_id, blob_name)
+            self.checkpoint.write(key, path, "uploaded", fields=fields, fir_id=fir_id, blob=blob_name)
+            self.outcomes["uploaded"] += 1
+        except Exception as e:
+            self.outcomes["failed"] += 1
+            logger.warning("Ingest of %s failed at %s: %s", path, stage, e)
+            if key is not None:
+                # Keep the extracted fields, so a rerun resumes at rendering instead of paying for the model again.
+                kept = {"fields": fields} if stage in ("render", "upload") else {}
+                self.checkpoint.write(key, path, "failed", failed_stage=stage, error=str(e), **kept)
+        finally:
+            if not read:
+                self._read_done()
+
+    async def _parse(self, path: Path, digest: str) -> str:
+        cache_key = self.parser.cache_key(digest)
+        text = await asyncio.to_thread(self.cache.get, cache_key)
+        if text is None:
+            text = await self.parser.parse(path)
+            await asyncio.to_thread(self.cache.put, cache_key, text)
+        return text
+
+    async def _transcribe(self, path: Path) -> str:
+        data = await asyncio.to_thread(path.read_bytes)
+        job = self.transcriptions.submit(data, path.name)
+        events = job.subscribe()
+        while await events.get() is not None:
+            pass
+        job.unsubscribe(events)
+        if job.status != "done" or not job.transcription:
+            raise RuntimeError(job.error or "empty transcription")
+        return job.transcription
+
+    def _extraction_request(self, text: str, source: str) -> tuple:
+        """Runs the fast-path rules and builds the model request for the rest of the text."""
+        fields = {}
+        self.fast_path.extract(text).merge_into(fields)
+        kept, used = [], 0
+        for chunk in chunk_text(text, 400):
+            tokens = estimate_tokens(chunk)
+            if used + tokens > self.max_extract_tokens:
+                break
+            kept.append(chunk)
+            used += tokens
+        prompt = EXTRACTION_PROMPT.format(
+            source=source, title=source.capitalize(), known=json.dumps(fields, ensure_ascii=False),
+            text="\n".join(kept),
+        )
+        config = types.GenerateContentConfig(
+            response_mime_type="application/json", response_schema=fir_schema().update_model
+        )
+        return fields, prompt, config
+
+    async def _merge_reply(self, fields: dict, reply, key: str, path: Path):
+        with self.stats["extract"].timer():
+            updates = json.loads(await reply)
+        schema = fir_schema()
+        for field, value in updates.items():
+            schema.merge_field(field, value, fields)
+        missing = [k for k in templates.required_fields if not fields.get(k)]
+        self.checkpoint.write(key, path, "extracted", fields=fields, missing=missing)
+
+    def report(self, elapsed: float) -> str:
+        lines = [f"{'stage':<11} {'done':>6} {'failed':>6} {'files/s':>9} {'p50 s':>8} {'p95 s':>8}"]
+        lines += [self.stats[stage].row(stage) for stage in STAGES]
+        lines.append(", ".join(f"{name} {count}" for name, count in self.outcomes.items()) + f" in {elapsed:.1f}s")
+        return "\n".join(lines)
+
+
+async def ingest(args) -> IngestPipeline:
+    paths = discover(Path(args.source))
+    checkpoint = Checkpoint(Path(args.checkpoint))
+    gemini = GeminiClient.from_env()
+    cache = default_cache()
+    parser = DocumentParser.from_env()
+    render_pool = RenderPool.from_env()
+    uploader = Uploader(default_backend(), max_workers=int(os.getenv("FIR_UPLOAD_WORKERS", "8")))
+    transcriptions = TranscriptionService(
+        gemini, cache=cache, max_concurrency=int(os.getenv("FIR_TRANSCRIPTION_CONCURRENCY", "4"))
+    )
+    if args.batch_api:
+        extractor = BatchExtractor(gemini, args.model, batch_size=args.batch_size, max_wait=args.batch_wait)
+    else:
+        extractor = ModelExtractor(gemini, args.model)
+    pipeline = IngestPipeline(checkpoint, extractor, parser, transcriptions, render_pool, uploader, cache,
+                              firs=FIRStore.from_env(), concurrency=args.concurrency, max_extract_tokens=args.max_extract_tokens)
+    print(f"Ingesting {len(paths)} files from {args.source}")
+    started = time.perf_counter()
+    try:
+        try:
+            await render_pool.warm_up()
+        except Exception as e:
+            logger.error("PDF render pool warm-up failed: %s", e)
+        run = asyncio.create_task(pipeline.run(paths))
+        while not run.done():
+            await asyncio.wait({run}, timeout=args.progress_interval)
+            if not run.done():
+                print(pipeline.report(time.perf_counter() - started).splitlines()[-1])
+        await run
+    finally:
+        print(pipeline.report(time.perf_counter() - started))
+        checkpoint.close()
+        uploader.shutdown()
+        render_pool.shutdown()
+        parser.shutdown()
+        await gemini.aclose()
+    return pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest a backlog of complaint documents and recordings as FIRs.")
+    parser.add_argument("source", help="directory of PDF/DOCX/audio files, or a manifest with one path per line")
+    parser.add_argument("--checkpoint", default="ingest_checkpoint.jsonl",
+                        help="progress file; rerun with the same file to resume")
+    parser.add_argument("--concurrency", type=int, default=16, help="files in flight at once")
+    parser.add_argument("--model", default=None,
+                        help="model for extraction (default: routed by document size; the standard tier with --batch-api)")
+    parser.add_argument("--max-extract-tokens", type=int, default=30000,
+                        help="document text sent to the model per file")
+    parser.add_argument("--batch-api", action="store_true",
+                        help="extract through Gemini batch jobs (cheaper, but slow to complete)")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--batch-wait", type=float, default=60.0,
+                        help="seconds to wait for a batch to fill before submitting it")
+    parser.add_argument("--progress-interval", type=float, default=10.0)
+    args = parser.parse_args()
+
+    load_dotenv()
+    configure_logging()
+    pipeline = asyncio.run(ingest(args))
+    raise SystemExit(1 if pipeline.outcomes["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def content_key(kind: str, digest: str, *params) -> str:
+    """Builds a cache key from a content hash plus whatever settings shape the result."""
+    return ":".join([kind, *(str(p) for p in params), digest])
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ContentCache:
+    """Two-tier cache of derived text (parsed documents, transcripts) keyed by content hash.
+
+    Hits are served from an in-process LRU bounded to `memory_bytes`, falling
+    back to a SQLite file shared by all workers on the host. Entries in
+    either tier expire `ttl` seconds after they were last used, and `evict` trims the file
+    back to `max_disk_bytes`, least recently used first. With `path=None` only
+    the memory tier is used.
+    """
+
+    def __init__(self, path: str | None = "cache.db", memory_bytes: int = 64 * 1024 * 1024,
+                 ttl: float = 7 * 24 * 3600, max_disk_bytes: int = 1024 * 1024 * 1024):
+        self.path = path
+        self.memory_bytes = memory_bytes
+        self.ttl = ttl
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._memory_total = 0
+        self._lock = threading.Lock()
+        self._counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+        self._local = threading.local()
+        if path:
+            with self._conn() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                    "last_access REAL NOT NULL, size INTEGER NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+
+    @classmethod
+    def from_env(cls) -> "ContentCache":
+        return cls(
+            path=os.getenv("FIR_CACHE_DB", "cache.db") or None,
+            memory_bytes=int(os.getenv("FIR_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024))),
+            ttl=float(os.getenv("FIR_CACHE_TTL", str(7 * 24 * 3600))),
+            max_disk_bytes=int(os.getenv("FIR_CACHE_MAX_BYTES", str(1024 * 1024 * 1024))),
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, last_used = entry
+                if now - last_used <= self.ttl:
+                    self._memory[key] = (value, now)
+                    self._memory.move_to_end(key)
+                    self._counts["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self._memory_total -= len(value.encode("utf-8"))
+        if self.path:
+            row = self._conn().execute(
+                "SELECT value FROM entries WHERE key = ? AND last_access >= ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is not None:
+                self._conn().execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+                self._remember(key, row[0])
+                with self._lock:
+                    self._counts["disk_hits"] += 1
+                return row[0]
+        with self._lock:
+            self._counts["misses"] += 1
+        return None
+
+    def put(self, key: str, value: str):
+        self._remember(key, value)
+        if self.path:
+            self._conn().execute(
+                "INSERT INTO entries (key, value, last_access, size) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, "
+                "last_access = excluded.last_access, size = excluded.size",
+                (key, value, time.time(), len(value.encode("utf-8"))),
+            )
+        with self._lock:
+            self._counts["writes"] += 1
+
+    def _remember(self, key: str, value: str):
+        size = len(value.encode("utf-8"))
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_total -= len(old[0].encode("utf-8"))
+            self._memory[key] = (value, time.time())
+            self._memory_total += size
+            while self._memory_total > self.memory_bytes:
+                _, (evicted, _) = self._memory.popitem(last=False)
+                self._memory_total -= len(evicted.encode("utf-8"))
+
+    def evict(self) -> int:
+        """Drops expired disk entries, then the least recently used ones above
+        max_disk_bytes, and returns how many were removed."""
+        if not self.path:
+            return 0
+        conn = self._conn()
+        removed = conn.execute(
+            "DELETE FROM entries WHERE last_access < ?", (time.time() - self.ttl,)
+        ).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total > self.max_disk_bytes:
+            excess = total - self.max_disk_bytes
+            victims = []
+            for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+                victims.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+            removed += len(victims)
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+            memory = {"entries": len(self._memory), "bytes": self._memory_total,
+                      "max_bytes": self.memory_bytes}
+        lookups = counts["memory_hits"] + counts["disk_hits"] + counts["misses"]
+        stats = {
+            **counts,
+            "hit_rate": (counts["memory_hits"] + counts["disk_hits"]) / lookups if lookups else 0.0,
+            "memory": memory,
+        }
+        if self.path:
+            count, total = self._conn().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            stats["disk"] = {"entries": count, "bytes": total, "max_bytes": self.max_disk_bytes}
+        return stats
+
+
+_default_cache = None
+
+
+def default_cache() -> ContentCache:
+    """The process-wide content cache, created on first use."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ContentCache.from_env()
+    return _default_cache
@@ -0,0 +1,338 @@
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import date
+
+from .templates import registry as templates
+
+# Python's \b does not treat Devanagari vowel signs as word characters, so
+# word edges are spelled out for Latin and Devanagari text alike.
+_L = r"(?<![\wऀ-ॿ])"
+_R = r"(?![\wऀ-ॿ])"
+_DEVANAGARI_DIGITS = str.maketrans("०१२३४५६७८९", "0123456789")
+_WORDS = re.compile(r"[\wऀ-ॿ]+")
+
+MONTHS = {
+    "january": 1, "jan": 1, "february": 2, "feb": 2, "march": 3, "mar": 3, "april": 4, "apr": 4,
+    "may": 5, "june": 6, "jun": 6, "july": 7, "jul": 7, "august": 8, "aug": 8,
+    "september": 9, "sept": 9, "sep": 9, "october": 10, "oct": 10, "november": 11, "nov": 11,
+    "december": 12, "dec": 12,
+    "जनवरी": 1, "फरवरी": 2, "फ़रवरी": 2, "मार्च": 3, "अप्रैल": 4, "मई": 5, "जून": 6, "जुलाई": 7,
+    "अगस्त": 8, "सितंबर": 9, "सितम्बर": 9, "अक्टूबर": 10, "अक्तूबर": 10, "नवंबर": 11, "नवम्बर": 11,
+    "दिसंबर": 12, "दिसम्बर": 12,
+}
+
+ACTS = {
+    "IPC": ("IPC", "I.P.C.", "Indian Penal Code", "भादवि", "भा.द.वि.", "भा.द.सं.", "आईपीसी"),
+    "BNS": ("BNS", "B.N.S.", "Bharatiya Nyaya Sanhita", "भारतीय न्याय संहिता", "बीएनएस"),
+    "IT Act": ("IT Act", "I.T. Act", "Information Technology Act", "आईटी एक्ट", "सूचना प्रौद्योगिकी अधिनियम"),
+    "NDPS Act": ("NDPS Act", "NDPS", "एनडीपीएस एक्ट", "एनडीपीएस"),
+    "Arms Act": ("Arms Act", "आर्म्स एक्ट", "शस्त्र अधिनियम"),
+    "POCSO Act": ("POCSO Act", "POCSO", "पॉक्सो एक्ट", "पॉक्सो"),
+    "Dowry Prohibition Act": ("Dowry Prohibition Act", "दहेज प्रतिषेध अधिनियम"),
+}
+
+# Connectives and cue words that carry no FIR information of their own. A
+# message made only of these plus resolved fields needs no model call. "no"
+# is left out: as a cue it is part of the match ("FIR no 12"), and anywhere
+# else it may be an answer rejecting the fields ("district Gurugram no").
+FILLER = frozenset(
+    "a an and also as at by date dated dt for fir in is it its mob mobile number of on ph phone please ps p s "
+    "police station district distt dist the to u under section sections sec secs act year contact dob "
+    "gd entry beat thana zila jila hai h ka ki ke ko mein aur va this was with "
+    "एफआईआर नंबर नम्बर संख्या दिनांक तारीख थाना थाने जिला ज़िला धारा धाराओं और व का की के है में "
+    "साल वर्ष मोबाइल फोन फ़ोन मुकदमा पुलिस स्टेशन दर्ज".split()
+)
+
+_MONTH = "|".join(sorted(map(re.escape, MONTHS), key=len, reverse=True))
+DATE = (
+    r"(?:\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4}|\d{4}-\d{1,2}-\d{1,2}"
+    rf"|\d{{1,2}}(?:st|nd|rd|th)?\s+(?:{_MONTH})\.?,?\s+\d{{4}}"
+    rf"|(?:{_MONTH})\.?\s+\d{{1,2}}(?:st|nd|rd|th)?,?\s+\d{{4}})"
+)
+_FIR = r"(?:F\.?\s?I\.?\s?R\.?|एफ\.?\s?आई\.?\s?आर\.?|एफआईआर|प्राथमिकी|मुकदमा)"
+_NO_CUE = r"\s*(?:no\.?|number|num\.?|#|नंबर|नम्बर|संख्या|सं\.|क्रमांक)"
+_NO = rf"(?:{_NO_CUE})?"
+_YEAR_LIKE = re.compile(r"(?:19|20)\d\d")
+_DATE_CUE = r"(?:dated|dt\.?|date|on|दिनांक|दि\.|तारीख|दिनांकित)"
+_SECTION = r"\d{1,3}[A-Z]{0,2}(?:\(\d+\))?(?:\([a-z]\))?"
+_SECTIONS = rf"{_SECTION}(?:\s*(?:,|/|&|and|और|व)\s*{_SECTION})*"
+_SECTION_CUE = r"(?:u/s\.?|under\s+sections?|sections?|secs?\.?|धाराओं|धारा|की\s+धारा|dhara)"
+_PS_CUE = r"(?:police\s+station|पुलिस\s+स्टेशन|पुलिस\s+थाना|P\.\s?S\.|PS|thana|थाना|थाने)"
+_DISTRICT_CUE = r"(?:district|distt\.?|dist\.|zila|jila|जिला|ज़िला|जनपद)"
+
+
+def _alternation(names) -> str:
+    return "|".join(re.escape(n).replace(r"\ ", r"\s+") for n in sorted(names, key=len, reverse=True))
+
+
+_ACT_NAMES = {alias.lower(): act for act, aliases in ACTS.items() for alias in aliases}
+_ACT_PATTERNS = (
+    # "u/s 420, 406 IPC", "धारा 420 भादवि", "66D of the IT Act, 2000"
+    re.compile(
+        rf"{_L}(?:{_SECTION_CUE}\s*)?(?P<sections>{_SECTIONS})\s*,?\s*(?:of\s+(?:the\s+)?)?"
+        rf"(?P<act>{_alternation(_ACT_NAMES)})(?:\s*,?\s*\d{{4}})?{_R}",
+        re.IGNORECASE,
+    ),
+    # "IPC 420/406", "भादवि की धारा 420"
+    re.compile(
+        rf"{_L}(?P<act>{_alternation(_ACT_NAMES)})\s*,?\s*(?:{_SECTION_CUE}\s*)?(?P<sections>{_SECTIONS}){_R}",
+        re.IGNORECASE,
+    ),
+)
+
+_FIR_NO = re.compile(
+    rf"{_L}{_FIR}(?P<cue>{_NO_CUE})?\s*[:\-]?\s*(?P<no>\d{{1,6}})(?:\s*(?:/|of|का|ka|सन्|वर्ष)\s*(?P<year>\d{{4}}|\d{{2}}))?{_R}"
+    rf"(?:\s*,?\s*{_DATE_CUE}\s*[:\-]?\s*(?P<date>{DATE}))?",
+    re.IGNORECASE,
+)
+_FIR_YEAR = re.compile(rf"{_L}(?:{_FIR}\s+(?:year|वर्ष|साल)|year\s+of\s+(?:the\s+)?{_FIR})\s*[:\-]?\s*(?P<year>\d{{4}}){_R}", re.IGNORECASE)
+_FIR_DATE = re.compile(
+    rf"{_L}(?:{_FIR}\s+(?:की\s+)?(?:date|दिनांक|तारीख)|date\s+of\s+(?:the\s+)?{_FIR})\s*[:\-]?\s*(?:is\s+)?(?P<date>{DATE})",
+    re.IGNORECASE,
+)
+_OFFENCE_DATE = re.compile(
+    rf"{_L}(?:offence|incident|occurrence|घटना)\s+(?:date|on|dated|की\s+(?:तारीख|दिनांक)|दिनांक|तारीख)\s*[:\-]?\s*"
+    rf"(?:is\s+|was\s+)?(?P<date>{DATE})(?:\s*(?:to|till|until|-|से)\s*(?P<to>{DATE})(?:\s*तक)?)?",
+    re.IGNORECASE,
+)
+_DOB = re.compile(
+    rf"{_L}(?:DOB|D\.O\.B\.?|date\s+of\s+birth|जन्म\s*(?:तिथि|दिनांक|तारीख))\s*[:\-]?\s*(?:is\s+)?(?P<date>{DATE})",
+    re.IGNORECASE,
+)
+_PHONE = re.compile(
+    rf"{_L}(?:(?:mobile|mob\.?|phone|ph\.?|contact|मोबाइल|फोन|फ़ोन)\s*(?:no\.?|number|नंबर)?\s*[:\-]?\s*)?"
+    rf"(?P<phone>(?:\+91[\s-]?|0)?[6-9]\d{{4}}[\s-]?\d{{5}}){_R}",
+    re.IGNORECASE,
+)
+_GD_NO = re.compile(
+    rf"{_L}(?:G\.?\s?D\.?|rojnamcha|रोजनामचा|जीडी)\s*(?:entry\s*)?{_NO}\s*[:\-]?\s*(?P<no>\d{{1,6}}){_R}", re.IGNORECASE
+)
+_BEAT_NO = re.compile(rf"{_L}(?:beat|बीट){_NO}\s*[:\-]?\s*(?P<no>\d{{1,4}}){_R}", re.IGNORECASE)
+
+
+def normalize_digits(text: str) -> str:
+    return text.translate(_DEVANAGARI_DIGITS)
+
+
+def parse_date(text: str) -> str | None:
+    """Parses an Indian-style (day first) date and returns it as YYYY-MM-DD."""
+    text = text.strip().rstrip(",")
+    numeric = re.fullmatch(r"(\d{1,2})[-/.](\d{1,2})[-/.](\d{2,4})", text)
+    iso = re.fullmatch(r"(\d{4})-(\d{1,2})-(\d{1,2})", text)
+    try:
+        if numeric:
+            day, month, year = (int(g) for g in numeric.groups())
+            year += 2000 if year < 100 else 0
+        elif iso:
+            year, month, day = (int(g) for g in iso.groups())
+        else:
+            numbers = [int(n) for n in re.findall(r"\d+", text)]
+            months = [MONTHS[m.lower()] for m in re.findall(_MONTH, text, re.IGNORECASE)]
+            if len(numbers) != 2 or len(months) != 1:
+                return None
+            day, year = numbers if numbers[0] <= 31 else numbers[::-1]
+            month = months[0]
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+def merge_acts(existing, new: list) -> list:
+    """Merges act/section entries, combining the sections of repeated acts."""
+    merged = {}
+    for entry in list(existing or []) + new:
+        sections = merged.setdefault(entry.get("act", ""), [])
+        for section in re.split(r"\s*,\s*", entry.get("sections", "")):
+            if section and section not in sections:
+                sections.append(section)
+    return [{"act": act, "sections": ", ".join(sections)} for act, sections in merged.items()]
+
+
+@dataclass
+class Extraction:
+    """Fields resolved by the rules and whether they account for the whole message."""
+
+    fields: dict = field(default_factory=dict)
+    complete: bool = False
+
+    def merge_into(self, extracted_info: dict) -> list:
+        """Stores the fields and returns the keys whose values changed."""
+        changed = []
+        for key, value in self.fields.items():
+            if key == "acts":
+                value = merge_acts(extracted_info.get("acts"), value)
+            if extracted_info.get(key) != value:
+                extracted_info[key] = value
+                changed.append(key)
+        return changed
+
+    def reply(self, extracted_info: dict) -> str:
+        """A reply in the model's style, confirming the fields and listing what is still missing."""
+        schema = templates.fir_template.schema
+        descriptions = {**schema.get("required_fields", {}), **schema.get("optional_fields", {})}
+        noted = []
+        for key, value in self.fields.items():
+            if key == "acts":
+                value = "; ".join(f"{a['act']} {a['sections']}" for a in value)
+            noted.append(f"{descriptions.get(key, {}).get('description', key)}: {value}")
+        text = "Noted. " + ", ".join(noted) + "."
+        missing = [key for key in templates.required_fields if not extracted_info.get(key)]
+        if missing:
+            text += "\nTo proceed, please provide the following required details:\n" + "\n".join(f"* {k}" for k in missing)
+        return text
+
+
+class _Gazetteer:
+    def __init__(self, data: dict):
+        self.districts = {}
+        for entry in data.get("districts", []):
+            for name in (entry["name"], *entry.get("aliases", ())):
+                self.districts[name.lower()] = entry["name"]
+        self.stations = {}
+        for entry in data.get("police_stations", []):
+            for name in (entry["name"], *entry.get("aliases", ())):
+                self.stations[name.lower()] = (entry["name"], entry.get("district"))
+        district_names = _alternation(self.districts)
+        station_names = _alternation(self.stations)
+        self.district_re = re.compile(
+            rf"{_L}(?:{_DISTRICT_CUE}\s*[:\-]?\s*(?P<a>{district_names})|(?P<b>{district_names})\s+{_DISTRICT_CUE}){_R}",
+            re.IGNORECASE,
+        )
+        self.station_re = re.compile(
+            rf"{_L}(?:{_PS_CUE}\s*[:\-]?\s*(?P<a>{station_names})|(?P<b>{station_names})\s+{_PS_CUE}){_R}",
+            re.IGNORECASE,
+        )
+
+
+class FastPathExtractor:
+    """Rule-based extraction of structured FIR fields, run before the model.
+
+    Only cue-anchored matches are taken (a number after "FIR no", a date
+    after "dated", a place after "PS" or "district" that is in the
+    gazetteer), so everything returned is high-confidence. A field matched
+    twice with different values ("FIR no 12 nahi, FIR no 13") is dropped
+    and left to the model. When nothing but resolved fields and connective
+    words remain, `complete` is set and the caller can answer without a
+    model call; otherwise the fields are only hints, since the rest of the
+    message may negate or correct them.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._gazetteer_source = None
+        self._gazetteer = None
+
+    @classmethod
+    def from_env(cls) -> "FastPathExtractor":
+        return cls(enabled=os.getenv("FIR_FAST_PATH", "1") != "0")
+
+    def _places(self) -> _Gazetteer:
+        data = templates.gazetteer
+        if data is not self._gazetteer_source:
+            self._gazetteer = _Gazetteer(data)
+            self._gazetteer_source = data
+        return self._gazetteer
+
+    def extract(self, text: str) -> Extraction:
+        if not self.enabled:
+            return Extraction()
+        text = normalize_digits(text)
+        known = set(templates.required_fields) | set(templates.fir_template.optional_fields)
+        fields = {}
+        claimed = []
+        unresolved = []
+        conflicting = set()
+
+        def claim(match) -> bool:
+            start, end = match.span()
+            if any(start < e and s < end for s, e in claimed):
+                return False
+            claimed.append((start, end))
+            return True
+
+        def put(key, value):
+            if not value or key not in known:
+                unresolved.append(key)
+            elif fields.setdefault(key, value) != value:
+                conflicting.add(key)
+
+        for m in _FIR_NO.finditer(text):
+            # Without a number cue or a /year suffix, "FIR 2025" is more likely the year than the number.
+            if not (m["cue"] or m["year"]) and _YEAR_LIKE.fullmatch(m["no"]):
+                continue
+            if claim(m):
+                put("firNo", m["no"])
+                if m["year"]:
+                    put("firYear", m["year"] if len(m["year"]) == 4 else f"20{m['year']}")
+                if m["date"]:
+                    put("firDate", parse_date(m["date"]))
+        for m in _FIR_YEAR.finditer(text):
+            if claim(m):
+                put("firYear", m["year"])
+        for m in _FIR_DATE.finditer(text):
+            if claim(m):
+                put("firDate", parse_date(m["date"]))
+        for m in _OFFENCE_DATE.finditer(text):
+            if claim(m):
+                put("offenceDateFrom", parse_date(m["date"]))
+                if m["to"]:
+                    put("offenceDateTo", parse_date(m["to"]))
+        for m in _DOB.finditer(text):
+            if claim(m):
+                put("complainantDob", parse_date(m["date"]))
+
+        places = self._places()
+        station_district = None
+        for m in places.station_re.finditer(text):
+            if claim(m):
+                name, district = places.stations[re.sub(r"\s+", " ", (m["a"] or m["b"]).lower())]
+                put("policeStation", name)
+                station_district = district
+        for m in places.district_re.finditer(text):
+            if claim(m):
+                put("district", places.districts[re.sub(r"\s+", " ", (m["a"] or m["b"]).lower())])
+        if "policeStation" in fields and "district" not in fields and station_district:
+            put("district", station_district)
+
+        acts = self._acts(text, claim)
+        if acts and "acts" in known:
+            fields["acts"] = acts
+        if "complainantPhone" in known:
+            for m in _PHONE.finditer(text):
+                if claim(m):
+                    put("complainantPhone", re.sub(r"[\s-]", "", m["phone"])[-10:])
+        for m in _GD_NO.finditer(text):
+            if claim(m):
+                put("gdEntryNo", m["no"])
+        for m in _BEAT_NO.finditer(text):
+            if claim(m):
+                put("beatNo", m["no"])
+
+        for key in conflicting:
+            del fields[key]
+            unresolved.append(key)
+        # A match that could not be stored (an impossible date such as
+        # 31-02-2025, a key missing from the template, or conflicting
+        # values) still needs the model.
+        complete = bool(fields) and not unresolved and self._only_filler(text, claimed)
+        return Extraction(fields=fields, complete=complete)
+
+    def _acts(self, text: str, claim) -> list:
+        acts = []
+        for pattern in _ACT_PATTERNS:
+            for m in pattern.finditer(text):
+                if claim(m):
+                    act = _ACT_NAMES[re.sub(r"\s+", " ", m["act"].lower())]
+                    sections = re.split(r"\s*(?:,|/|&|and|और|व)\s*", m["sections"])
+                    acts.append({"act": act, "sections": ", ".join(s for s in sections if s)})
+        return merge_acts([], acts) if acts else []
+
+    @staticmethod
+    def _only_filler(text: str, claimed: list) -> bool:
+        rest, last = [], 0
+        for start, end in sorted(claimed):
+            rest.append(text[last:start])
+            last = end
+        rest.append(text[last:])
+        return all(word.lower() in FILLER for word in _WORDS.findall(" ".join(rest)))
@@ -0,0 +1,279 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = (
+    "You maintain the running summary of an interview between an Investigating Officer and a "
+    "complainant for a First Information Report. Merge the earlier summary with the new turns below "
+    "into one summary of at most {max_words} words. Keep facts, names, dates, places and open questions "
+    "that matter for the FIR; drop greetings and anything already settled in the FIR data.\n\n"
+    "Earlier summary:\n{summary}\n\nNew turns:\n{turns}"
+)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have he her his i in is it me my of on or our "
+    "she that the their them they this to was we were what when where which who with you your "
+    "hai hain ka ki ke ko mein main se ne tha thi aur".split()
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximates Gemini's token count without a round trip: about four
+    characters per token for Latin script, and about two for Devanagari and
+    other non-ASCII text, which the tokenizer splits more finely."""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return (len(text) - non_ascii + 3) // 4 + (non_ascii + 1) // 2
+
+
+def _terms(text: str) -> set:
+    return {w for w in _WORD.findall(text.lower()) if len(w) > 2 and w not in _STOPWORDS}
+
+
+def chunk_text(text: str, chunk_tokens: int) -> list:
+    """Splits text into chunks of roughly `chunk_tokens` tokens on line boundaries."""
+    chunks, current, size = [], [], 0
+    for line in text.splitlines():
+        tokens = estimate_tokens(line) + 1
+        if current and size + tokens > chunk_tokens:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+class HistoryManager:
+    """Builds bounded model prompts from a session's conversation.
+
+    Turns are stored as plain text with their token count; the FIR data is
+    sent once per prompt rather than with every turn. Once the recent turns
+    exceed `recent_tokens`, the oldest are rolled into a running summary by
+    the model (or, failing that, by truncation) in the background. Uploaded
+    documents are kept as references to their text in the content cache and
+    only the chunks sharing distinctive (IDF-weighted) terms with the current
+    message are included, up to `document_tokens`; a freshly uploaded
+    document contributes its opening chunks on the next turn so its details
+    can be extracted.
+    """
+
+    def __init__(self, store, cache, gemini=None, recent_tokens: int = 2000, keep_turns: int = 4,
+                 document_tokens: int = 3000, chunk_tokens: int = 400, summary_words: int = 200):
+        self.store = store
+        self.cache = cache
+        self.gemini = gemini
+        self.recent_tokens = recent_tokens
+        self.keep_turns = keep_turns
+        self.document_tokens = document_tokens
+        self.chunk_tokens = chunk_tokens
+        self.summary_words = summary_words
+        self._locks: dict[str, list] = {}
+        self._chunks = OrderedDict()
+        self._tasks = set()
+
+    @classmethod
+    def from_env(cls, store, cache, gemini=None) -> "HistoryManager":
+        return cls(
+            store,
+            cache,
+            gemini,
+            recent_tokens=int(os.getenv("FIR_HISTORY_RECENT_TOKENS", "2000")),
+            document_tokens=int(os.getenv("FIR_HISTORY_DOCUMENT_TOKENS", "3000")),
+            summary_words=int(os.getenv("FIR_HISTORY_SUMMARY_WORDS", "200")),
+        )
+
+    @asynccontextmanager
+    async def lock(self, session_id: str):
+        """Serializes turns and compaction for one session.
+
+        A session's lock only lives while a turn holds or waits for it, so
+        idle and evicted sessions leave nothing behind.
+        """
+        entry = self._locks.get(session_id)
+        if entry is None:
+            entry = self._locks[session_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[session_id]
+
+    def add_turn(self, session, role: str, text: str):
+        session.add_message(role, text, self.store.max_history, tokens=estimate_tokens(text))
+
+    def record_turn(self, session, user_text: str, response_text: str, prompt_tokens: int = 0, read=()):
+        """Adds a finished exchange to the session, marking the documents its prompt read in full."""
+        self.add_turn(session, "user", user_text)
+        self.add_turn(session, "assistant", response_text)
+        session.record_prompt_tokens(prompt_tokens)
+        for document in session.documents:
+            if document["key"] in read:
+                document["read"] = True
+
+    def attach_document(self, session, name: str, cache_key: str, text: str):
+        """Records an uploaded document by reference and notes it in the conversation."""
+        tokens = estimate_tokens(text)
+        session.documents.append({"name": name, "key": cache_key, "tokens": tokens, "read": False})
+        self.add_turn(session, "user", f"[Uploaded document: {name}, about {tokens} tokens]")
+
+    async def _document_chunks(self, cache_key: str) -> list | None:
+        chunks = self._chunks.get(cache_key)
+        if chunks is None:
+            text = await asyncio.to_thread(self.cache.get, cache_key)
+            if text is None:
+                return None
+            texts = chunk_text(text, self.chunk_tokens)
+            terms = [_terms(chunk) for chunk in texts]
+            frequency = Counter(term for chunk_terms in terms for term in chunk_terms)
+            if len(texts) == 1:
+                # A lone chunk is relevant whenever the message shares a term with it.
+                idf = dict.fromkeys(frequency, 1.0)
+            else:
+                # Terms found in every chunk say nothing about which chunk is relevant.
+                idf = {term: math.log(len(texts) / count) for term, count in frequency.items()}
+            chunks = [
+                (chunk, estimate_tokens(chunk), {term: idf[term] for term in chunk_terms if idf[term] > 0})
+                for chunk, chunk_terms in zip(texts, terms)
+            ]
+            self._chunks[cache_key] = chunks
+            while len(self._chunks) > 16:
+                self._chunks.popitem(last=False)
+        else:
+            self._chunks.move_to_end(cache_key)
+        return chunks
+
+    async def _document_excerpts(self, session, user_text: str) -> tuple[list, list]:
+        budget = self.document_tokens
+        query = _terms(user_text)
+        excerpts, read = [], []
+        for document in session.documents:
+            chunks = await self._document_chunks(document["key"])
+            if chunks is None:
+                excerpts.append(f"({document['name']}: text no longer available; ask the officer to re-upload it)")
+                continue
+            if not document["read"]:
+                picked = range(len(chunks))
+                read.append(document["key"])
+            else:
+                scored = [(sum(weights.get(term, 0) for term in query), i) for i, (_, _, weights) in enumerate(chunks)]
+                picked = sorted(i for score, i in sorted(scored, reverse=True)[:8] if score > 0)
+            for i in picked:
+                chunk, tokens, _ = chunks[i]
+                if tokens > budget:
+                    break
+                excerpts.append(f"({document['name']}, part {i + 1} of {len(chunks)})\n{chunk}")
+                budget -= tokens
+        return excerpts, read
+
+    async def build_messages(self, session, user_text: str, extracted_info: dict | None = None,
+                             hints: dict | None = None) -> tuple[list, int, list]:
+        """Returns the model contents for the user's message, their estimated token count
+        and the keys of the documents read in full.
+
+        `extracted_info` stands in for the session's FIR data when the turn
+        has already changed a copy of it. `hints` are values the fast-path
+        rules read from the message, for the model to confirm or reject.
+        The session is left untouched;
+        pass the count and keys to `record_turn` once the model has answered.
+        """
+        messages = [
+            {"role": "user" if msg["role"] == "user" else "model", "parts": [{"text": msg["content"]}]}
+            for msg in session.history
+        ]
+        sections = []
+        if session.summary:
+            sections.append(f"Summary of the earlier conversation:\n{session.summary}")
+        excerpts, read = await self._document_excerpts(session, user_text)
+        if excerpts:
+            sections.append("Relevant excerpts from uploaded documents:\n" + "\n\n".join(excerpts))
+        sections.append(f"Current FIR Data: {json.dumps(session.extracted_info if extracted_info is None else extracted_info, ensure_ascii=False)}")
+        if hints:
+            sections.append(
+                "Values read from the message by pattern matching (use them only if the message "
+                f"does not negate or correct them): {json.dumps(hints, ensure_ascii=False)}"
+            )
+        sections.append(f"User Message: \"{user_text}\"")
+        prompt = "\n\n".join(sections)
+        messages.append({"role": "user", "parts": [{"text": prompt}]})
+        prompt_tokens = sum(msg.get("tokens", 0) for msg in session.history) + estimate_tokens(prompt)
+        return messages, prompt_tokens, read
+
+    def needs_compaction(self, session) -> bool:
+        return sum(msg.get("tokens", 0) for msg in session.history) > self.recent_tokens
+
+    def compact_later(self, session_id: str):
+        """Rolls old turns into the summary in the background, after the current turn."""
+        task = asyncio.create_task(self._compact(session_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _compact(self, session_id: str):
+        async with self.lock(session_id):
+            session = await asyncio.to_thread(self.store.peek, session_id)
+            cut = self._compaction_cut(session.history) if session else 0
+            if not cut:
+                return
+            rolled = session.history[:cut]
+            try:
+                summary = await self._summarize(session.summary, rolled)
+            except Exception as e:
+                logger.warning("History compaction failed for %s: %s", session_id, e)
+                return
+
+            def apply(current):
+                # Skipped if another worker has compacted this history meanwhile.
+                if current.summary == session.summary and current.history[:cut] == rolled:
+                    current.summary = summary
+                    del current.history[:cut]
+
+            await asyncio.to_thread(self.store.update, session_id, apply)
+
+    def _compaction_cut(self, history: list) -> int:
+        """How many of the oldest turns to roll up so the rest fit in half the budget, or 0."""
+        target = self.recent_tokens // 2
+        total = sum(msg.get("tokens", 0) for msg in history)
+        cut = 0
+        while len(history) - cut > self.keep_turns and total > target:
+            total -= history[cut].get("tokens", 0)
+            cut += 1
+        # Keep the remaining conversation starting on a user turn.
+        while cut < len(history) and history[cut]["role"] != "user":
+            cut += 1
+        return cut if cut < len(history) else 0
+
+    async def compact(self, session):
+        """Moves the oldest turns into the running summary until the rest fit in half the budget."""
+        cut = self._compaction_cut(session.history)
+        if cut:
+            session.summary = await self._summarize(session.summary, session.history[:cut])
+            del session.history[:cut]
+
+    async def _summarize(self, summary: str, turns: list) -> str:
+        transcript = "\n".join(
+            f"{'Officer' if msg['role'] == 'user' else 'Assistant'}: {msg['content']}" for msg in turns
+        )
+        if self.gemini is not None:
+            try:
+                prompt = SUMMARY_PROMPT.format(max_words=self.summary_words, summary=summary or "(none)", turns=transcript)
+                model = self.gemini.route("summary", estimate_tokens(prompt))
+                response = await self.gemini.generate_content(prompt, model=model)
+                if response.text:
+                    return response.text.strip()
+            except Exception as e:
+                logger.warning("Summarizing history with the model failed, truncating instead: %s", e)
+        lines = [summary] if summary else []
+        lines += [line[:160] for line in transcript.splitlines() if line.strip()]
+        words = " ".join(lines).split()
+        return " ".join(words[-self.summary_words:])
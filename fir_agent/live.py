@@ -0,0 +1,144 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+LIVE_MODEL = "gemini-live-2.5-flash-preview"
+PCM_MIME_TYPE = "audio/pcm;rate=16000"
+PCM_BYTES_PER_SECOND = 16000 * 2
+
+LIVE_INSTRUCTION = (
+    "You are listening to an interview between an Investigating Officer and a complainant "
+    "for a First Information Report. Do not answer or comment; the conversation is only being transcribed."
+)
+
+
+class GeminiLiveBackend:
+    """Streams raw 16 kHz PCM to a Gemini Live session and yields transcripts.
+
+    Events are ("partial", text) for each piece of input transcription and
+    ("utterance", text) with the accumulated text once the speaker pauses.
+    """
+
+    def __init__(self, gemini, model: str = LIVE_MODEL):
+        self.gemini = gemini
+        self.model = model
+
+    @asynccontextmanager
+    async def connect(self):
+        await self.gemini.warm_up()
+        from google.genai import types
+
+        config = types.LiveConnectConfig(
+            response_modalities=["TEXT"],
+            input_audio_transcription=types.AudioTranscriptionConfig(),
+            system_instruction=LIVE_INSTRUCTION,
+        )
+        async with self.gemini.aio.live.connect(model=self.model, config=config) as session:
+            yield _GeminiLiveStream(session, types)
+
+
+class _GeminiLiveStream:
+    def __init__(self, session, types):
+        self._session = session
+        self._types = types
+        self._ended = False
+
+    async def send_audio(self, frame: bytes):
+        await self._session.send_realtime_input(
+            audio=self._types.Blob(data=frame, mime_type=PCM_MIME_TYPE)
+        )
+
+    async def end_audio(self):
+        self._ended = True
+        await self._session.send_realtime_input(audio_stream_end=True)
+
+    async def events(self):
+        utterance = []
+        while True:
+            received = False
+            # receive() stops at the end of each model turn, and for good once the session closes.
+            async for message in self._session.receive():
+                received = True
+                content = message.server_content
+                if content is None:
+                    continue
+                transcription = content.input_transcription
+                if transcription and transcription.text:
+                    utterance.append(transcription.text)
+                    yield ("partial", transcription.text)
+                if content.turn_complete and utterance:
+                    yield ("utterance", "".join(utterance).strip())
+                    utterance = []
+            if not received or self._ended:
+                break
+        if utterance:
+            yield ("utterance", "".join(utterance).strip())
+
+
+class FakeLiveBackend:
+    """Local stand-in for a live model, used for tests and benchmarks.
+
+    Emits one scripted word as a partial transcript for every `seconds_per_word`
+    of audio received, and closes an utterance every `words_per_utterance`
+    words or when the audio stream ends.
+    """
+
+    SCRIPT = (
+        "Mera naam Rohan Sharma hai. Main Sector 45 Gurugram mein rehta hoon. "
+        "Kal shaam Cyber City police station ke area mein mera phone chori ho gaya."
+    )
+
+    def __init__(self, seconds_per_word: float = 0.25, words_per_utterance: int = 8):
+        self.bytes_per_word = int(PCM_BYTES_PER_SECOND * seconds_per_word)
+        self.words_per_utterance = words_per_utterance
+
+    @asynccontextmanager
+    async def connect(self):
+        yield _FakeLiveStream(self.SCRIPT.split(), self.bytes_per_word, self.words_per_utterance)
+
+
+class _FakeLiveStream:
+    def __init__(self, words: list, bytes_per_word: int, words_per_utterance: int):
+        self._words = words
+        self._bytes_per_word = bytes_per_word
+        self._words_per_utterance = words_per_utterance
+        self._received = 0
+        self._emitted = 0
+        self._events = asyncio.Queue()
+        self._utterance = []
+
+    async def send_audio(self, frame: bytes):
+        self._received += len(frame)
+        while self._received >= (self._emitted + 1) * self._bytes_per_word:
+            word = self._words[self._emitted % len(self._words)]
+            self._emitted += 1
+            self._utterance.append(word)
+            await self._events.put(("partial", word + " "))
+            if len(self._utterance) >= self._words_per_utterance:
+                await self._flush()
+
+    async def end_audio(self):
+        await self._flush()
+        await self._events.put(None)
+
+    async def _flush(self):
+        if self._utterance:
+            await self._events.put(("utterance", " ".join(self._utterance)))
+            self._utterance = []
+
+    async def events(self):
+        while True:
+            event = await self._events.get()
+            if event is None:
+                return
+            yield event
+
+
+def create_live_backend(gemini):
+    """Builds the live backend selected by FIR_LIVE_BACKEND (gemini or fake)."""
+    backend = os.getenv("FIR_LIVE_BACKEND", "gemini")
+    if backend == "fake":
+        return FakeLiveBackend()
+    if backend == "gemini":
+        return GeminiLiveBackend(gemini, model=os.getenv("FIR_LIVE_MODEL", LIVE_MODEL))
+    raise ValueError(f"Unknown FIR_LIVE_BACKEND: {backend}")
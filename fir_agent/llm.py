@@ -0,0 +1,416 @@
+import asyncio
+import contextlib
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel
+
+from .cache import content_key
+from .history import estimate_tokens
+from .metrics import MODEL_CALLS, MODEL_FIRST_TOKEN_SECONDS, record_stage, record_usage
+from .routing import ROUTED_CALLS, ModelRouter, TokenBudget
+
+if TYPE_CHECKING:
+    from google.genai import types
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+CONTEXT_CACHE_RETRY_AFTER = 300
+# Gemini rejects explicit caches smaller than this (the 2.5 Flash minimum).
+CONTEXT_CACHE_MIN_TOKENS = 1024
+# Budget reservations for what an estimate cannot see: the reply, and uploaded files.
+OUTPUT_TOKEN_ESTIMATE = 500
+FILE_TOKEN_ESTIMATE = 2000
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=64)
+def _schema_json(model: type) -> str:
+    # Generating a JSON schema takes milliseconds; response schemas are fixed classes.
+    return json.dumps(model.model_json_schema(), sort_keys=True)
+
+
+def _jsonable(value):
+    if isinstance(value, BaseModel):
+        return {name: _jsonable(v) for name, v in value if v is not None}
+    if isinstance(value, type) and issubclass(value, BaseModel):
+        return _schema_json(value)
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, bytes):
+        return hashlib.sha256(value).hexdigest()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return repr(value)
+
+
+def response_key(model: str, contents, config) -> str:
+    """Cache key for a model call: a hash of the model, contents and config."""
+    payload = json.dumps([model, _jsonable(contents), _jsonable(config)], sort_keys=True, ensure_ascii=False)
+    return content_key("response", hashlib.sha256(payload.encode("utf-8")).hexdigest())
+
+
+def estimate_input_tokens(contents) -> int:
+    """Estimated prompt tokens of generate_content contents (text, messages, parts or files)."""
+    if contents is None:
+        return 0
+    if isinstance(contents, str):
+        return estimate_tokens(contents)
+    if isinstance(contents, (list, tuple)):
+        return sum(estimate_input_tokens(item) for item in contents)
+    if isinstance(contents, dict):
+        return estimate_input_tokens(contents.get("parts", contents.get("text")))
+    text = getattr(contents, "text", None)
+    if isinstance(text, str):
+        return estimate_tokens(text)
+    parts = getattr(contents, "parts", None)
+    if parts is not None:
+        return estimate_input_tokens(parts)
+    return FILE_TOKEN_ESTIMATE
+
+
+def _cacheable(response) -> bool:
+    from google.genai import types
+
+    candidates = response.candidates or []
+    return bool(candidates) and candidates[0].finish_reason in (None, types.FinishReason.STOP) and bool(response.text)
+
+
+class GeminiClient:
+    """App-lifetime async Gemini client with a bounded number of in-flight calls.
+
+    A single underlying httpx pool is reused for every request; transient
+    failures (429/5xx, connection resets) are retried with exponential backoff.
+
+    With a `response_cache`, successful replies are stored under a hash of
+    the model, contents and config and identical calls are answered from
+    it; identical calls made while one is in flight share its result. With
+    `tokens_per_minute`, each model's calls draw on a per-minute token
+    budget and queue for up to `max_queue_wait` seconds when it is spent,
+    then fail fast with ModelBusy.
+
+    Importing google-genai takes most of a second, so the genai client is
+    built on first use, or ahead of it, off the event loop, by `warm_up`.
+    """
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        base_url: str | None = None,
+        max_concurrency: int = 16,
+        timeout: float = 60.0,
+        max_retries: int = 3,
+        initial_backoff: float = 0.5,
+        max_backoff: float = 8.0,
+        context_cache: bool = True,
+        context_cache_ttl: int = 3600,
+        context_cache_min_tokens: int = CONTEXT_CACHE_MIN_TOKENS,
+        router: ModelRouter | None = None,
+        response_cache=None,
+        tokens_per_minute: int = 0,
+        max_queue_wait: float = 10.0,
+    ):
+        self._client_args = {
+            "api_key": api_key,
+            "base_url": base_url,
+            "timeout": timeout,
+            "max_retries": max_retries,
+            "initial_backoff": initial_backoff,
+            "max_backoff": max_backoff,
+        }
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight = 0
+        self.max_concurrency = max_concurrency
+        self.context_cache = context_cache
+        self.context_cache_ttl = context_cache_ttl
+        self.context_cache_min_tokens = context_cache_min_tokens
+        self._context_caches: dict[tuple, tuple] = {}
+        self._context_cache_lock = asyncio.Lock()
+        self.router = router or ModelRouter()
+        self.response_cache = response_cache
+        self.tokens_per_minute = tokens_per_minute
+        self.max_queue_wait = max_queue_wait
+        self._budgets: dict[str, TokenBudget] = {}
+        self._in_flight_calls: dict[str, asyncio.Future] = {}
+
+    @classmethod
+    def from_env(cls, response_cache=None) -> "GeminiClient":
+        """Builds a client from GOOGLE_API_KEY and the GEMINI_* tuning variables.
+
+        `response_cache` is only used when GEMINI_RESPONSE_CACHE is not 0.
+        """
+        return cls(
+            api_key=os.getenv("GOOGLE_API_KEY"),
+            base_url=os.getenv("GEMINI_BASE_URL"),
+            max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "16")),
+            timeout=float(os.getenv("GEMINI_TIMEOUT", "60")),
+            max_retries=int(os.getenv("GEMINI_MAX_RETRIES", "3")),
+            context_cache=os.getenv("GEMINI_CONTEXT_CACHE", "1") != "0",
+            context_cache_ttl=int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600")),
+            context_cache_min_tokens=int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", str(CONTEXT_CACHE_MIN_TOKENS))),
+            router=ModelRouter.from_env(),
+            response_cache=response_cache if os.getenv("GEMINI_RESPONSE_CACHE", "1") != "0" else None,
+            tokens_per_minute=int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000")),
+            max_queue_wait=float(os.getenv("GEMINI_MAX_QUEUE_WAIT", "10")),
+        )
+
+    def _build_client(self):
+        with self._client_lock:
+            if self._client is None:
+                import httpx
+                from google import genai
+                from google.genai import types
+
+                args = self._client_args
+                http_options = types.HttpOptions(
+                    base_url=args["base_url"],
+                    timeout=int(args["timeout"] * 1000),
+                    retry_options=types.HttpRetryOptions(
+                        attempts=args["max_retries"] + 1,
+                        initial_delay=args["initial_backoff"],
+                        max_delay=args["max_backoff"],
+                    ),
+                    async_client_args={
+                        "limits": httpx.Limits(
+                            max_connections=self.max_concurrency,
+                            max_keepalive_connections=self.max_concurrency,
+                        ),
+                    },
+                )
+                self._client = genai.Client(api_key=args["api_key"], http_options=http_options)
+        return self._client
+
+    async def warm_up(self):
+        """Imports google-genai and builds the client in a worker thread."""
+        if self._client is None:
+            await asyncio.to_thread(self._build_client)
+
+    @property
+    def aio(self):
+        """The underlying genai async client, for APIs not wrapped here."""
+        return (self._client or self._build_client()).aio
+
+    @property
+    def in_flight(self) -> int:
+        """Number of model calls currently holding a concurrency slot."""
+        return self._in_flight
+
+    def route(self, task: str, input_tokens: int = 0, message_tokens: int | None = None) -> str:
+        """The model for a call of this task and input size; see ModelRouter."""
+        tier = self.router.tier(task, input_tokens, message_tokens)
+        ROUTED_CALLS.inc(task=task, tier=tier)
+        return self.router.models[tier]
+
+    def budget_used(self) -> int:
+        """Tokens spent in the last minute, summed over models."""
+        return sum(budget.used() for budget in self._budgets.values())
+
+    async def _reserve(self, model: str, contents, config) -> tuple:
+        if not self.tokens_per_minute:
+            return None, None
+        budget = self._budgets.get(model)
+        if budget is None:
+            budget = self._budgets[model] = TokenBudget(self.tokens_per_minute, self.max_queue_wait)
+        tokens = estimate_input_tokens(contents) + estimate_input_tokens(getattr(config, "system_instruction", None))
+        tokens += getattr(config, "max_output_tokens", None) or OUTPUT_TOKEN_ESTIMATE
+        start = time.perf_counter()
+        try:
+            entry = await budget.acquire(tokens)
+        except Exception:
+            MODEL_CALLS.inc(outcome="shed")
+            raise
+        waited = time.perf_counter() - start
+        if waited > 0.001:
+            record_stage("model_queue", waited)
+        return budget, entry
+
+    @staticmethod
+    def _settle(budget, entry, usage):
+        total = getattr(usage, "total_token_count", None)
+        if budget is not None and total:
+            budget.settle(entry, total)
+
+    async def _cached_response(self, key: str):
+        data = await asyncio.to_thread(self.response_cache.get, key)
+        if data is None:
+            return None
+        from google.genai import types
+
+        return types.GenerateContentResponse.model_validate_json(data)
+
+    async def _store_response(self, key: str, response):
+        if _cacheable(response):
+            await asyncio.to_thread(self.response_cache.put, key, response.model_dump_json(exclude_none=True))
+
+    async def system_config(self, system_instruction: str, model: str = DEFAULT_MODEL, **config) -> "types.GenerateContentConfig":
+        """Builds a generation config carrying the system prompt.
+
+        The prompt is stored once with Gemini context caching and referenced
+        by name, so its input tokens are not re-sent every turn. A prompt
+        estimated below `context_cache_min_tokens`, which Gemini would refuse
+        to cache, is sent inline without asking; so is any prompt when caching
+        is disabled or the cache could not be created.
+        """
+        await self.warm_up()
+        from google.genai import types
+
+        cacheable = self.context_cache and estimate_tokens(system_instruction) >= self.context_cache_min_tokens
+        cache_name = await self._context_cache(system_instruction, model) if cacheable else None
+        if cache_name:
+            return types.GenerateContentConfig(cached_content=cache_name, **config)
+        return types.GenerateContentConfig(system_instruction=system_instruction, **config)
+
+    async def _context_cache(self, system_instruction: str, model: str) -> str | None:
+        key = (model, hashlib.sha256(system_instruction.encode("utf-8")).hexdigest())
+        entry = self._context_caches.get(key)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+        async with self._context_cache_lock:
+            entry = self._context_caches.get(key)
+            if entry and entry[1] > time.monotonic():
+                return entry[0]
+            from google.genai import types
+
+            try:
+                cache = await self._client.aio.caches.create(
+                    model=model,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=system_instruction,
+                        display_name="fir-system-prompt",
+                        ttl=f"{self.context_cache_ttl}s",
+                    ),
+                )
+                # Refresh a minute early so a turn never references an expired cache.
+                entry = (cache.name, time.monotonic() + max(self.context_cache_ttl - 60, 1))
+            except Exception as e:
+                logger.warning("Context caching unavailable, sending system prompt inline: %s", e)
+                entry = (None, time.monotonic() + CONTEXT_CACHE_RETRY_AFTER)
+            self._context_caches[key] = entry
+            return entry[0]
+
+    async def generate_content(self, contents, model: str = DEFAULT_MODEL, config=None, cache: bool = True):
+        """Calls generate_content without blocking the event loop.
+
+        `cache=False` skips the response cache and coalescing, for calls
+        whose contents never repeat (such as freshly uploaded files).
+        """
+        if not cache or self.response_cache is None:
+            return await self._generate(contents, model, config, None)
+        key = response_key(model, contents, config)
+        running = self._in_flight_calls.get(key)
+        if running is not None:
+            MODEL_CALLS.inc(outcome="coalesced")
+            return await asyncio.shield(running)
+        cached = await self._cached_response(key)
+        if cached is not None:
+            MODEL_CALLS.inc(outcome="cache_hit")
+            return cached
+        running = self._in_flight_calls.get(key)
+        if running is None:
+            running = asyncio.ensure_future(self._generate(contents, model, config, key))
+            self._in_flight_calls[key] = running
+            running.add_done_callback(lambda task: self._call_done(key, task))
+        else:
+            MODEL_CALLS.inc(outcome="coalesced")
+        return await asyncio.shield(running)
+
+    def _call_done(self, key: str, task: asyncio.Future):
+        self._in_flight_calls.pop(key, None)
+        # Every caller may have given up; don't let the error go unreported.
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug("Shared model call failed: %s", task.exception())
+
+    @contextlib.asynccontextmanager
+    async def _slot(self):
+        async with self._semaphore:
+            self._in_flight += 1
+            try:
+                yield
+            finally:
+                self._in_flight -= 1
+
+    async def _generate(self, contents, model: str, config, key: str | None):
+        await self.warm_up()
+        budget, entry = await self._reserve(model, contents, config)
+        async with self._slot():
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                response = await self._client.aio.models.generate_content(
+                    model=model, contents=contents, config=config
+                )
+                outcome = "ok"
+            finally:
+                record_stage("model_call", time.perf_counter() - start)
+                MODEL_CALLS.inc(outcome=outcome)
+        record_usage(response.usage_metadata)
+        self._settle(budget, entry, response.usage_metadata)
+        if key is not None:
+            await self._store_response(key, response)
+        return response
+
+    async def generate_content_stream(self, contents, model: str = DEFAULT_MODEL, config=None, cache: bool = True):
+        """Yields response chunks as the model produces them.
+
+        A reply found in the response cache is yielded as a single chunk.
+        """
+        key = response_key(model, contents, config) if cache and self.response_cache is not None else None
+        if key is not None:
+            cached = await self._cached_response(key)
+            if cached is not None:
+                MODEL_CALLS.inc(outcome="cache_hit")
+                yield cached
+                return
+        await self.warm_up()
+        budget, entry = await self._reserve(model, contents, config)
+        async with self._slot():
+            start = time.perf_counter()
+            outcome = "error"
+            first = True
+            usage = None
+            text, last = [], None
+            try:
+                stream = await self._client.aio.models.generate_content_stream(
+                    model=model, contents=contents, config=config
+                )
+                async for chunk in stream:
+                    if first:
+                        MODEL_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start)
+                        first = False
+                    # Usage is cumulative; the last chunk carries the totals.
+                    usage = chunk.usage_metadata or usage
+                    if key is not None:
+                        text.append(chunk.text or "")
+                        last = chunk
+                    yield chunk
+                outcome = "ok"
+            finally:
+                record_stage("model_call", time.perf_counter() - start)
+                MODEL_CALLS.inc(outcome=outcome)
+                record_usage(usage)
+                self._settle(budget, entry, usage)
+        if key is not None and last is not None:
+            from google.genai import types
+
+            finish_reason = last.candidates[0].finish_reason if last.candidates else None
+            await self._store_response(key, types.GenerateContentResponse(
+                candidates=[types.Candidate(
+                    content=types.Content(role="model", parts=[types.Part(text="".join(text))]),
+                    finish_reason=finish_reason,
+                )],
+                usage_metadata=usage,
+            ))
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aio.aclose()
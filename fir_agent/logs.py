@@ -0,0 +1,85 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import time
+
+from .metrics import request_id
+
+_listener = None
+
+
+def sampled(**data) -> dict:
+    """`extra` for a per-request log record kept at FIR_LOG_SAMPLE_RATE: `data` becomes top-level keys of the JSON line."""
+    return {"data": data, "sampled": True}
+
+
+class _ContextFilter(logging.Filter):
+    """Runs in the thread that logs, before the record is queued for the
+    listener thread: drops unsampled per-request records and stamps the
+    request ID, which is only visible in the caller's context."""
+
+    def __init__(self, sample_rate: float):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "sampled", False) and record.levelno < logging.WARNING and random.random() >= self.sample_rate:
+            return False
+        record.request_id = request_id()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update(getattr(record, "data", None) or {})
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        if getattr(record, "request_id", None):
+            line += f" request_id={record.request_id}"
+        for key, value in (getattr(record, "data", None) or {}).items():
+            line += f" {key}={json.dumps(value, ensure_ascii=False, default=str)}"
+        return line
+
+
+def configure_logging():
+    """Routes the root logger through a queue to a background writer thread.
+
+    Callers only enqueue records, so a slow terminal or log pipe never
+    blocks the event loop. FIR_LOG_LEVEL sets the level, FIR_LOG_FORMAT
+    chooses `json` (default) or `text` lines, and FIR_LOG_SAMPLE_RATE the
+    fraction of per-request records kept; warnings and errors always are.
+    Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    output = logging.StreamHandler()
+    output.setFormatter(TextFormatter() if os.getenv("FIR_LOG_FORMAT", "json") == "text" else JSONFormatter())
+    records = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(records)
+    handler.addFilter(_ContextFilter(float(os.getenv("FIR_LOG_SAMPLE_RATE", "0.1"))))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(os.getenv("FIR_LOG_LEVEL", "INFO").upper())
+    # One INFO line per outbound HTTP call would bypass sampling entirely.
+    for noisy in ("httpx", "google_genai.models"):
+        logging.getLogger(noisy).setLevel(logging.WARNING)
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,233 @@
+import bisect
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+logger = logging.getLogger(__name__)
+
+# The trace of the request being handled: its ID and the time spent in each stage.
+_trace: contextvars.ContextVar = contextvars.ContextVar("fir_trace", default=None)
+
+
+def _label_key(names: tuple, labels: dict) -> tuple:
+    return tuple(str(labels.get(name, "")) for name in names)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values) if v != ""]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labels, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {value:g}" for key, value in items]
+
+
+class Gauge:
+    """A value read from a callback at scrape time, such as a queue depth."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read=None):
+        self.name, self.help, self.read = name, help, read
+
+    def samples(self):
+        if self.read is None:
+            return []
+        try:
+            return [f"{self.name} {float(self.read()):g}"]
+        except Exception:
+            return []
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labels, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _format_labels(self.labels, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    """Process-wide metrics rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _add(self, metric):
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name: str, help: str, read=None) -> Gauge:
+        """Registers (or re-points) a gauge read from `read()` at scrape time."""
+        gauge = self._add(Gauge(name, help))
+        gauge.read = read
+        return gauge
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram(
+    "fir_request_duration_seconds", "HTTP request latency, until the last body byte is sent.", ("route", "method", "status")
+)
+STAGE_SECONDS = registry.histogram("fir_stage_duration_seconds", "Time spent in each processing stage.", ("stage",))
+MODEL_FIRST_TOKEN_SECONDS = registry.histogram(
+    "fir_model_first_token_seconds", "Time from a streamed model call to its first chunk."
+)
+MODEL_TOKENS = registry.counter("fir_model_tokens_total", "Tokens reported by Gemini usage metadata.", ("kind",))
+MODEL_CALLS = registry.counter("fir_model_calls_total", "Gemini generate calls by outcome.", ("outcome",))
+PROMPT_TOKENS = registry.histogram(
+    "fir_chat_prompt_tokens", "Estimated prompt tokens per chat turn.", buckets=TOKEN_BUCKETS
+)
+CHAT_TURNS = registry.counter("fir_chat_turns_total", "Chat turns by how they were answered.", ("answered_by",))
+UPLOADS = registry.counter("fir_storage_uploads_total", "Storage uploads by outcome.", ("outcome",))
+
+
+def new_trace(request_id: str | None = None) -> dict:
+    """Starts the trace for the current request and returns it."""
+    trace = {"request_id": request_id or uuid.uuid4().hex[:16], "stages": {}}
+    _trace.set(trace)
+    return trace
+
+
+def current_trace() -> dict | None:
+    return _trace.get()
+
+
+def request_id() -> str | None:
+    trace = _trace.get()
+    return trace["request_id"] if trace else None
+
+
+def record_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    trace = _trace.get()
+    if trace is not None:
+        stages = trace["stages"]
+        stages[stage] = round(stages.get(stage, 0.0) + seconds * 1000, 2)
+
+
+@contextmanager
+def stage(name: str):
+    """Times a block as one stage of the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def record_usage(usage):
+    """Counts the prompt, cached, output and thinking tokens of a Gemini response."""
+    if usage is None:
+        return
+    for kind, attr in (("prompt", "prompt_token_count"), ("cached", "cached_content_token_count"),
+                       ("output", "candidates_token_count"), ("thinking", "thoughts_token_count")):
+        value = getattr(usage, attr, None)
+        if value:
+            MODEL_TOKENS.inc(value, kind=kind)
+
+
+class TracingMiddleware:
+    """ASGI middleware that times each HTTP request and gives it a trace.
+
+    The request ID comes from an incoming X-Request-ID header or is
+    generated, and is echoed in the response. Stage timings recorded while
+    the request is handled, including in tasks it starts, land in its trace
+    and are logged (sampled) with the total once the last body byte is sent,
+    so streamed responses are timed to completion.
+    """
+
+    def __init__(self, app, skip_prefixes: tuple = ("/metrics", "/static")):
+        self.app = app
+        self.skip_prefixes = skip_prefixes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.skip_prefixes):
+            await self.app(scope, receive, send)
+            return
+        incoming = dict(scope["headers"]).get(b"x-request-id")
+        trace = new_trace(incoming.decode("latin-1")[:64] if incoming else None)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", trace["request_id"].encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            REQUEST_SECONDS.observe(elapsed, route=path, method=scope["method"], status=status)
+            logger.info("request", extra={"sampled": True, "data": {
+                "route": path, "method": scope["method"], "status": status,
+                "duration_ms": round(elapsed * 1000, 2), "stages_ms": trace["stages"],
+            }})
@@ -0,0 +1,266 @@
+import asyncio
+import contextlib
+import hashlib
+import logging
+import mmap
+import multiprocessing
+import os
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .cache import content_key
+from .metrics import stage
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+SUPPORTED_EXTENSIONS = (".pdf", ".docx")
+DOCX_PARAGRAPHS_PER_BLOCK = 50
+
+logger = logging.getLogger(__name__)
+
+
+def parse_limits() -> tuple[int, int]:
+    """The page and character caps on parsed documents, from FIR_PARSE_MAX_PAGES and FIR_PARSE_MAX_CHARS."""
+    return int(os.getenv("FIR_PARSE_MAX_PAGES", "500")), int(os.getenv("FIR_PARSE_MAX_CHARS", "2000000"))
+
+
+def document_cache_key(digest: str, max_pages: int, max_chars: int) -> str:
+    # Every parsing path keys on both caps, so they all share cached text.
+    return content_key("document", digest, max_pages, max_chars)
+
+
+class DocumentError(Exception):
+    """A document could not be accepted or parsed; the message is user-facing."""
+
+
+class DocumentTooLarge(DocumentError):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Error: File is larger than the {max_bytes / (1024 * 1024):g} MB upload limit.")
+
+
+async def save_upload(upload, directory: Path, max_bytes: int) -> tuple[Path, str]:
+    """Streams an UploadFile to a unique path in `directory`, enforcing a size cap.
+
+    Returns the path and the SHA-256 of the content. The original filename only
+    contributes its extension, so concurrent uploads of the same name never
+    overwrite each other.
+    """
+    suffix = Path(upload.filename or "").suffix.lower()
+    fd, name = tempfile.mkstemp(dir=directory, suffix=suffix)
+    path = Path(name)
+    written = 0
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise DocumentTooLarge(max_bytes)
+                digest.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path, digest.hexdigest()
+
+
+# Worker-process state: recently opened PDFs, so consecutive page batches of
+# the same document reuse one parsed cross-reference table. The file itself
+# is only mapped while a task reads it, so a worker never pins an upload that
+# has since been deleted.
+_open_pdfs = OrderedDict()
+_OPEN_PDF_LIMIT = 4
+
+
+@contextlib.contextmanager
+def _pdf_reader(path: str):
+    for key in [key for key in _open_pdfs if not os.path.exists(key[0])]:
+        del _open_pdfs[key]
+    key = (path, os.stat(path).st_mtime_ns)
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        reader = _open_pdfs.get(key)
+        if reader is None:
+            from PyPDF2 import PdfReader
+
+            reader = _open_pdfs[key] = PdfReader(data)
+            while len(_open_pdfs) > _OPEN_PDF_LIMIT:
+                _open_pdfs.popitem(last=False)
+        else:
+            reader.stream = data
+            _open_pdfs.move_to_end(key)
+        yield reader
+    finally:
+        data.close()
+
+
+def release_pdf(path: str):
+    """Drops this worker's cached readers of `path`."""
+    for key in [key for key in _open_pdfs if key[0] == path]:
+        del _open_pdfs[key]
+
+
+def pdf_page_count(path: str) -> int:
+    with _pdf_reader(path) as reader:
+        return len(reader.pages)
+
+
+def extract_pdf_pages(path: str, start: int, end: int) -> list:
+    """Returns the text of pages [start, end) of a PDF."""
+    with _pdf_reader(path) as reader:
+        return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def warm_up():
+    """Imports the PDF and DOCX libraries in a worker process."""
+    import docx
+    import PyPDF2
+
+    return os.getpid()
+
+
+def extract_docx_blocks(path: str, max_blocks: int) -> list:
+    """Returns DOCX paragraphs grouped into page-sized blocks of text."""
+    import docx
+
+    document = docx.Document(path)
+    blocks, current = [], []
+    for paragraph in document.paragraphs:
+        current.append(paragraph.text)
+        if len(current) >= DOCX_PARAGRAPHS_PER_BLOCK:
+            blocks.append("\n".join(current))
+            current = []
+            if len(blocks) >= max_blocks:
+                return blocks
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def extract_text(path: Path, max_pages: int, max_chars: int) -> str:
+    """Extracts a document's text in this process; the same text DocumentParser.parse returns."""
+    if path.suffix.lower() == ".pdf":
+        pages = extract_pdf_pages(str(path), 0, min(pdf_page_count(str(path)), max_pages))
+    else:
+        pages = extract_docx_blocks(str(path), max_pages)
+    parts, chars = [], 0
+    for text in pages:
+        chars += len(text)
+        if chars > max_chars:
+            break
+        if text:
+            parts.append(text)
+    return "\n".join(parts).strip()
+
+
+class DocumentParser:
+    """Extracts document text in a process pool and yields it page by page.
+
+    PDF pages are split into batches of `pages_per_task` that run in parallel
+    across the pool; results are yielded in page order as soon as each batch is
+    done. Documents are capped at `max_pages` pages and `max_chars` characters
+    of text, so a huge case file can neither exhaust memory nor monopolise the
+    workers.
+    """
+
+    def __init__(self, workers: int = 2, max_pages: int = 500, max_chars: int = 2_000_000,
+                 max_bytes: int = 50 * 1024 * 1024, pages_per_task: int = 16):
+        self.workers = workers
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.max_bytes = max_bytes
+        self.pages_per_task = pages_per_task
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    @classmethod
+    def from_env(cls) -> "DocumentParser":
+        max_pages, max_chars = parse_limits()
+        return cls(
+            workers=int(os.getenv("FIR_PARSE_WORKERS", str(min(4, os.cpu_count() or 1)))),
+            max_pages=max_pages,
+            max_chars=max_chars,
+            max_bytes=int(os.getenv("FIR_UPLOAD_MAX_BYTES", str(50 * 1024 * 1024))),
+        )
+
+    def cache_key(self, digest: str) -> str:
+        """Content-cache key of a document's text under this parser's caps."""
+        return document_cache_key(digest, self.max_pages, self.max_chars)
+
+    async def warm_up(self):
+        """Starts the worker processes and loads the parsing libraries in each."""
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(
+            *(loop.run_in_executor(self._executor, warm_up) for _ in range(self.workers))
+        )
+        logger.info("Document parser pool warm: %d workers", len(set(pids)))
+
+    async def iter_pages(self, path: Path):
+        """Yields the text of each page (or DOCX block) in document order."""
+        ext = path.suffix.lower()
+        if ext not in SUPPORTED_EXTENSIONS:
+            raise DocumentError("Error: Unsupported file type. Please upload a PDF or DOCX file.")
+        if path.stat().st_size > self.max_bytes:
+            raise DocumentTooLarge(self.max_bytes)
+        loop = asyncio.get_running_loop()
+        chars = 0
+        if ext == ".pdf":
+            pages = self._iter_pdf_batches(loop, str(path))
+        else:
+            pages = self._iter_docx_blocks(loop, str(path))
+        async with contextlib.aclosing(pages):
+            async for text in pages:
+                chars += len(text)
+                if chars > self.max_chars:
+                    logger.info("Stopping extraction of %s at the %d character limit", path.name, self.max_chars)
+                    return
+                yield text
+
+    async def _iter_pdf_batches(self, loop, path: str):
+        count = await loop.run_in_executor(self._executor, pdf_page_count, path)
+        if count > self.max_pages:
+            logger.info("Extracting the first %d of %d pages from %s", self.max_pages, count, path)
+            count = self.max_pages
+        ranges = [(start, min(start + self.pages_per_task, count))
+                  for start in range(0, count, self.pages_per_task)]
+        in_flight = []
+        next_range = 0
+        try:
+            while next_range < len(ranges) or in_flight:
+                # Keep a bounded window of batches running ahead of the consumer.
+                while next_range < len(ranges) and len(in_flight) < self.workers * 2:
+                    start, end = ranges[next_range]
+                    in_flight.append(loop.run_in_executor(self._executor, extract_pdf_pages, path, start, end))
+                    next_range += 1
+                for text in await in_flight.pop(0):
+                    yield text
+        finally:
+            for future in in_flight:
+                future.cancel()
+            # Any worker may have the document cached. Ask the pool to drop it without
+            # waiting; a worker this misses drops it on its next task, once it is deleted.
+            with contextlib.suppress(RuntimeError):  # the pool is shutting down
+                for _ in range(self.workers):
+                    self._executor.submit(release_pdf, path)
+
+    async def _iter_docx_blocks(self, loop, path: str):
+        blocks = await loop.run_in_executor(self._executor, extract_docx_blocks, path, self.max_pages)
+        for block in blocks:
+            yield block
+
+    async def parse(self, path: Path) -> str:
+        """Returns the document's text, or raises DocumentError if none could be extracted."""
+        with stage("document_parse"):
+            parts = [text async for text in self.iter_pages(path) if text]
+        text = "\n".join(parts).strip()
+        if not text:
+            if path.suffix.lower() == ".pdf":
+                raise DocumentError("Error: Could not extract any text from the PDF. It might be scanned images.")
+            raise DocumentError("Error: Could not extract any text from the DOCX.")
+        return text
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .assets import FONT_NAME, StaticAssets
+from .metrics import stage
+from .templates import APP_DIR, registry as templates
+
+STATIC_DIR = APP_DIR / "static"
+
+logger = logging.getLogger(__name__)
+
+# Registers the bundled Devanagari font once per renderer and keeps it as a
+# per-glyph fallback after the template's own font stacks. The font is the
+# subset one from the asset build when that build is current.
+FONT_CSS = """
+@font-face {
+    font-family: "Noto Sans Devanagari";
+    src: url("%s");
+}
+body { font-family: sans-serif, "Noto Sans Devanagari"; }
+.t { font-family: 'Times New Roman', Times, serif, "Noto Sans Devanagari"; }
+"""
+
+
+class RenderQueueFull(Exception):
+    """Raised when too many PDFs are already waiting to be rendered."""
+
+
+class _Renderer:
+    """WeasyPrint state kept warm for the life of a process."""
+
+    def __init__(self):
+        from weasyprint import CSS, HTML
+        from weasyprint.text.fonts import FontConfiguration
+
+        self._HTML = HTML
+        self._CSS = CSS
+        self.font_config = FontConfiguration()
+        font_path = StaticAssets.from_env().file_path(FONT_NAME).resolve()
+        self.font_css = CSS(string=FONT_CSS % font_path.as_uri(), base_url=str(STATIC_DIR), font_config=self.font_config)
+        self._template = None
+        self._stylesheets = []
+
+    def _compiled_stylesheets(self, template) -> list:
+        if template is not self._template:
+            self._stylesheets = [
+                self._CSS(string=css, base_url=str(STATIC_DIR), font_config=self.font_config)
+                for css in template.styles
+            ] + [self.font_css]
+            self._template = template
+        return self._stylesheets
+
+    def render(self, fir_data: dict) -> bytes:
+        template = templates.html_template
+        stylesheets = self._compiled_stylesheets(template)
+        html = template.render(fir_data, include_styles=False)
+        return self._HTML(string=html, base_url=str(STATIC_DIR)).write_pdf(
+            stylesheets=stylesheets, font_config=self.font_config
+        )
+
+
+_renderer = None
+
+
+def _get_renderer() -> _Renderer:
+    global _renderer
+    if _renderer is None:
+        _renderer = _Renderer()
+    return _renderer
+
+
+def _init_worker():
+    try:
+        _get_renderer()
+    except Exception as e:
+        logger.error("PDF renderer failed to initialize: %s", e)
+
+
+def warm_up():
+    """Loads WeasyPrint, fonts and stylesheets, then renders a throwaway page."""
+    _get_renderer().render({"district": "प्रथम सूचना रिपोर्ट"})
+    return os.getpid()
+
+
+def render_pdf(fir_data: dict) -> bytes:
+    """Renders a FIR to PDF bytes using this process's warm renderer."""
+    return _get_renderer().render(fir_data)
+
+
+class RenderPool:
+    """Process pool of pre-warmed PDF renderers with a bounded backlog.
+
+    At most `max_pending` renders may be queued or running; further callers
+    wait up to `queue_timeout` seconds for a slot and then get RenderQueueFull,
+    so a burst of submissions sheds load instead of piling up.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 8, queue_timeout: float = 5.0):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_pending)
+        self._pending = 0
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+
+    @classmethod
+    def from_env(cls) -> "RenderPool":
+        workers = int(os.getenv("FIR_PDF_WORKERS", str(min(2, os.cpu_count() or 1))))
+        return cls(
+            workers=workers,
+            max_pending=int(os.getenv("FIR_PDF_MAX_PENDING", str(workers * 4))),
+            queue_timeout=float(os.getenv("FIR_PDF_QUEUE_TIMEOUT", "5")),
+        )
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def warm_up(self):
+        """Starts every worker process and renders a page in each."""
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(
+            *(loop.run_in_executor(self._executor, warm_up) for _ in range(self.workers))
+        )
+        logger.info("PDF render pool warm: %d workers", len(set(pids)))
+
+    async def render(self, fir_data: dict) -> bytes:
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise RenderQueueFull(
+                f"PDF render queue is full ({self.max_pending} pending); try again shortly"
+            ) from None
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            with stage("pdf_render"):
+                return await loop.run_in_executor(self._executor, render_pdf, fir_data)
+        finally:
+            self._pending -= 1
+            self._slots.release()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
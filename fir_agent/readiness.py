@@ -0,0 +1,59 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """Background warm-up of the app's subsystems, reported by /ready.
+
+    Each subsystem is "warming" until its warm-up coroutine returns, then
+    "ready", or "failed" if it raised. Subsystems still load on first use,
+    so a request that arrives before its subsystem is warm only waits for
+    the part it needs.
+    """
+
+    def __init__(self):
+        self._status: dict[str, str] = {}
+        self._seconds: dict[str, float] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def start(self, name: str, warm_up):
+        """Runs the `warm_up` awaitable in the background as subsystem `name`."""
+        self._status[name] = "warming"
+        task = asyncio.ensure_future(self._run(name, warm_up))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, name: str, warm_up):
+        started = time.perf_counter()
+        try:
+            await warm_up
+        except Exception:
+            self._status[name] = "failed"
+            logger.exception("Warm-up of %s failed", name)
+        else:
+            self._status[name] = "ready"
+            logger.info("%s warm in %.2fs", name, time.perf_counter() - started)
+        finally:
+            self._seconds[name] = time.perf_counter() - started
+
+    @property
+    def ready(self) -> bool:
+        return all(status == "ready" for status in self._status.values())
+
+    def status(self) -> dict:
+        return {
+            name: {"status": status, "seconds": round(self._seconds[name], 3) if name in self._seconds else None}
+            for name, status in self._status.items()
+        }
+
+    async def wait(self):
+        """Waits until every warm-up has finished, successfully or not."""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def cancel(self):
+        for task in self._tasks:
+            task.cancel()
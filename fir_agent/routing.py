@@ -0,0 +1,129 @@
+import asyncio
+import os
+import time
+from collections import deque
+
+from .metrics import registry
+
+DEFAULT_MODELS = {
+    "lite": "gemini-2.5-flash-lite",
+    "standard": "gemini-2.5-flash",
+}
+
+ROUTED_CALLS = registry.counter("fir_model_routed_total", "Model calls by task and chosen tier.", ("task", "tier"))
+
+
+class ModelBusy(Exception):
+    """Raised when a model call cannot get its tokens within the queueing limit."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Model token budget exhausted; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class ModelRouter:
+    """Picks a model tier for each call from its task and input size.
+
+    History summaries, short chat messages on a small prompt and small
+    document extractions go to the lite tier; everything else, including
+    audio transcription, to the standard tier. Extractions of at least
+    `large_input_tokens` go to the large tier, which is the standard model
+    unless FIR_MODEL_LARGE names another.
+    """
+
+    def __init__(self, models: dict | None = None, short_message_tokens: int = 40,
+                 lite_prompt_tokens: int = 4000, large_input_tokens: int = 200_000):
+        models = {**DEFAULT_MODELS, **(models or {})}
+        models.setdefault("large", models["standard"])
+        self.models = models
+        self.short_message_tokens = short_message_tokens
+        self.lite_prompt_tokens = lite_prompt_tokens
+        self.large_input_tokens = large_input_tokens
+
+    @classmethod
+    def from_env(cls) -> "ModelRouter":
+        models = {
+            tier: os.getenv(f"FIR_MODEL_{tier.upper()}")
+            for tier in ("lite", "standard", "large")
+        }
+        return cls(
+            models={tier: model for tier, model in models.items() if model},
+            short_message_tokens=int(os.getenv("FIR_ROUTE_SHORT_MESSAGE_TOKENS", "40")),
+            lite_prompt_tokens=int(os.getenv("FIR_ROUTE_LITE_PROMPT_TOKENS", "4000")),
+            large_input_tokens=int(os.getenv("FIR_ROUTE_LARGE_INPUT_TOKENS", "200000")),
+        )
+
+    def tier(self, task: str, input_tokens: int = 0, message_tokens: int | None = None) -> str:
+        if task == "summary":
+            return "lite"
+        if task == "chat":
+            short = message_tokens is not None and message_tokens <= self.short_message_tokens
+            return "lite" if short and input_tokens <= self.lite_prompt_tokens else "standard"
+        if task == "extraction":
+            if input_tokens >= self.large_input_tokens:
+                return "large"
+            return "lite" if input_tokens <= self.lite_prompt_tokens else "standard"
+        return "standard"
+
+    def model_for(self, task: str, input_tokens: int = 0, message_tokens: int | None = None) -> str:
+        return self.models[self.tier(task, input_tokens, message_tokens)]
+
+
+class TokenBudget:
+    """Per-minute token allowance for one model, over a sliding window.
+
+    `acquire` reserves a call's estimated tokens, waiting in arrival order
+    while the window is full, and raises ModelBusy if the tokens would not
+    be free within `max_wait` seconds. `settle` replaces the estimate with
+    the usage the model reported. A single call larger than the whole
+    budget is admitted once the window is empty.
+    """
+
+    def __init__(self, tokens_per_minute: int, max_wait: float = 10.0, window: float = 60.0):
+        self.tokens_per_minute = tokens_per_minute
+        self.max_wait = max_wait
+        self.window = window
+        self._spent = deque()
+        self._total = 0
+        self._lock = asyncio.Lock()
+
+    def used(self) -> int:
+        self._prune(time.monotonic())
+        return self._total
+
+    def _prune(self, now: float):
+        while self._spent and self._spent[0][0] <= now - self.window:
+            self._total -= self._spent.popleft()[1]
+
+    async def acquire(self, tokens: int) -> list:
+        deadline = time.monotonic() + self.max_wait
+        try:
+            await asyncio.wait_for(self._lock.acquire(), self.max_wait)
+        except asyncio.TimeoutError:
+            raise ModelBusy(self.window) from None
+        try:
+            while True:
+                now = time.monotonic()
+                self._prune(now)
+                if not self._spent or self._total + tokens <= self.tokens_per_minute:
+                    entry = [now, tokens]
+                    self._spent.append(entry)
+                    self._total += tokens
+                    return entry
+                excess, free_at = self._total + tokens - self.tokens_per_minute, now
+                for spent_at, spent in self._spent:
+                    excess -= spent
+                    free_at = spent_at + self.window
+                    if excess <= 0:
+                        break
+                if free_at > deadline:
+                    raise ModelBusy(free_at - now)
+                await asyncio.sleep(free_at - now)
+        finally:
+            self._lock.release()
+
+    def settle(self, entry: list, tokens: int):
+        self._prune(time.monotonic())
+        if self._spent and entry[0] >= self._spent[0][0]:
+            self._total += tokens - entry[1]
+            entry[1] = tokens
@@ -0,0 +1,116 @@
+import re
+from typing import Optional
+
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, create_model
+
+from .extraction import normalize_digits, parse_date
+from .templates import FIRTemplate, registry as templates
+
+_EMPTY = frozenset({"", "null", "none", "n/a", "na", "unknown"})
+_TIME = re.compile(r"(\d{1,2})(?:[:.](\d{2}))?\s*(?:([ap])\.?\s?m\.?)?", re.IGNORECASE)
+
+
+class ActEntry(BaseModel):
+    act: str = Field(description="Name of the act, e.g. IPC, BNS, IT Act")
+    sections: str = Field(description="Comma-separated sections of that act")
+
+
+_FIELD_TYPES = {
+    "string": (str, ""),
+    "date": (str, " (YYYY-MM-DD)"),
+    "time": (str, " (24-hour HH:MM)"),
+    "array": (list[ActEntry], ""),
+}
+
+
+def parse_time(text: str) -> str | None:
+    """Parses "16:30", "4.30 pm" or "4 PM" and returns it as HH:MM."""
+    match = _TIME.fullmatch(text.strip())
+    if not match:
+        return None
+    hour, minute, half = int(match.group(1)), int(match.group(2) or 0), (match.group(3) or "").lower()
+    if not match.group(2) and not half:
+        return None
+    if half:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if half == "p" else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return f"{hour:02d}:{minute:02d}"
+
+
+class FIRSchema:
+    """Structured-output models compiled once from a FIR template.
+
+    `turn_model` is the response schema for a chat turn: the reply to the
+    officer, then `updates` holding only the fields the latest message set or
+    changed. Every field is validated on its own, so one malformed value is
+    dropped without losing the rest of the turn; dates and times are
+    normalized to ISO form when they parse.
+    """
+
+    def __init__(self, template: FIRTemplate):
+        self.template = template
+        specs = {**template.schema.get("required_fields", {}), **template.schema.get("optional_fields", {})}
+        self.kinds = {}
+        fields = {}
+        for key, spec in specs.items():
+            kind = spec.get("type", "string")
+            annotation, hint = _FIELD_TYPES.get(kind, _FIELD_TYPES["string"])
+            self.kinds[key] = kind
+            fields[key] = (Optional[annotation], Field(None, description=spec.get("description", key) + hint))
+        self.update_model = create_model("FIRUpdate", **fields)
+        self.turn_model = create_model(
+            "FIRTurn",
+            reply=(str, Field(description="Conversational reply to the officer, listing any missing required fields")),
+            updates=(self.update_model, Field(description="Only the fields set or corrected by the latest message")),
+        )
+        self._adapters = {key: TypeAdapter(info.annotation) for key, info in self.update_model.model_fields.items()}
+
+    def validate(self, key: str, value):
+        """Returns the normalized value of one field, or None if it is unknown, empty or malformed."""
+        adapter = self._adapters.get(key)
+        if adapter is None:
+            return None
+        try:
+            value = adapter.validate_python(value)
+        except ValidationError:
+            return None
+        if value is None:
+            return None
+        if isinstance(value, list):
+            acts = [
+                {"act": entry.act.strip(), "sections": entry.sections.strip()}
+                for entry in value if entry.act.strip()
+            ]
+            return acts or None
+        value = value.strip()
+        if value.lower() in _EMPTY:
+            return None
+        kind = self.kinds[key]
+        if kind == "date":
+            return parse_date(normalize_digits(value)) or value
+        if kind == "time":
+            return parse_time(normalize_digits(value)) or value
+        return value
+
+    def merge_field(self, key: str, value, extracted_info: dict) -> bool:
+        """Stores one validated field; returns True if the stored value changed."""
+        value = self.validate(key, value)
+        if value is None or extracted_info.get(key) == value:
+            return False
+        extracted_info[key] = value
+        return True
+
+
+_compiled: FIRSchema | None = None
+
+
+def fir_schema() -> FIRSchema:
+    """The compiled schema for the current fir_template.json, rebuilt when the file changes."""
+    global _compiled
+    template = templates.fir_template
+    if _compiled is None or _compiled.template is not template:
+        _compiled = FIRSchema(template)
+    return _compiled
@@ -0,0 +1,236 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+
+@dataclass
+class Session:
+    """Conversation state for one officer's FIR draft."""
+
+    session_id: str
+    history: list = field(default_factory=list)
+    extracted_info: dict = field(default_factory=dict)
+    last_access: float = field(default_factory=time.time)
+    summary: str = ""
+    documents: list = field(default_factory=list)
+    prompt_tokens: list = field(default_factory=list)
+
+    def add_message(self, role: str, content: str, max_history: int, tokens: int = 0):
+        """Appends a turn, dropping the oldest ones beyond max_history."""
+        self.history.append({"role": role, "content": content, "tokens": tokens})
+        if len(self.history) > max_history:
+            del self.history[: len(self.history) - max_history]
+
+    def record_prompt_tokens(self, tokens: int, keep: int = 100):
+        """Remembers the estimated prompt size of each model turn (the last `keep` of them)."""
+        self.prompt_tokens.append(tokens)
+        if len(self.prompt_tokens) > keep:
+            del self.prompt_tokens[: len(self.prompt_tokens) - keep]
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "session_id": self.session_id,
+                "history": self.history,
+                "extracted_info": self.extracted_info,
+                "last_access": self.last_access,
+                "summary": self.summary,
+                "documents": self.documents,
+                "prompt_tokens": self.prompt_tokens,
+            },
+            ensure_ascii=False,
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "Session":
+        return cls(**json.loads(data))
+
+    @property
+    def size_bytes(self) -> int:
+        """Approximate memory footprint, measured as the serialized size."""
+        return len(self.to_json().encode("utf-8"))
+
+
+class InMemorySessionStore:
+    """Process-local session store with idle-TTL and total-size eviction.
+
+    Safe to call from worker threads, like SQLiteSessionStore.
+    """
+
+    def __init__(self, max_history: int = 50, ttl: float = 3600, max_bytes: int = 256 * 1024 * 1024):
+        self.max_history = max_history
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        self._sizes: dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+
+    def get(self, session_id: str) -> Session:
+        """Returns the session for session_id, creating an empty one if needed."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or self._expired(session):
+                self.delete(session_id)
+                session = Session(session_id)
+                self._sessions[session_id] = session
+            session.last_access = time.time()
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def peek(self, session_id: str) -> Session | None:
+        """Returns the session if it exists, without creating it or refreshing its idle time."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return None if session is None or self._expired(session) else session
+
+    def update(self, session_id: str, apply) -> Session:
+        """Calls `apply` on the session (created if needed), saves it and returns it."""
+        with self._lock:
+            session = self.get(session_id)
+            apply(session)
+            self.save(session)
+            return session
+
+    def save(self, session: Session):
+        with self._lock:
+            session.last_access = time.time()
+            self._sessions[session.session_id] = session
+            self._sessions.move_to_end(session.session_id)
+            size = session.size_bytes
+            self._total_bytes += size - self._sizes.get(session.session_id, 0)
+            self._sizes[session.session_id] = size
+            while self._total_bytes > self.max_bytes and len(self._sessions) > 1:
+                oldest = next(iter(self._sessions))
+                self.delete(oldest)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._total_bytes -= self._sizes.pop(session_id, 0)
+
+    def evict_expired(self) -> int:
+        """Drops sessions idle for longer than the TTL and returns how many."""
+        with self._lock:
+            expired = [sid for sid, s in self._sessions.items() if self._expired(s)]
+            for sid in expired:
+                self.delete(sid)
+            return len(expired)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _expired(self, session: Session) -> bool:
+        return time.time() - session.last_access > self.ttl
+
+
+class SQLiteSessionStore:
+    """Session store backed by a shared SQLite file, so several uvicorn
+    workers on the same host can serve the same session."""
+
+    def __init__(self, path: str, max_history: int = 50, ttl: float = 3600):
+        self.path = path
+        self.max_history = max_history
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, "
+                "last_access REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def peek(self, session_id: str) -> Session | None:
+        """Returns the stored session, or None if there is none or it has expired."""
+        row = self._conn().execute(
+            "SELECT data, last_access FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return Session.from_json(row[0])
+
+    def get(self, session_id: str) -> Session:
+        session = self.peek(session_id) or Session(session_id)
+        session.last_access = time.time()
+        return session
+
+    def update(self, session_id: str, apply) -> Session:
+        """Reads the session, calls `apply` on it and writes it back in one write transaction.
+
+        Another worker's update to the same session waits for this one
+        instead of being overwritten by it.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            session = self.get(session_id)
+            apply(session)
+            self.save(session)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return session
+
+    def save(self, session: Session):
+        session.last_access = time.time()
+        data = session.to_json()
+        self._conn().execute(
+            "INSERT INTO sessions (session_id, data, last_access, size) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET data = excluded.data, "
+            "last_access = excluded.last_access, size = excluded.size",
+            (session.session_id, data, session.last_access, len(data.encode("utf-8"))),
+        )
+
+    def delete(self, session_id: str):
+        self._conn().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def evict_expired(self) -> int:
+        cur = self._conn().execute(
+            "DELETE FROM sessions WHERE last_access < ?", (time.time() - self.ttl,)
+        )
+        return cur.rowcount
+
+    def stats(self) -> dict:
+        count, total = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions"
+        ).fetchone()
+        return {"backend": "sqlite", "sessions": count, "bytes": total}
+
+
+def create_session_store():
+    """Builds the session store selected by FIR_SESSION_BACKEND (memory or sqlite)."""
+    backend = os.getenv("FIR_SESSION_BACKEND", "memory")
+    max_history = int(os.getenv("FIR_SESSION_MAX_HISTORY", "50"))
+    ttl = float(os.getenv("FIR_SESSION_TTL", "3600"))
+    if backend == "sqlite":
+        return SQLiteSessionStore(
+            os.getenv("FIR_SESSION_DB", "sessions.db"), max_history=max_history, ttl=ttl
+        )
+    if backend == "memory":
+        return InMemorySessionStore(
+            max_history=max_history,
+            ttl=ttl,
+            max_bytes=int(os.getenv("FIR_SESSION_MAX_BYTES", str(256 * 1024 * 1024))),
+        )
+    raise ValueError(f"Unknown FIR_SESSION_BACKEND: {backend}")
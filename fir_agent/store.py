@@ -0,0 +1,196 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Template fields copied into indexed columns of `firs` for search.
+INDEXED_FIELDS = {
+    "district": "district",
+    "policeStation": "police_station",
+    "firYear": "fir_year",
+    "firNo": "fir_no",
+    "complainantName": "complainant_name",
+}
+SUMMARY_COLUMNS = (
+    "record_id", "status", "district", "police_station", "fir_year", "fir_no",
+    "complainant_name", "fir_id", "blob_name", "created", "updated", "submitted",
+)
+
+
+def _column_value(column: str, value):
+    if value is None or value == "":
+        return None
+    if column == "fir_year":
+        text = str(value).strip()
+        return int(text) if text.isdigit() else None
+    return str(value).strip()
+
+
+def _like_prefix(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+class FIRStore:
+    """Durable FIR drafts and submitted FIRs in a SQLite file (WAL mode).
+
+    Each record keeps its fields as one row per field, so autosaving a chat
+    turn writes only the fields it changed. District, police station, FIR
+    year/number and complainant name are mirrored into indexed columns of
+    the record for `search`. A record's ID is the chat session ID while it
+    is a draft; submitting it keeps the ID and adds the FIR ID and the
+    storage blob name of its PDF.
+    """
+
+    def __init__(self, path: str = "firs.db"):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS firs ("
+                "record_id TEXT PRIMARY KEY, status TEXT NOT NULL, "
+                "district TEXT COLLATE NOCASE, police_station TEXT COLLATE NOCASE, "
+                "fir_year INTEGER, fir_no TEXT, complainant_name TEXT COLLATE NOCASE, "
+                "fir_id TEXT, blob_name TEXT, "
+                "created REAL NOT NULL, updated REAL NOT NULL, submitted REAL);"
+                "CREATE TABLE IF NOT EXISTS fir_fields ("
+                "record_id TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "PRIMARY KEY (record_id, key)) WITHOUT ROWID;"
+                "CREATE INDEX IF NOT EXISTS firs_district ON firs (district, updated);"
+                "CREATE INDEX IF NOT EXISTS firs_police_station ON firs (police_station, updated);"
+                "CREATE INDEX IF NOT EXISTS firs_fir_number ON firs (fir_year, fir_no);"
+                "CREATE INDEX IF NOT EXISTS firs_complainant ON firs (complainant_name);"
+                "CREATE INDEX IF NOT EXISTS firs_status_updated ON firs (status, updated);"
+                "CREATE UNIQUE INDEX IF NOT EXISTS firs_fir_id ON firs (fir_id);"
+            )
+
+    @classmethod
+    def from_env(cls) -> "FIRStore":
+        return cls(os.getenv("FIR_STORE_DB", "firs.db"))
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def save_fields(self, record_id: str, changes: dict) -> bool:
+        """Autosaves the changed fields of a draft, creating the draft if needed.
+
+        Returns False, saving nothing, if the record has already been submitted.
+        """
+        if not changes:
+            return True
+        now = time.time()
+        columns = {
+            INDEXED_FIELDS[key]: _column_value(INDEXED_FIELDS[key], value)
+            for key, value in changes.items() if key in INDEXED_FIELDS
+        }
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO firs (record_id, status, created, updated) VALUES (?, 'draft', ?, ?) "
+                "ON CONFLICT(record_id) DO UPDATE SET updated = excluded.updated WHERE status = 'draft'",
+                (record_id, now, now),
+            )
+            if conn.execute("SELECT status FROM firs WHERE record_id = ?", (record_id,)).fetchone()[0] != "draft":
+                conn.execute("ROLLBACK")
+                return False
+            conn.executemany(
+                "INSERT INTO fir_fields (record_id, key, value) VALUES (?, ?, ?) "
+                "ON CONFLICT(record_id, key) DO UPDATE SET value = excluded.value",
+                [(record_id, key, json.dumps(value, ensure_ascii=False)) for key, value in changes.items()],
+            )
+            if columns:
+                assignments = ", ".join(f"{column} = ?" for column in columns)
+                conn.execute(f"UPDATE firs SET {assignments} WHERE record_id = ?", (*columns.values(), record_id))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+
+    def submit(self, record_id: str | None, fields: dict, fir_id: str, blob_name: str) -> str:
+        """Records a submitted FIR, replacing the fields of its draft, and returns the record ID."""
+        record_id = record_id or fir_id
+        now = time.time()
+        columns = {column: _column_value(column, fields.get(key)) for key, column in INDEXED_FIELDS.items()}
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO firs (record_id, status, created, updated) VALUES (?, 'submitted', ?, ?) "
+                "ON CONFLICT(record_id) DO NOTHING",
+                (record_id, now, now),
+            )
+            conn.execute(
+                f"UPDATE firs SET status = 'submitted', fir_id = ?, blob_name = ?, updated = ?, submitted = ?, "
+                f"{', '.join(f'{column} = ?' for column in columns)} WHERE record_id = ?",
+                (fir_id, blob_name, now, now, *columns.values(), record_id),
+            )
+            conn.execute("DELETE FROM fir_fields WHERE record_id = ?", (record_id,))
+            conn.executemany(
+                "INSERT INTO fir_fields (record_id, key, value) VALUES (?, ?, ?)",
+                [(record_id, key, json.dumps(value, ensure_ascii=False)) for key, value in fields.items()],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return record_id
+
+    def fields(self, record_id: str) -> dict:
+        rows = self._conn().execute("SELECT key, value FROM fir_fields WHERE record_id = ?", (record_id,))
+        return {key: json.loads(value) for key, value in rows}
+
+    def get(self, record_id: str) -> dict | None:
+        """The record's summary and all of its fields, or None."""
+        row = self._conn().execute(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM firs WHERE record_id = ?", (record_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {**dict(zip(SUMMARY_COLUMNS, row)), "fields": self.fields(record_id)}
+
+    def search(self, district: str | None = None, police_station: str | None = None,
+               fir_year: int | None = None, fir_no: str | None = None, complainant: str | None = None,
+               status: str | None = None, limit: int = 20, cursor: str | None = None) -> dict:
+        """Finds records, most recently updated first, a page at a time.
+
+        District and police station match case-insensitively, complainant by
+        name prefix. `cursor` is the `next_cursor` of the previous page.
+        """
+        clauses, params = [], []
+        for column, value in (("district", district), ("police_station", police_station),
+                              ("fir_year", fir_year), ("fir_no", fir_no), ("status", status)):
+            if value not in (None, ""):
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if complainant:
+            clauses.append("complainant_name LIKE ? ESCAPE '\\'")
+            params.append(_like_prefix(complainant.strip()))
+        if cursor:
+            updated, _, record_id = cursor.partition(":")
+            clauses.append("(updated < ? OR (updated = ? AND record_id < ?))")
+            params.extend((float(updated), float(updated), record_id))
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        rows = self._conn().execute(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM firs {where}"
+            "ORDER BY updated DESC, record_id DESC LIMIT ?",
+            (*params, limit + 1),
+        ).fetchall()
+        results = [dict(zip(SUMMARY_COLUMNS, row)) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = results[-1]
+            next_cursor = f"{last['updated']!r}:{last['record_id']}"
+        return {"results": results, "next_cursor": next_cursor}
+
+    def stats(self) -> dict:
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM firs GROUP BY status").fetchall()
+        return dict(rows)
@@ -0,0 +1,178 @@
+import asyncio
+import json
+
+
+class ChatStreamParser:
+    """Incrementally splits a streamed structured chat turn into text and FIR field updates.
+
+    The model replies with a JSON object `{"reply": "...", "updates": {...}}`.
+    The decoded `reply` string is released as it arrives, holding back only
+    an escape sequence split across chunks; each member of `updates` is
+    reported the moment its value closes, without waiting for the rest of the
+    object. A reply that is not a JSON object is passed through as text.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._buf = ""
+        self._plain = None
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._expect_key = False
+        self._key = None
+        self._reply_from = None
+        self._member_start = None
+
+    def feed(self, chunk: str) -> list:
+        """Consumes a chunk and returns ("text", str) and ("field", key, value) events."""
+        if self._plain is None:
+            stripped = chunk.lstrip()
+            if not stripped:
+                return []
+            self._plain = not stripped.startswith("{")
+        if self._plain:
+            return self._text(chunk)
+        self._buf += chunk
+        return self._scan()
+
+    def close(self) -> list:
+        """Flushes the rest of a reply string cut off by the end of the stream."""
+        if self._reply_from is None:
+            return []
+        raw = self._buf[self._reply_from:]
+        self._reply_from = None
+        return self._text(self._decode(raw[:self._complete(raw)]))
+
+    def _text(self, text: str) -> list:
+        if not text:
+            return []
+        self.text += text
+        return [("text", text)]
+
+    def _scan(self) -> list:
+        events = []
+        buf = self._buf
+        while self._pos < len(buf):
+            i = self._pos
+            c = buf[i]
+            self._pos += 1
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        events.extend(self._end_string(buf, i))
+                continue
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._string_start = i
+                    if not self._expect_key and self._key == "reply":
+                        self._reply_from = i + 1
+            elif c in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._expect_key = True
+                elif self._depth == 2 and c == "{" and self._key == "updates":
+                    self._member_start = i + 1
+            elif c in "}]":
+                if self._depth == 2 and self._member_start is not None:
+                    events.extend(self._member(buf[self._member_start:i]))
+                    self._member_start = None
+                self._depth -= 1
+            elif self._depth == 1:
+                if c == ",":
+                    self._expect_key = True
+                elif c == ":":
+                    self._expect_key = False
+            elif c == "," and self._depth == 2 and self._member_start is not None:
+                events.extend(self._member(buf[self._member_start:i]))
+                self._member_start = i + 1
+        if self._reply_from is not None:
+            raw = buf[self._reply_from:]
+            done = self._complete(raw)
+            events.extend(self._text(self._decode(raw[:done])))
+            self._reply_from += done
+        return events
+
+    def _end_string(self, buf: str, end: int) -> list:
+        if self._expect_key:
+            self._key = self._decode(buf[self._string_start + 1:end])
+            return []
+        if self._reply_from is None:
+            return []
+        text = self._decode(buf[self._reply_from:end])
+        self._reply_from = None
+        return self._text(text)
+
+    @staticmethod
+    def _complete(raw: str) -> int:
+        """Length of the prefix of a JSON string body that ends on a whole escape sequence."""
+        i, n = 0, len(raw)
+        while i < n:
+            if raw[i] != "\\":
+                i += 1
+            elif i + 1 == n:
+                return i
+            elif raw[i + 1] != "u":
+                i += 2
+            elif i + 6 > n:
+                return i
+            elif "d800" <= raw[i + 2:i + 6].lower() < "dc00":
+                # A high surrogate is only decodable together with its low half.
+                if i + 12 > n:
+                    return i
+                i += 12
+            else:
+                i += 6
+        return n
+
+    @staticmethod
+    def _decode(raw: str) -> str:
+        if "\\" not in raw:
+            return raw
+        try:
+            return json.loads(f'"{raw}"', strict=False)
+        except json.JSONDecodeError:
+            return raw
+
+    @staticmethod
+    def _member(text: str) -> list:
+        if not text.strip():
+            return []
+        try:
+            member = json.loads("{" + text + "}")
+        except json.JSONDecodeError:
+            return []
+        return [("field", key, value) for key, value in member.items()]
+
+
+class TurnBroadcast:
+    """Fans the events of one streamed chat turn out to every request waiting on it.
+
+    Stands in for the turn's client queue: `put` delivers an event to all
+    subscribers, and a late subscriber first receives the events it missed.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.done = asyncio.Event()
+        self._queues = []
+
+    async def put(self, event):
+        self.events.append(event)
+        for queue in self._queues:
+            queue.put_nowait(event)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        for event in self.events:
+            queue.put_nowait(event)
+        self._queues.append(queue)
+        return queue
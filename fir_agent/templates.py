@@ -0,0 +1,264 @@
+import html
+import json
+import logging
+import os
+import re
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+FIR_TEMPLATE_PATH = APP_DIR / "fir_template.json"
+HTML_TEMPLATE_PATH = APP_DIR / "static" / "fir_template.html"
+GAZETTEER_PATH = APP_DIR / "gazetteer.json"
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    """
+    ## Persona and Role:
+    You are an AI Assistant for Indian Police Investigating Officers (IOs), designated as the 'FIR Drafting Assistant'. Your purpose is to efficiently and accurately fill out a First Information Report (FIR) JSON object based on the user's input.
+
+    ## Core Workflow:
+    1.  **Maintain State**: You are a stateful assistant. In every turn, you will be given the current state of the FIR data as a JSON object. Your primary job is to find any new information in the user's latest message. DO NOT change existing data unless the user explicitly corrects it.
+    2.  **Extract Information**: Analyze the user's text to find details that match the FIR fields in the response schema. You must be able to handle mixed languages (e.g., Hindi-English).
+    3.  **Ask for Missing Required Fields**: After extraction, if any of the required fields ({required_fields}) are still empty, you MUST ask the user for the missing information in a clear, bulleted list.
+    4.  **Output Format**: Your response is a JSON object following the response schema.
+        - `reply`: Your conversational text to the user (e.g., asking for missing info).
+        - `updates`: ONLY the fields set or corrected by the latest message, with their new values. Leave out every field that is unchanged or still unknown; never repeat the current FIR data. Write dates as YYYY-MM-DD and times as 24-hour HH:MM. If you update `acts`, give the complete list.
+
+    ## Example Interaction:
+
+    **User provides current data and a new message:**
+    '''
+    Current FIR Data: {{"complainantName": "Rohan Sharma"}}
+    User Message: "The incident happened in the district of Gurugram at the Cyber City police station."
+    '''
+
+    **Your Correct Output:**
+    '''
+    {{
+        "reply": "Thank you. I have updated the district and police station. To proceed, please provide the following required details:\\n* firYear\\n* firNo\\n* firDate\\n* complainantAddress\\n* firContents",
+        "updates": {{"district": "Gurugram", "policeStation": "Cyber City"}}
+    }}
+    '''
+    """
+)
+
+
+class WatchedFile:
+    """A file parsed once by `loader` and reparsed only when its mtime changes.
+
+    The mtime is checked at most every `check_interval` seconds, so hot paths
+    pay for a stat call rather than a read and parse on every request.
+    """
+
+    def __init__(self, path: Path, loader, check_interval: float = 1.0):
+        self.path = path
+        self.loader = loader
+        self.check_interval = check_interval
+        self.version = 0
+        self._value = None
+        self._mtime = None
+        self._checked_at = 0.0
+
+    def get(self):
+        now = time.monotonic()
+        if self._value is None or now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime != self._mtime:
+                self._value = self.loader(self.path)
+                self._mtime = mtime
+                self.version += 1
+                logger.info("Loaded template asset: %s (v%d)", self.path.name, self.version)
+        return self._value
+
+
+class FIRTemplate:
+    """Precompiled artefacts derived from fir_template.json."""
+
+    def __init__(self, raw: str):
+        self.raw = raw
+        self.schema = json.loads(raw)
+        self.required_fields = tuple(self.schema.get("required_fields", {}))
+        self.optional_fields = tuple(self.schema.get("optional_fields", {}))
+        self.system_prompt = SYSTEM_PROMPT.format(required_fields=", ".join(self.required_fields))
+
+
+_TEMPLATE_TOKEN = re.compile(
+    r"\{\{\s*(?P<key>\w+)\s*(?:\|(?P<default>[^}]*))?\}\}"
+    r"|(?P<input><input\b[^>]*?\bid=\"(?P<input_id>\w+)\"[^>]*?)(?P<input_end>/?>)"
+    r"|(?P<textarea><textarea\b[^>]*?\bid=\"(?P<textarea_id>\w+)\"[^>]*>)(?P<textarea_body>.*?)</textarea>"
+    r"|<style\b[^>]*>(?P<style>.*?)</style>",
+    re.DOTALL,
+)
+_LIST_ITEM_KEY = re.compile(r"(act|sections)(\d+)$")
+
+
+def _field_getter(key: str):
+    """Returns a function resolving `key` from FIR data.
+
+    `act<n>`/`sections<n>` fall back to the n-th entry of the `acts` list so the
+    fixed Act/Sections rows of the form are filled from structured data.
+    """
+    match = _LIST_ITEM_KEY.match(key)
+    if not match:
+        return lambda data: data.get(key)
+    attr, index = match.group(1), int(match.group(2)) - 1
+
+    def get(data):
+        if key in data:
+            return data[key]
+        acts = data.get("acts")
+        if isinstance(acts, list) and index < len(acts) and isinstance(acts[index], dict):
+            return acts[index].get(attr)
+        return None
+
+    return get
+
+
+def _is_empty(value) -> bool:
+    return value is None or value == "null" or (isinstance(value, str) and not value.strip())
+
+
+def _render_rows(value) -> str:
+    rows = []
+    for item in value:
+        if isinstance(item, dict):
+            cells = [item.get("act"), item.get("sections")]
+        else:
+            cells = [item]
+        rows.append(
+            "<tr>" + "".join(f"<td>{html.escape(str(c or ''))}</td>" for c in cells) + "</tr>"
+        )
+    return "".join(rows)
+
+
+class _Slot:
+    """A placeholder in a compiled template."""
+
+    __slots__ = ("get", "default", "kind")
+
+    def __init__(self, key: str, default, kind: str):
+        self.get = _field_getter(key)
+        self.default = default
+        self.kind = kind
+
+    def render(self, data: dict, default: str) -> str:
+        value = self.get(data)
+        if self.kind == "attr":
+            if _is_empty(value):
+                return ""
+            return f' value="{html.escape(str(value), quote=True)}"'
+        if _is_empty(value):
+            return self.default if self.default is not None else html.escape(default)
+        if isinstance(value, list):
+            return _render_rows(value)
+        return html.escape(str(value), quote=self.kind == "text")
+
+
+class CompiledTemplate:
+    """An HTML template compiled once into literal segments and field slots.
+
+    Slots are `{{key}}` or `{{key|default}}` placeholders, plus the form's
+    `<input id="...">` and `<textarea id="...">` elements, which are bound to
+    the FIR field of the same name. Rendering is a single pass that
+    HTML-escapes every value and renders list values (e.g. `acts`) as table
+    rows. Inline <style> blocks are also collected in `styles`, so callers
+    that pre-parse the CSS can render the markup without them.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.segments = []
+        self.body_segments = []
+        self.styles = []
+        self.fields = set()
+        pos = 0
+        for match in _TEMPLATE_TOKEN.finditer(source):
+            self._literal(source[pos:match.start()])
+            if match.group("style") is not None:
+                self.styles.append(match.group("style"))
+                self._literal(match.group(0), body=False)
+            elif match.group("key"):
+                default = match.group("default")
+                self._slot(match.group("key"), html.escape(default) if default is not None else None, "text")
+            elif match.group("input"):
+                self._literal(match.group("input"))
+                self._slot(match.group("input_id"), None, "attr")
+                self._literal(match.group("input_end"))
+            else:
+                self._literal(match.group("textarea"))
+                self._slot(match.group("textarea_id"), match.group("textarea_body"), "body")
+                self._literal("</textarea>")
+            pos = match.end()
+        self._literal(source[pos:])
+
+    def _literal(self, text: str, body: bool = True):
+        if not text:
+            return
+        for segments in (self.segments, self.body_segments) if body else (self.segments,):
+            if segments and isinstance(segments[-1], str):
+                segments[-1] += text
+            else:
+                segments.append(text)
+
+    def _slot(self, key: str, default, kind: str):
+        self.fields.add(key)
+        slot = _Slot(key, default, kind)
+        self.segments.append(slot)
+        self.body_segments.append(slot)
+
+    def render(self, data: dict, default: str = "N/A", include_styles: bool = True) -> str:
+        """Fills every slot from `data`; missing `{{...}}` fields render `default`."""
+        segments = self.segments if include_styles else self.body_segments
+        return "".join(
+            seg if seg.__class__ is str else seg.render(data, default) for seg in segments
+        )
+
+
+def _load_fir_template(path: Path) -> FIRTemplate:
+    return FIRTemplate(path.read_text(encoding="utf-8"))
+
+
+def _load_html_template(path: Path) -> CompiledTemplate:
+    return CompiledTemplate(path.read_text(encoding="utf-8"))
+
+
+def _load_json(path: Path) -> dict:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+class TemplateRegistry:
+    """Loads the FIR schema, system prompt, HTML template and place-name
+    gazetteer once and reloads them when the files are edited on disk."""
+
+    def __init__(self, fir_template_path: Path = FIR_TEMPLATE_PATH, html_template_path: Path = HTML_TEMPLATE_PATH,
+                 gazetteer_path: Path = GAZETTEER_PATH):
+        self._fir_template = WatchedFile(fir_template_path, _load_fir_template)
+        self._html_template = WatchedFile(html_template_path, _load_html_template)
+        self._gazetteer = WatchedFile(gazetteer_path, _load_json)
+
+    @property
+    def fir_template(self) -> FIRTemplate:
+        return self._fir_template.get()
+
+    @property
+    def system_prompt(self) -> str:
+        return self.fir_template.system_prompt
+
+    @property
+    def required_fields(self) -> tuple:
+        return self.fir_template.required_fields
+
+    @property
+    def html_template(self) -> CompiledTemplate:
+        return self._html_template.get()
+
+    @property
+    def gazetteer(self) -> dict:
+        """Known districts and police stations with their aliases (gazetteer.json)."""
+        return self._gazetteer.get()
+
+
+registry = TemplateRegistry()
@@ -1,18 +1,19 @@
-import json
+import asyncio
+import logging
 import os
-import time
-from pathlib import Path
-from google import genai
-from google.genai.types import GenerateContentConfig
-from dotenv import load_dotenv
-from PyPDF2 import PdfReader
-import docx
-from google.cloud import storage
+import threading
 import uuid
-from datetime import datetime
-from weasyprint import HTML
+from pathlib import Path
+
+from .cache import default_cache, file_digest
+from .llm import GeminiClient
+from .parsing import document_cache_key, extract_text, parse_limits
+from .pdf import render_pdf
+from .templates import registry as templates
+from .transcription import TranscriptionService
+from .uploader import default_backend, new_fir_blob_name
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
 def parse_document(file_path: str) -> str:
     """Parses a document (PDF or DOCX) and returns the text content without textract."""
@@ -21,72 +22,64 @@ def parse_document(file_path: str) -> str:
 
     try:
         ext = os.path.splitext(file_path)[1].lower()
-        if ext == ".pdf":
-            text_parts = []
-            with open(file_path, "rb") as f:
-                reader = PdfReader(f)
-                for page in reader.pages:
-                    page_text = page.extract_text() or ""
-                    if page_text:
-                        text_parts.append(page_text)
-            text = "\n".join(text_parts).strip()
-            if not text:
-                return "Error: Could not extract any text from the PDF. It might be scanned images."
-            return text
-        elif ext == ".docx":
-            document = docx.Document(file_path)
-            text = "\n".join(p.text for p in document.paragraphs).strip()
-            if not text:
-                return "Error: Could not extract any text from the DOCX."
-            return text
-        else:
+        if ext not in (".pdf", ".docx"):
             return "Error: Unsupported file type. Please upload a PDF or DOCX file."
+        max_pages, max_chars = parse_limits()
+        cache = default_cache()
+        cache_key = document_cache_key(file_digest(file_path), max_pages, max_chars)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+        text = extract_text(Path(file_path), max_pages, max_chars)
+        if not text:
+            if ext == ".pdf":
+                return "Error: Could not extract any text from the PDF. It might be scanned images."
+            return "Error: Could not extract any text from the DOCX."
+        cache.put(cache_key, text)
+        return text
     except Exception as e:
         return f"Error parsing document: {e}"
 
+_transcription = None
+_transcription_lock = threading.Lock()
+
+def _transcription_service() -> tuple:
+    """The event loop and TranscriptionService shared by every transcribe_audio_file call.
+
+    The service and its pooled GeminiClient live on a daemon thread running
+    their own loop, so the synchronous tool can wait on a job from any thread.
+    """
+    global _transcription
+    with _transcription_lock:
+        if _transcription is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="fir-transcription", daemon=True).start()
+            cache = default_cache()
+            gemini = GeminiClient.from_env(response_cache=cache)
+            _transcription = loop, TranscriptionService(gemini, cache=cache)
+        return _transcription
+
+async def _await_transcript(service, data: bytes, filename: str) -> str:
+    job = service.submit(data, filename)
+    events = job.subscribe()
+    while await events.get() is not None:
+        pass
+    job.unsubscribe(events)
+    if job.status != "done":
+        raise RuntimeError(job.error)
+    return job.transcription
+
 def transcribe_audio_file(file_path: str) -> str:
-    """Transcribes an audio file and returns the text using Gemini file upload API."""
+    """Transcribes an audio file through the shared transcription service and returns the text."""
     try:
-        client = genai.Client(api_key=os.getenv('GOOGLE_API_KEY'))
-        print(f"Transcribing audio file: {file_path}")
-
-        uploaded_file = client.files.upload(file=Path(file_path))
-        print(f"Uploaded file '{uploaded_file.display_name}' as: {uploaded_file.name}")
-
-        print("Waiting for file to be processed...")
-        while uploaded_file.state.name == "PROCESSING":
-            time.sleep(2)
-            uploaded_file = client.files.get(name=uploaded_file.name)
-
-        if uploaded_file.state.name == "FAILED":
-            print(f"File processing failed: {uploaded_file.state}")
-            return f"Error: File processing failed on the server."
-
-        if uploaded_file.state.name != "ACTIVE":
-            print(f"File is not active: {uploaded_file.state}")
-            return f"Error: File could not be processed. State: {uploaded_file.state.name}"
-
-        prompt = (
-            "This audio contains an interview between an Investigating Officer (IO) and a complainant for a "
-            "First Information Report (FIR). Your task is to provide a precise, verbatim transcription. "
-            "Differentiate between the speakers by starting each line with either 'Investigating Officer:' or 'Complainant:'. "
-            "The conversation may be multilingual; transcribe all speech accurately."
-        )
-
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=[prompt, uploaded_file],
-        )
-
-        try:
-            client.files.delete(name=uploaded_file.name)
-        except Exception:
-            pass
-
-        print("Transcription successful.")
-        return response.text
+        data = Path(file_path).read_bytes()
+        loop, service = _transcription_service()
+        logger.info("Transcribing audio file: %s", file_path)
+        text = asyncio.run_coroutine_threadsafe(_await_transcript(service, data, Path(file_path).name), loop).result()
+        logger.info("Transcription successful.")
+        return text
     except Exception as e:
-        print(f"Error during transcription: {e}")
+        logger.error("Error during transcription: %s", e)
         return f"Error: {e}"
 
 def validate_data(
@@ -102,14 +95,9 @@ def validate_data(
     Validates the user-provided details against the FIR template.
     """
     try:
-        app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        template_path = os.path.join(app_dir, "fir_template.json")
-        with open(template_path) as f:
-            template = json.load(f)
+        required_fields = templates.required_fields
     except FileNotFoundError:
         return "Error: fir_template.json not found."
-    
-    required_fields = template.get("required_fields", {})
     missing_fields = []
 
     user_details = {
@@ -132,61 +120,43 @@ def validate_data(
         return f"The following information is missing: {', '.join(missing_fields)}"
 
 def upload_fir_to_gcp(fir_data: dict) -> str:
-    """Uploads FIR data to Google Cloud Storage bucket."""
+    """Renders FIR data to PDF and uploads it to Google Cloud Storage bucket."""
     
-    pdf_file_path = create_fir_pdf_from_html(fir_data)
+    pdf_bytes = render_fir_pdf(fir_data)
     
-    if not pdf_file_path:
+    if not pdf_bytes:
         return "Error: Failed to create PDF from HTML template. Check server logs."
     
+    return upload_fir_pdf_to_gcp(pdf_bytes)
+
+def upload_fir_pdf_to_gcp(pdf_bytes: bytes) -> str:
+    """Uploads a rendered FIR PDF to Google Cloud Storage bucket."""
     try:
-        client = storage.Client()
-        bucket_name = os.getenv('GCP_BUCKET_NAME', 'fir-submissions')
-        bucket = client.bucket(bucket_name)
+        fir_id, destination_blob_name = new_fir_blob_name()
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        fir_id = str(uuid.uuid4())[:8]
-        destination_blob_name = f"fir_{timestamp}_{fir_id}.pdf"
+        default_backend().upload(destination_blob_name, pdf_bytes)
         
-        blob = bucket.blob(destination_blob_name)
-        
-        blob.upload_from_filename(pdf_file_path)
-        
-        print(f"FIR uploaded successfully: {destination_blob_name}")
+        logger.info("FIR uploaded successfully: %s", destination_blob_name)
         return f"Success: FIR PDF uploaded with ID {fir_id}"
         
     except Exception as e:
-        print(f"Error uploading to GCP: {e}")
+        logger.error("Error uploading to GCP: %s", e)
         return f"Error: Failed to upload FIR - {str(e)}"
-    
-    finally:
-        if pdf_file_path and os.path.exists(pdf_file_path):
-            os.remove(pdf_file_path)
 
-def create_fir_pdf_from_html(fir_data: dict) -> str:
+def render_fir_pdf(fir_data: dict) -> bytes | None:
+    """Renders FIR data to PDF bytes in this process, without a temp file."""
     try:
-        
-        app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        
-        template_path = os.path.join(app_dir, 'static', "fir_template.html")
-        
-        print(f"Loading HTML template from: {template_path}")
-        
-        with open(template_path, 'r', encoding='utf-8') as f:
-            html_template = f.read()
-            
-        populated_html = html_template
-        for key, value in fir_data.items():
-            placeholder = f"{{{{{key}}}}}"
-            populated_html = populated_html.replace(placeholder, str(value or 'N/A'))
-            
-        html = HTML(string=populated_html, base_url=os.path.join(app_dir, 'static'))
-        temp_pdf_path = f"temp_fir_{uuid.uuid4()}.pdf"
-        html.write_pdf(temp_pdf_path)
-        print(f"Debug1 {temp_pdf_path}")
-        return temp_pdf_path
+        return render_pdf(fir_data)
     except Exception as e:
-        print(f"Error creating PDF from HTML: {e}")
+        logger.error("Error creating PDF from HTML: %s", e)
         return None
-    
-    
\ No newline at end of file
+
+def create_fir_pdf_from_html(fir_data: dict) -> str | None:
+    """Renders FIR data to a temp_fir_<uuid>.pdf file and returns its path; the caller removes it."""
+    pdf_bytes = render_fir_pdf(fir_data)
+    if pdf_bytes is None:
+        return None
+    temp_pdf_path = f"temp_fir_{uuid.uuid4()}.pdf"
+    with open(temp_pdf_path, "wb") as f:
+        f.write(pdf_bytes)
+    return temp_pdf_path
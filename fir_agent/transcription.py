@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import io
+import logging
+import mimetypes
+import time
+import uuid
+
+from .cache import content_key
+from .llm import DEFAULT_MODEL
+from .metrics import stage
+
+TRANSCRIPTION_PROMPT = (
+    "This audio contains an interview between an Investigating Officer (IO) and a complainant for a "
+    "First Information Report (FIR). Your task is to provide a precise, verbatim transcription. "
+    "Differentiate between the speakers by starting each line with either 'Investigating Officer:' or 'Complainant:'. "
+    "The conversation may be multilingual; transcribe all speech accurately."
+)
+
+TERMINAL_STATES = ("done", "failed")
+
+logger = logging.getLogger(__name__)
+
+
+def transcript_cache_key(content_hash: str, model: str = DEFAULT_MODEL) -> str:
+    # Cached transcripts are only reused while the prompt and model are unchanged.
+    tag = hashlib.sha256(f"{model}\n{TRANSCRIPTION_PROMPT}".encode("utf-8")).hexdigest()[:12]
+    return content_key("transcript", content_hash, tag)
+
+
+class TranscriptionJob:
+    """State of one audio transcription, observable by any number of subscribers."""
+
+    def __init__(self, content_hash: str, filename: str):
+        self.job_id = uuid.uuid4().hex
+        self.content_hash = content_hash
+        self.filename = filename
+        self.status = "queued"
+        self.transcription = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self._subscribers = set()
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "filename": self.filename,
+            "transcription": self.transcription,
+            "error": self.error,
+        }
+
+    def set_status(self, status: str, **fields):
+        self.status = status
+        for key, value in fields.items():
+            setattr(self, key, value)
+        if status in TERMINAL_STATES:
+            self.finished = time.time()
+        event = self.to_dict()
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+            if status in TERMINAL_STATES:
+                queue.put_nowait(None)
+
+    def subscribe(self) -> asyncio.Queue:
+        """Returns a queue fed with status events, ending with a None sentinel."""
+        queue = asyncio.Queue()
+        queue.put_nowait(self.to_dict())
+        if self.status in TERMINAL_STATES:
+            queue.put_nowait(None)
+        else:
+            self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+
+class TranscriptionService:
+    """Runs Gemini audio transcriptions as background jobs.
+
+    At most `max_concurrency` jobs talk to Gemini at once; file processing is
+    polled on the event loop with exponential backoff rather than sleeping a
+    thread. Uploads with the same content hash share a single job, and
+    finished transcripts are kept in `cache` so a repeat upload completes
+    without calling Gemini; the cache is read in the job's task, off the
+    event loop.
+    """
+
+    def __init__(self, gemini, cache=None, max_concurrency: int = 4, poll_initial: float = 0.5,
+                 poll_max: float = 8.0, processing_timeout: float = 600.0, retention: float = 3600.0):
+        self.gemini = gemini
+        self.cache = cache
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.processing_timeout = processing_timeout
+        self.retention = retention
+        self.model = gemini.router.model_for("transcription")
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._jobs: dict[str, TranscriptionJob] = {}
+        self._by_hash: dict[str, TranscriptionJob] = {}
+        self._tasks = set()
+
+    @property
+    def active(self) -> int:
+        """Number of transcription jobs still running."""
+        return len(self._tasks)
+
+    def get(self, job_id: str) -> TranscriptionJob | None:
+        return self._jobs.get(job_id)
+
+    def submit(self, data: bytes, filename: str) -> TranscriptionJob:
+        """Starts (or joins) the transcription of `data` and returns its job."""
+        self._prune()
+        content_hash = hashlib.sha256(data).hexdigest()
+        existing = self._by_hash.get(content_hash)
+        if existing and existing.status != "failed":
+            return existing
+        job = TranscriptionJob(content_hash, filename)
+        self._jobs[job.job_id] = job
+        self._by_hash[content_hash] = job
+        task = asyncio.create_task(self._run(job, data))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and job.finished < cutoff:
+                del self._jobs[job_id]
+                if self._by_hash.get(job.content_hash) is job:
+                    del self._by_hash[job.content_hash]
+
+    async def _run(self, job: TranscriptionJob, data: bytes):
+        try:
+            key = transcript_cache_key(job.content_hash, self.model)
+            cached = await asyncio.to_thread(self.cache.get, key) if self.cache else None
+            if cached is not None:
+                job.set_status("done", transcription=cached)
+                return
+            async with self._semaphore:
+                job.set_status("uploading")
+                with stage("transcription"):
+                    text = await self._transcribe(job, data)
+            if self.cache and text:
+                await asyncio.to_thread(self.cache.put, key, text)
+            job.set_status("done", transcription=text)
+            logger.info("Transcription successful: job %s", job.job_id)
+        except Exception as e:
+            logger.error("Error during transcription: %s", e)
+            job.set_status("failed", error=str(e))
+
+    async def _transcribe(self, job: TranscriptionJob, data: bytes) -> str:
+        await self.gemini.warm_up()
+        files = self.gemini.aio.files
+        mime_type = mimetypes.guess_type(job.filename)[0] or "audio/webm"
+        uploaded_file = await files.upload(
+            file=io.BytesIO(data), config={"mime_type": mime_type, "display_name": job.filename}
+        )
+        try:
+            job.set_status("processing")
+            delay = self.poll_initial
+            deadline = time.monotonic() + self.processing_timeout
+            while uploaded_file.state.name == "PROCESSING":
+                if time.monotonic() > deadline:
+                    raise TimeoutError("File processing timed out on the server.")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.poll_max)
+                uploaded_file = await files.get(name=uploaded_file.name)
+
+            if uploaded_file.state.name == "FAILED":
+                raise RuntimeError("File processing failed on the server.")
+            if uploaded_file.state.name != "ACTIVE":
+                raise RuntimeError(f"File could not be processed. State: {uploaded_file.state.name}")
+
+            job.set_status("transcribing")
+            # Each upload is a new file, so the response cache could never hit.
+            response = await self.gemini.generate_content(
+                [TRANSCRIPTION_PROMPT, uploaded_file], model=self.gemini.route("transcription"), cache=False
+            )
+            return response.text
+        finally:
+            try:
+                await files.delete(name=uploaded_file.name)
+            except Exception:
+                pass
@@ -0,0 +1,254 @@
+import asyncio
+import io
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from .metrics import UPLOADS, stage
+
+RESUMABLE_THRESHOLD = 8 * 1024 * 1024
+CHUNK_SIZE = 4 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def new_fir_blob_name() -> tuple[str, str]:
+    """Returns a fresh FIR ID and the object name it is stored under."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    fir_id = str(uuid.uuid4())[:8]
+    return fir_id, f"fir_{timestamp}_{fir_id}.pdf"
+
+
+class GCSBackend:
+    """Uploads to a Google Cloud Storage bucket through one long-lived client.
+
+    The client's HTTP session is given a connection pool sized for the
+    uploader's thread pool. Objects larger than `resumable_threshold` are sent
+    as a resumable upload in `chunk_size` pieces, so a dropped connection only
+    repeats the current chunk.
+    """
+
+    def __init__(self, bucket_name: str, pool_size: int = 8,
+                 resumable_threshold: int = RESUMABLE_THRESHOLD, chunk_size: int = CHUNK_SIZE):
+        self.bucket_name = bucket_name
+        self.pool_size = pool_size
+        self.resumable_threshold = resumable_threshold
+        self.chunk_size = chunk_size
+        self._bucket = None
+        self._lock = threading.Lock()
+
+    def _get_bucket(self):
+        if self._bucket is None:
+            with self._lock:
+                if self._bucket is None:
+                    from google.cloud import storage
+                    from requests.adapters import HTTPAdapter
+
+                    client = storage.Client()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    client._http.mount("https://", adapter)
+                    self._bucket = client.bucket(self.bucket_name)
+        return self._bucket
+
+    def warm_up(self):
+        """Imports the GCS client library and opens the bucket."""
+        self._get_bucket()
+
+    def upload(self, name: str, data: bytes, content_type: str = "application/pdf"):
+        chunk_size = self.chunk_size if len(data) > self.resumable_threshold else None
+        blob = self._get_bucket().blob(name, chunk_size=chunk_size)
+        blob.upload_from_file(io.BytesIO(data), size=len(data), content_type=content_type)
+
+
+class FilesystemBackend:
+    """Local stand-in for a GCS bucket, storing objects under `root/bucket_name`."""
+
+    def __init__(self, root: str, bucket_name: str):
+        self.bucket_dir = Path(root) / bucket_name
+        self.bucket_dir.mkdir(parents=True, exist_ok=True)
+
+    def upload(self, name: str, data: bytes, content_type: str = "application/pdf"):
+        path = self.bucket_dir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.part")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+def create_storage_backend():
+    """Builds the backend selected by FIR_STORAGE_BACKEND (gcs or fs)."""
+    bucket_name = os.getenv("GCP_BUCKET_NAME", "fir-submissions")
+    backend = os.getenv("FIR_STORAGE_BACKEND", "gcs")
+    if backend == "fs":
+        return FilesystemBackend(os.getenv("FIR_STORAGE_FS_ROOT", "fake_gcs"), bucket_name)
+    if backend == "gcs":
+        return GCSBackend(bucket_name, pool_size=int(os.getenv("FIR_UPLOAD_WORKERS", "8")))
+    raise ValueError(f"Unknown FIR_STORAGE_BACKEND: {backend}")
+
+
+_default_backend = None
+
+
+def default_backend():
+    """The process-wide storage backend, created on first use."""
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = create_storage_backend()
+    return _default_backend
+
+
+class Uploader:
+    """Async interface over a blocking storage backend, run on a bounded thread pool."""
+
+    def __init__(self, backend, max_workers: int = 8):
+        self.backend = backend
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fir-upload")
+
+    async def warm_up(self):
+        """Prepares the backend's client, for backends that have one to prepare."""
+        warm_up = getattr(self.backend, "warm_up", None)
+        if warm_up is not None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, warm_up)
+
+    async def upload(self, name: str, data: bytes, content_type: str = "application/pdf"):
+        loop = asyncio.get_running_loop()
+        outcome = "error"
+        try:
+            with stage("storage_upload"):
+                await loop.run_in_executor(self._executor, self.backend.upload, name, data, content_type)
+            outcome = "ok"
+        finally:
+            UPLOADS.inc(outcome=outcome)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+class Outbox:
+    """Durable local queue of PDFs waiting to be uploaded.
+
+    `enqueue` persists the PDF and its metadata to `directory` (fsync'd) and
+    returns immediately; a background worker uploads queued items and retries
+    failures with exponential backoff. Items left over from a previous run are
+    picked up again on start. The queue is also kept in memory, so neither the
+    worker nor `pending` reads the directory after that.
+    """
+
+    def __init__(self, directory: str, uploader: Uploader, concurrency: int = 4,
+                 initial_backoff: float = 2.0, max_backoff: float = 300.0):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.uploader = uploader
+        self.concurrency = concurrency
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self._wakeup = asyncio.Event()
+        self._items: dict[str, dict] = {}
+        self._in_progress = set()
+        self._deliveries = set()
+        self._task = None
+
+    async def enqueue(self, name: str, data: bytes, content_type: str = "application/pdf") -> str:
+        """Persists an object for upload and returns its outbox item ID."""
+        item_id = uuid.uuid4().hex
+        meta = {"name": name, "content_type": content_type, "attempts": 0,
+                "next_attempt": 0.0, "created": time.time()}
+        await asyncio.to_thread(self._persist, item_id, data, meta)
+        self._items[item_id] = meta
+        self._wakeup.set()
+        return item_id
+
+    def _persist(self, item_id: str, data: bytes, meta: dict):
+        # The payload is written before its metadata, so the worker never sees
+        # an item whose PDF is missing.
+        self._write(self.directory / f"{item_id}.bin", data)
+        self._write(self.directory / f"{item_id}.json", json.dumps(meta).encode("utf-8"))
+
+    @staticmethod
+    def _write(path: Path, data: bytes):
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _load(self) -> dict:
+        items = {}
+        for meta_path in self.directory.glob("*.json"):
+            try:
+                items[meta_path.stem] = json.loads(meta_path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                continue
+        return items
+
+    def _remove(self, item_id: str):
+        (self.directory / f"{item_id}.json").unlink(missing_ok=True)
+        (self.directory / f"{item_id}.bin").unlink(missing_ok=True)
+
+    def pending(self) -> int:
+        return len(self._items)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        # Loaded before the first delivery, so an item cannot be read back after it was removed.
+        for item_id, meta in (await asyncio.to_thread(self._load)).items():
+            self._items.setdefault(item_id, meta)
+        slots = asyncio.Semaphore(self.concurrency)
+        while True:
+            self._wakeup.clear()
+            next_wakeup = self.max_backoff
+            now = time.time()
+            for item_id, meta in sorted(self._items.items(), key=lambda item: item[1]["created"]):
+                if item_id in self._in_progress:
+                    continue
+                wait = meta["next_attempt"] - now
+                if wait > 0:
+                    next_wakeup = min(next_wakeup, wait)
+                    continue
+                self._in_progress.add(item_id)
+                await slots.acquire()
+                task = asyncio.create_task(self._deliver(item_id, meta, slots))
+                self._deliveries.add(task)
+                task.add_done_callback(self._deliveries.discard)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), next_wakeup)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver(self, item_id: str, meta: dict, slots: asyncio.Semaphore):
+        meta_path = self.directory / f"{item_id}.json"
+        data_path = self.directory / f"{item_id}.bin"
+        try:
+            data = await asyncio.to_thread(data_path.read_bytes)
+            await self.uploader.upload(meta["name"], data, meta["content_type"])
+            await asyncio.to_thread(self._remove, item_id)
+            self._items.pop(item_id, None)
+            logger.info("FIR uploaded successfully: %s", meta["name"])
+        except Exception as e:
+            meta["attempts"] += 1
+            delay = min(self.max_backoff, self.initial_backoff * 2 ** (meta["attempts"] - 1))
+            meta["next_attempt"] = time.time() + delay
+            await asyncio.to_thread(self._write, meta_path, json.dumps(meta).encode("utf-8"))
+            logger.warning("Upload of %s failed (attempt %d), retrying in %.0fs: %s", meta["name"], meta["attempts"], delay, e)
+        finally:
+            self._in_progress.discard(item_id)
+            slots.release()
+            self._wakeup.set()
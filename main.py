@@ -1,37 +1,71 @@
 import os
 import json
 import base64
+import logging
+import math
 import warnings
 import asyncio
-import shutil
-import tempfile
+import time
+from contextlib import asynccontextmanager
 
 from pathlib import Path
 from dotenv import load_dotenv
 
-from google import genai
-
-from fastapi import FastAPI, Request, File, UploadFile
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
+from fastapi import APIRouter, FastAPI, Request, File, UploadFile, WebSocket, Query
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from google import genai
 
-from fir_agent import tools
-from fir_agent.agent import root_agent
+from fir_agent.live import create_live_backend
+from fir_agent.assets import StaticAssets
+from fir_agent.cache import default_cache
+from fir_agent.extraction import FastPathExtractor
+from fir_agent.history import HistoryManager, estimate_tokens
+from fir_agent.llm import GeminiClient
+from fir_agent.logs import configure_logging, sampled
+from fir_agent.metrics import CHAT_TURNS, PROMPT_TOKENS, TracingMiddleware, record_stage, registry as metrics, stage
+from fir_agent.parsing import DocumentError, DocumentParser, DocumentTooLarge, save_upload
+from fir_agent.pdf import RenderPool, RenderQueueFull
+from fir_agent.readiness import Readiness
+from fir_agent.routing import ModelBusy
+from fir_agent.schema import fir_schema
+from fir_agent.sessions import create_session_store
+from fir_agent.store import FIRStore
+from fir_agent.streaming import ChatStreamParser, TurnBroadcast
+from fir_agent.templates import registry as templates
+from fir_agent.transcription import TranscriptionService
+from fir_agent.uploader import Outbox, Uploader, default_backend, new_fir_blob_name
 
 warnings.filterwarnings("ignore", category=UserWarning, module="pydantic")
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 APP_NAME = "FIR Agent"
 UPLOADS_DIR = Path("uploads")
-UPLOADS_DIR.mkdir(exist_ok=True)
+SESSION_EVICTION_INTERVAL = 60
+CACHE_EVICTION_INTERVAL = 600
+SSE_KEEPALIVE_INTERVAL = 15
+UPLOAD_PREVIEW_CHARS = 1000
+background_tasks = set()
+# Chat turns in progress by (user_id, message); a repeated send joins the running turn.
+chat_turns: dict[tuple, asyncio.Future] = {}
+stream_turns: dict[tuple, TurnBroadcast] = {}
+
 async def client_queue_sse(client_queue: asyncio.Queue):
-    """Yields messages from the client-facing queue."""
+    """Yields messages from the client-facing queue until a None sentinel."""
     while True:
         message = await client_queue.get()
+        if message is None:
+            break
         yield f"data: {json.dumps(message)}\n\n"
-        print(f"[TRANSCRIPTION TO CLIENT]: {message}")
+        logger.debug("SSE event sent", extra=sampled(event=message.get("type")))
+
+
+async def sse_keepalive(done: asyncio.Event):
+    """Yields SSE comments while the model is thinking so proxies keep the stream open."""
+    while not done.is_set():
+        try:
+            await asyncio.wait_for(done.wait(), SSE_KEEPALIVE_INTERVAL)
+        except asyncio.TimeoutError:
+            yield ": keepalive\n\n"
 
 
 async def merge_streams(stream1, stream2):
@@ -61,221 +95,608 @@ async def merge_streams(stream1, stream2):
         if not task1 and not task2:
             break
         elif not task1:
-            yield await task2
+            try:
+                yield await task2
+            except StopAsyncIteration:
+                break
             async for item in stream2: yield item
             break
         elif not task2:
-            yield await task1
+            try:
+                yield await task1
+            except StopAsyncIteration:
+                break
             async for item in stream1: yield item
             break
 
-app = FastAPI()
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-STATIC_DIR = Path("static")
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
-
-active_sessions = {}
-
-conversation_history = []
-extracted_info = {}
-
-@app.post("/upload/{user_id}")
-async def upload_file(user_id: str, file: UploadFile = File(...)):
-    """Uploads a file, parses it, and sends the content to the agent."""
-
-    file_path = UPLOADS_DIR / file.filename
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Creates the shared Gemini client, PDF render and parsing pools and upload outbox once and closes them on shutdown.
+
+    Nothing here imports google-genai, WeasyPrint, the document parsers or
+    the GCS client; those warm up in the background, tracked by /ready.
+    """
+    app.state.sessions = sessions = create_session_store()
+    app.state.cache = default_cache()
+    app.state.gemini = GeminiClient.from_env(response_cache=app.state.cache)
+    app.state.render_pool = RenderPool.from_env()
+    app.state.parser = DocumentParser.from_env()
+    app.state.live_backend = create_live_backend(app.state.gemini)
+    app.state.history = HistoryManager.from_env(sessions, app.state.cache, app.state.gemini)
+    app.state.fast_path = FastPathExtractor.from_env()
+    app.state.firs = FIRStore.from_env()
+    app.state.transcriptions = TranscriptionService(
+        app.state.gemini, cache=app.state.cache, max_concurrency=int(os.getenv("FIR_TRANSCRIPTION_CONCURRENCY", "4"))
+    )
+    uploader = Uploader(default_backend(), max_workers=int(os.getenv("FIR_UPLOAD_WORKERS", "8")))
+    app.state.outbox = Outbox(os.getenv("FIR_OUTBOX_DIR", "outbox"), uploader)
+    app.state.outbox.start()
+    readiness = app.state.readiness = Readiness()
+    readiness.start("gemini", app.state.gemini.warm_up())
+    readiness.start("chat_schema", asyncio.to_thread(warm_chat_schema, app.state.fast_path))
+    readiness.start("render_pool", app.state.render_pool.warm_up())
+    readiness.start("parser", app.state.parser.warm_up())
+    readiness.start("storage", uploader.warm_up())
+    register_queue_gauges(app.state)
+    eviction_task = asyncio.create_task(evict_idle_sessions(sessions))
+    cache_eviction_task = asyncio.create_task(evict_cache_entries(app.state.cache))
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        print(f"Parsing document: {file_path}")
-        parsed_text = tools.parse_document(str(file_path))
-
-        if parsed_text.startswith("Error:"):
-            print(f"Failed to parse document: {parsed_text}")
-            return {"success": False, "message": parsed_text}, 400
-        
-        document_message = f"I have uploaded a document ({file.filename}). Here is the content: {parsed_text}"
-        conversation_history.append({"role": "user", "content": document_message})
-        
-        print(f"[CLIENT TO AGENT]: Parsed content from {file.filename}")
-        return {"success": True, "parsed_content": parsed_text}
+        yield
+    finally:
+        eviction_task.cancel()
+        cache_eviction_task.cancel()
+        readiness.cancel()
+        await app.state.outbox.stop()
+        uploader.shutdown()
+        app.state.render_pool.shutdown()
+        app.state.parser.shutdown()
+        await app.state.gemini.aclose()
+
+
+def warm_chat_schema(fast_path):
+    """Loads the FIR template and builds the chat response schema and gazetteer patterns."""
+    templates.system_prompt
+    fir_schema().turn_model.model_json_schema()
+    fast_path.extract("")
+
+def register_queue_gauges(state):
+    """Exposes the depth of each work queue on /metrics, read at scrape time."""
+    metrics.gauge("fir_render_pending", "PDF renders queued or running.", lambda: state.render_pool.pending)
+    metrics.gauge("fir_model_in_flight", "Gemini calls holding a concurrency slot.", lambda: state.gemini.in_flight)
+    metrics.gauge("fir_model_budget_tokens", "Tokens drawn from the per-minute model budgets.", state.gemini.budget_used)
+    metrics.gauge("fir_outbox_pending", "PDFs persisted and waiting for upload.", state.outbox.pending)
+    metrics.gauge("fir_transcriptions_active", "Transcription jobs not yet finished.", lambda: state.transcriptions.active)
+    metrics.gauge("fir_chat_streams_active", "Streamed chat turns in progress.", lambda: len(background_tasks))
+    metrics.gauge("fir_sessions", "Sessions held by the session store.", lambda: state.sessions.stats()["sessions"])
+    metrics.gauge("fir_cache_hit_rate", "Content cache hit rate since start.", lambda: state.cache.stats()["hit_rate"])
+    metrics.gauge("fir_ready", "1 once every subsystem has warmed up.", lambda: int(state.readiness.ready))
+
+async def evict_idle_sessions(sessions):
+    """Periodically drops sessions that have been idle for longer than the TTL."""
+    while True:
+        await asyncio.sleep(SESSION_EVICTION_INTERVAL)
+        evicted = await asyncio.to_thread(sessions.evict_expired)
+        if evicted:
+            logger.info("Evicted %d idle sessions", evicted)
 
+async def evict_cache_entries(cache):
+    """Periodically trims expired and over-budget entries from the content cache."""
+    while True:
+        await asyncio.sleep(CACHE_EVICTION_INTERVAL)
+        evicted = await asyncio.to_thread(cache.evict)
+        if evicted:
+            logger.info("Evicted %d cached documents and transcripts", evicted)
+
+router = APIRouter()
+
+@router.post("/upload/{user_id}")
+async def upload_file(request: Request, user_id: str, file: UploadFile = File(...)):
+    """Uploads a file, parses it, and attaches the text to the session for the agent.
+
+    The response carries only the start of the text and its length; the full
+    text stays on the server, in the content cache.
+    """
+    parser = request.app.state.parser
+    file_path = None
+    try:
+        file_path, digest = await save_upload(file, UPLOADS_DIR, parser.max_bytes)
+        cache = request.app.state.cache
+        cache_key = parser.cache_key(digest)
+        parsed_text = await asyncio.to_thread(cache.get, cache_key)
+        if parsed_text is None:
+            logger.info("Parsing document", extra=sampled(filename=file.filename))
+            parsed_text = await parser.parse(file_path)
+            await asyncio.to_thread(cache.put, cache_key, parsed_text)
+        else:
+            logger.info("Parsed document served from cache", extra=sampled(filename=file.filename))
+
+        history = request.app.state.history
+        sessions = request.app.state.sessions
+        async with history.lock(user_id):
+            await asyncio.to_thread(
+                sessions.update, user_id,
+                lambda session: history.attach_document(session, file.filename, cache_key, parsed_text),
+            )
+
+        return {"success": True, "parsed_content": parsed_text[:UPLOAD_PREVIEW_CHARS], "parsed_chars": len(parsed_text)}
+
+    except DocumentTooLarge as e:
+        logger.warning("Rejected document %s: %s", file.filename, e)
+        return JSONResponse({"success": False, "message": str(e)}, status_code=413)
+    except DocumentError as e:
+        logger.warning("Failed to parse document %s: %s", file.filename, e)
+        return JSONResponse({"success": False, "message": str(e)}, status_code=400)
     except Exception as e:
-        return {"success": False, "message": str(e)}, 500
+        return JSONResponse({"success": False, "message": f"Error parsing document: {e}"}, status_code=500)
     finally:
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        if file_path is not None:
+            file_path.unlink(missing_ok=True)
 
 
-@app.get("/")
-async def root():
+@router.get("/")
+async def root(request: Request):
     """Serves the index.html"""
-    return FileResponse(os.path.join(STATIC_DIR, "index.html"))
+    return await static_response(request, "index.html")
 
-@app.post("/transcribe_audio")
-async def transcribe_audio_endpoint(audio_file: UploadFile = File(...)):
-    """Accepts a recorded audio file, transcribes it via Gemini, and returns the text."""
+@router.api_route("/static/{path:path}", methods=["GET", "HEAD"])
+async def static_asset(path: str, request: Request):
+    """Serves a UI asset: cacheable for good under its content-hashed name, revalidated under its plain name."""
+    return await static_response(request, path)
 
-    try:
-        orig_suffix = Path(audio_file.filename).suffix or ".webm"
-        with tempfile.NamedTemporaryFile(delete=False, suffix=orig_suffix) as tmp:
-            content = await audio_file.read()
-            tmp.write(content)
-            tmp_path = tmp.name
+async def static_response(request: Request, path: str) -> Response:
+    status, headers, body = await request.app.state.assets.respond(path, request.headers)
+    return Response(b"" if request.method == "HEAD" else body, status_code=status, headers=headers)
 
-        transcription = tools.transcribe_audio_file(tmp_path)
+@router.post("/transcribe_audio")
+async def transcribe_audio_endpoint(request: Request, audio_file: UploadFile = File(...)):
+    """Starts transcribing a recorded audio file and returns the job ID.
 
-        try:
-            os.unlink(tmp_path)
-        except Exception:
-            pass
+    Progress and the transcript arrive on /transcribe_audio/{job_id}/events.
+    """
 
-        if isinstance(transcription, str) and transcription.startswith("Error:"):
-            return JSONResponse({"success": False, "message": transcription}, status_code=500)
-
-        return {"success": True, "transcription": transcription, "filename": audio_file.filename}
+    try:
+        content = await audio_file.read()
+        filename = audio_file.filename or "recorded_audio.webm"
+        job = request.app.state.transcriptions.submit(content, filename)
+        return {"success": True, **job.to_dict()}
 
     except Exception as e:
         return JSONResponse({"success": False, "message": str(e)}, status_code=500)
 
-@app.post("/chat")
-async def chat_endpoint(request: Request):
-    global conversation_history, extracted_info
-    
+@router.get("/transcribe_audio/{job_id}")
+async def transcription_status(job_id: str, request: Request):
+    """Returns the current state of a transcription job."""
+    job = request.app.state.transcriptions.get(job_id)
+    if job is None:
+        return JSONResponse({"success": False, "message": "Unknown transcription job"}, status_code=404)
+    return {"success": True, **job.to_dict()}
+
+@router.get("/transcribe_audio/{job_id}/events")
+async def transcription_events(job_id: str, request: Request):
+    """Streams a transcription job's status changes as SSE until it finishes."""
+    job = request.app.state.transcriptions.get(job_id)
+    if job is None:
+        return JSONResponse({"success": False, "message": "Unknown transcription job"}, status_code=404)
+
+    async def events():
+        queue = job.subscribe()
+        try:
+            async for message in client_queue_sse(queue):
+                yield message
+        finally:
+            job.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+async def chat_config(gemini, model: str):
+    """Generation config for a chat turn: the system prompt and the FIR response schema."""
+    with stage("template_load"):
+        system_prompt, turn_model = templates.system_prompt, fir_schema().turn_model
+    return await gemini.system_config(
+        system_prompt,
+        model=model,
+        response_mime_type="application/json",
+        response_schema=turn_model,
+    )
+
+@router.post("/chat/{user_id}")
+async def chat_endpoint(user_id: str, request: Request):
     body = await request.json()
     user_text = body.get("message", "").strip()
     if not user_text:
         return JSONResponse({"error": "Empty message"}, status_code=400)
 
+    key = (user_id, user_text)
+    turn = chat_turns.get(key)
+    if turn is None:
+        turn = asyncio.ensure_future(run_chat_turn(request.app.state, user_id, user_text))
+        chat_turns[key] = turn
+        turn.add_done_callback(lambda _: chat_turns.pop(key, None))
+    else:
+        CHAT_TURNS.inc(answered_by="coalesced")
     try:
-        with open("fir_template.json", "r") as f:
-            fir_template_str = f.read()
-            
-        combined_input_for_ai = (
-            f"Current FIR Data: {json.dumps(extracted_info)}\n"
-            f"User Message: \"{user_text}\""
-        )
+        return await asyncio.shield(turn)
+    except ModelBusy as e:
+        return JSONResponse({"error": str(e)}, status_code=503, headers={"Retry-After": str(math.ceil(e.retry_after))})
+    except Exception as e:
+        logger.exception("Chat turn failed for %s", user_id)
+        return JSONResponse({"error": str(e)}, status_code=500)
 
-        conversation_history.append({"role": "user", "content": combined_input_for_ai})
-        
-        client = genai.Client()
-        system_prompt = (
-            f"""
-            ## Persona and Role:
-            You are an AI Assistant for Indian Police Investigating Officers (IOs), designated as the 'FIR Drafting Assistant'. Your purpose is to efficiently and accurately fill out a First Information Report (FIR) JSON object based on the user's input.
-
-            ## Core Workflow:
-            1.  **Maintain State**: You are a stateful assistant. In every turn, you will be given the current state of the FIR data as a JSON object. Your primary job is to UPDATE this JSON with any new information found in the user's latest message. DO NOT forget or overwrite existing data unless the user explicitly corrects it.
-            2.  **Extract Information**: Analyze the user's text to find details that match the fields in the provided JSON structure. You must be able to handle mixed languages (e.g., Hindi-English).
-            3.  **Ask for Missing Required Fields**: After extraction, if any of the `required_fields` in the JSON are still `null`, you MUST ask the user for the missing information in a clear, bulleted list.
-            4.  **Output Format**: Your response MUST be in two parts, separated by '---JSON---'.
-                - Part 1: Your conversational text to the user (e.g., asking for missing info).
-                - Part 2: The COMPLETE and UPDATED JSON object.
-
-            ## Example Interaction:
-
-            **User provides current data and a new message:**
-            '''
-            Current FIR Data: {{"district": null, "policeStation": null, "complainantName": "Rohan Sharma"}}
-            User Message: "The incident happened in the district of Gurugram at the Cyber City police station."
-            '''
-
-            **Your Correct Output:**
-            '''
-            Thank you. I have updated the district and police station. To proceed, please provide the following required details:
-            * firYear
-            * firNo
-            * firDate
-            * complainantAddress
-            * firContents
-            ---JSON---
-            {{
-                "required_fields": {{
-                    "district": "Gurugram",
-                    "policeStation": "Cyber City",
-                    "firYear": null,
-                    "firNo": null,
-                    "firDate": null,
-                    "complainantName": "Rohan Sharma",
-                    "complainantAddress": null,
-                    "firContents": null
-                }},
-                "optional_fields": {{}}
-            }}
-            '''
-
-            ## Final JSON Structure to be filled:
-            Your final goal is to fill out this exact JSON structure. Do not add or remove keys.
-            {fir_template_str}
-            """
-        )
-        
-        messages = [{"role": "user", "parts": [{"text": system_prompt}]}]
-        
-        for msg in conversation_history[-10:]: 
-            messages.append({"role": "user" if msg["role"] == "user" else "model", "parts": [{"text": msg["content"]}]})
-        
-        resp = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=messages,
-        )
-        
-        full_response_text = getattr(resp, "text", "")
-        
-        response_parts = full_response_text.split("---JSON---")
-        response_text = response_parts[0].strip()
-        
-        if len(response_parts) > 1:
-            json_string = response_parts[1].strip()
-            try:
-                if json_string.startswith("```json"):
-                    json_string = json_string[7:]
-                if json_string.endswith("```"):
-                    json_string = json_string[:-3]
-                json_string = json_string.strip()
-                nested_data = json.loads(json_string)
-                flat_data = {}
-                if 'required_fields' in nested_data and nested_data['required_fields']:
-                    flat_data.update(nested_data['required_fields'])
-                if 'optional_fields' in nested_data and nested_data['optional_fields']:
-                    flat_data.update(nested_data['optional_fields'])
-
-                for key, value in flat_data.items():
-                    if value and value != "null" and str(value).strip():
-                        extracted_info[key] = value
-
-            except json.JSONDecodeError as e:
-                print(f"Failed to parse or process extracted JSON: {e}")
-                print(f"Problematic JSON string: {json_string}")
-        
-        conversation_history.append({"role": "assistant", "content": response_text})
-        
-        return {
+async def run_chat_turn(state, user_id: str, user_text: str) -> dict:
+    history = state.history
+    async with history.lock(user_id):
+        session = await load_session(state, user_id)
+        # The turn works on copies (the in-memory store hands out the live session);
+        # the session only changes once the turn has an answer.
+        before = dict(session.extracted_info)
+        extracted_info = dict(before)
+        with stage("fast_path"):
+            extraction = state.fast_path.extract(user_text)
+        if extraction.complete:
+            extraction.merge_into(extracted_info)
+            response_text = await answer_locally(state, session, user_text, extraction, before, extracted_info)
+            await autosave_draft(state, user_id, before, extracted_info)
+            return {"text": response_text, "extracted_info": extracted_info, "prompt_tokens": 0}
+
+        with stage("prompt_build"):
+            messages, prompt_tokens, read = await history.build_messages(
+                session, user_text, extracted_info, hints=extraction.fields
+            )
+        PROMPT_TOKENS.observe(prompt_tokens)
+        gemini = state.gemini
+        model = gemini.route("chat", prompt_tokens, estimate_tokens(user_text))
+        config = await chat_config(gemini, model)
+
+        resp = await gemini.generate_content(messages, model=model, config=config)
+
+        with stage("json_parse"):
+            parser = ChatStreamParser()
+            schema = fir_schema()
+            for event in parser.feed(getattr(resp, "text", None) or "") + parser.close():
+                if event[0] == "field":
+                    schema.merge_field(event[1], event[2], extracted_info)
+            response_text = parser.text.strip()
+        CHAT_TURNS.inc(answered_by="model")
+
+        session = await commit_turn(state, session, user_text, response_text, before, extracted_info, prompt_tokens, read)
+        await autosave_draft(state, user_id, before, extracted_info)
+    if history.needs_compaction(session):
+        history.compact_later(user_id)
+
+    return {
+        "text": response_text,
+        "extracted_info": extracted_info,
+        "prompt_tokens": prompt_tokens,
+    }
+
+@router.post("/chat_stream/{user_id}")
+async def chat_stream_endpoint(user_id: str, request: Request):
+    """Streams the reply as SSE: text tokens, then field updates as each FIR field closes.
+
+    Sending the same message again while its turn is running (a double-click)
+    joins that turn's stream instead of starting a second one.
+    """
+    body = await request.json()
+    user_text = body.get("message", "").strip()
+    if not user_text:
+        return JSONResponse({"error": "Empty message"}, status_code=400)
+
+    key = (user_id, user_text)
+    turn = stream_turns.get(key)
+    if turn is None:
+        turn = stream_turns[key] = TurnBroadcast()
+        task = asyncio.create_task(stream_chat_reply(request.app.state, user_id, user_text, turn, turn.done))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+        task.add_done_callback(lambda _: stream_turns.pop(key, None))
+    else:
+        CHAT_TURNS.inc(answered_by="coalesced")
+    client_queue = turn.subscribe()
+    return StreamingResponse(
+        merge_streams(client_queue_sse(client_queue), sse_keepalive(turn.done)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def load_session(state, user_id: str):
+    """Returns the session, restoring the fields of its saved draft if the session started over."""
+    session = await asyncio.to_thread(state.sessions.get, user_id)
+    if not session.extracted_info and not session.history:
+        session.extracted_info.update(await asyncio.to_thread(state.firs.fields, user_id))
+    return session
+
+async def autosave_draft(state, user_id: str, before: dict, extracted_info: dict):
+    """Writes the fields a turn changed to the user's draft."""
+    changes = {key: value for key, value in extracted_info.items() if before.get(key) != value}
+    if changes:
+        with stage("draft_autosave"):
+            saved = await asyncio.to_thread(state.firs.save_fields, user_id, changes)
+        if not saved:
+            logger.info("Not autosaving %s: the FIR has already been submitted", user_id)
+
+async def commit_turn(state, session, user_text: str, response_text: str, before: dict, extracted_info: dict,
+                      prompt_tokens: int = 0, read=()):
+    """Adds a finished turn to the stored session and returns it.
+
+    The turn is applied to the session as stored now, which another worker
+    may have changed meanwhile: the fields this turn changed win, and
+    fields the stored copy lacks (such as ones restored from the draft)
+    are filled in.
+    """
+    def apply(current):
+        current.extracted_info.update({
+            key: value for key, value in extracted_info.items()
+            if before.get(key) != value or key not in current.extracted_info
+        })
+        state.history.record_turn(current, user_text, response_text, prompt_tokens, read)
+
+    return await asyncio.to_thread(state.sessions.update, session.session_id, apply)
+
+async def answer_locally(state, session, user_text: str, extraction, before: dict, extracted_info: dict) -> str:
+    """Completes a turn whose message the fast-path rules fully resolved, without the model."""
+    response_text = extraction.reply(extracted_info)
+    await commit_turn(state, session, user_text, response_text, before, extracted_info)
+    CHAT_TURNS.inc(answered_by="rules")
+    return response_text
+
+async def stream_chat_reply(state, user_id: str, user_text: str, client_queue: asyncio.Queue, done: asyncio.Event):
+    """Runs one streamed chat turn, pushing events onto the client queue.
+
+    When the fast-path rules account for the whole message, their fields
+    are published and the model is skipped. Otherwise they only go to the
+    model as hints, since the message may negate or correct them.
+    """
+    gemini, history = state.gemini, state.history
+    parser = ChatStreamParser()
+    started = time.perf_counter()
+    ttft_ms = None
+    parse_seconds = 0.0
+    try:
+        async with history.lock(user_id):
+            session = await load_session(state, user_id)
+            before = dict(session.extracted_info)
+            extracted_info = dict(before)
+            with stage("fast_path"):
+                extraction = state.fast_path.extract(user_text)
+            if extraction.complete:
+                for key in extraction.merge_into(extracted_info):
+                    await client_queue.put({"type": "field", "key": key, "value": extracted_info[key]})
+                response_text = await answer_locally(state, session, user_text, extraction, before, extracted_info)
+                await autosave_draft(state, user_id, before, extracted_info)
+                await client_queue.put({"type": "text", "text": response_text})
+                await client_queue.put({
+                    "type": "done",
+                    "text": response_text,
+                    "extracted_info": extracted_info,
+                    "prompt_tokens": 0,
+                    "ttft_ms": (time.perf_counter() - started) * 1000,
+                    "total_ms": (time.perf_counter() - started) * 1000,
+                })
+                return
+
+            with stage("prompt_build"):
+                messages, prompt_tokens, read = await history.build_messages(
+                    session, user_text, extracted_info, hints=extraction.fields
+                )
+            PROMPT_TOKENS.observe(prompt_tokens)
+            model = gemini.route("chat", prompt_tokens, estimate_tokens(user_text))
+            config = await chat_config(gemini, model)
+            async for chunk in gemini.generate_content_stream(messages, model=model, config=config):
+                chunk_text = getattr(chunk, "text", None)
+                if not chunk_text:
+                    continue
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                parse_started = time.perf_counter()
+                events = parser.feed(chunk_text)
+                parse_seconds += time.perf_counter() - parse_started
+                for event in events:
+                    await publish_chat_event(event, extracted_info, client_queue)
+            for event in parser.close():
+                await publish_chat_event(event, extracted_info, client_queue)
+            record_stage("json_parse", parse_seconds)
+            CHAT_TURNS.inc(answered_by="model")
+
+            response_text = parser.text.strip()
+            session = await commit_turn(state, session, user_text, response_text, before, extracted_info, prompt_tokens, read)
+            await autosave_draft(state, user_id, before, extracted_info)
+        if history.needs_compaction(session):
+            history.compact_later(user_id)
+
+        total_ms = (time.perf_counter() - started) * 1000
+        logger.info("Chat stream turn", extra=sampled(
+            session=user_id, prompt_tokens=prompt_tokens, ttft_ms=round(ttft_ms or 0), total_ms=round(total_ms)
+        ))
+        await client_queue.put({
+            "type": "done",
             "text": response_text,
-            "extracted_info": extracted_info 
-        }
-        
+            "extracted_info": extracted_info,
+            "prompt_tokens": prompt_tokens,
+            "ttft_ms": ttft_ms,
+            "total_ms": total_ms,
+        })
+    except ModelBusy as e:
+        await client_queue.put({"type": "error", "error": str(e), "retry_after": math.ceil(e.retry_after)})
     except Exception as e:
-        return JSONResponse({"error": str(e)}, status_code=500)
+        logger.exception("Chat stream turn failed for %s", user_id)
+        await client_queue.put({"type": "error", "error": str(e)})
+    finally:
+        await client_queue.put(None)
+        done.set()
+
+async def publish_chat_event(event: tuple, extracted_info: dict, client_queue: asyncio.Queue):
+    if event[0] == "text":
+        await client_queue.put({"type": "text", "text": event[1]})
+    elif fir_schema().merge_field(event[1], event[2], extracted_info):
+        await client_queue.put({"type": "field", "key": event[1], "value": extracted_info[event[1]]})
+
+LIVE_DRAIN_TIMEOUT = 10
+
+@router.websocket("/ws/live/{user_id}")
+async def live_interview(websocket: WebSocket, user_id: str):
+    """Live interview: binary 16 kHz PCM frames in, transcripts and form updates out.
+
+    Partial transcripts are sent as soon as the model produces them. Each
+    completed utterance is run through a chat turn so extracted fields reach
+    the form while the interview is still going. A {"type": "stop"} text frame
+    ends the audio stream.
+    """
+    await websocket.accept()
+    outbound = asyncio.Queue()
+    utterances = asyncio.Queue()
+    sender = asyncio.create_task(send_live_messages(websocket, outbound))
+    extractor = asyncio.create_task(
+        extract_live_utterances(websocket.app.state, user_id, utterances, outbound)
+    )
+    try:
+        async with websocket.app.state.live_backend.connect() as stream:
+            transcripts = asyncio.create_task(
+                forward_live_transcripts(stream, utterances, outbound)
+            )
+            try:
+                while True:
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        break
+                    if message.get("bytes") is not None:
+                        await stream.send_audio(message["bytes"])
+                    elif message.get("text") and json.loads(message["text"]).get("type") == "stop":
+                        break
+                await stream.end_audio()
+                await asyncio.wait_for(asyncio.shield(transcripts), LIVE_DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                transcripts.cancel()
+        await utterances.put(None)
+        await extractor
+        await outbound.put({"type": "done"})
+    except Exception as e:
+        logger.warning("Live interview error: %s", e)
+        await outbound.put({"type": "error", "error": str(e)})
+    finally:
+        extractor.cancel()
+        await outbound.put(None)
+        await sender
 
-@app.get("/get_extracted_info")
-async def get_extracted_info():
+async def send_live_messages(websocket: WebSocket, outbound: asyncio.Queue):
+    """Single writer for the live socket, so concurrent producers never interleave frames."""
+    try:
+        while (message := await outbound.get()) is not None:
+            await websocket.send_json(message)
+        await websocket.close()
+    except Exception:
+        pass
+
+async def forward_live_transcripts(stream, utterances: asyncio.Queue, outbound: asyncio.Queue):
+    async for kind, text in stream.events():
+        await outbound.put({"type": kind, "text": text})
+        if kind == "utterance":
+            await utterances.put(text)
+
+async def extract_live_utterances(state, user_id: str, utterances: asyncio.Queue, outbound: asyncio.Queue):
+    """Runs one chat turn per utterance, in order, forwarding field updates and replies."""
+    while (text := await utterances.get()) is not None:
+        client_queue = asyncio.Queue()
+        done = asyncio.Event()
+        turn = asyncio.create_task(
+            stream_chat_reply(state, user_id, f"[Live interview] {text}", client_queue, done)
+        )
+        while (event := await client_queue.get()) is not None:
+            if event["type"] == "field":
+                await outbound.put(event)
+            elif event["type"] == "done":
+                await outbound.put({"type": "reply", "text": event["text"]})
+        await turn
+
+@router.get("/get_extracted_info/{user_id}")
+async def get_extracted_info(user_id: str, request: Request):
     """Returns currently extracted information for form auto-fill."""
-    global extracted_info
-    return {"extracted_info": extracted_info}
-
-@app.post("/submit_fir")
-async def submit_fir_endpoint(request: Request):
-    """Accepts FIR form data and uploads it to GCP storage."""
+    state = request.app.state
+    session = await asyncio.to_thread(state.sessions.peek, user_id)
+    if session is not None and (session.extracted_info or session.history):
+        return {"extracted_info": session.extracted_info}
+    # No session yet, or one that started over: the next chat turn resumes the saved draft.
+    return {"extracted_info": await asyncio.to_thread(state.firs.fields, user_id)}
+
+@router.get("/drafts/{record_id}")
+async def get_draft(record_id: str, request: Request):
+    """Returns a saved draft or submitted FIR with all of its fields, to resume or review it."""
+    record = await asyncio.to_thread(request.app.state.firs.get, record_id)
+    if record is None:
+        return JSONResponse({"success": False, "message": "Unknown draft"}, status_code=404)
+    return record
+
+@router.get("/firs")
+async def search_firs(
+    request: Request,
+    district: str | None = None,
+    police_station: str | None = None,
+    fir_year: int | None = None,
+    fir_no: str | None = None,
+    complainant: str | None = None,
+    status: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+):
+    """Searches drafts and submitted FIRs, newest first; pass `next_cursor` back as `cursor` for the next page."""
+    try:
+        return await asyncio.to_thread(
+            request.app.state.firs.search, district=district, police_station=police_station, fir_year=fir_year,
+            fir_no=fir_no, complainant=complainant, status=status, limit=limit, cursor=cursor,
+        )
+    except ValueError:
+        return JSONResponse({"success": False, "message": "Invalid cursor"}, status_code=400)
+
+@router.get("/sessions/{user_id}/context")
+async def session_context(user_id: str, request: Request):
+    """Reports what the next prompt for a session is built from, and recent prompt sizes."""
+    session = await asyncio.to_thread(request.app.state.sessions.peek, user_id)
+    if session is None:
+        return JSONResponse({"success": False, "message": "Unknown session"}, status_code=404)
+    return {
+        "prompt_tokens": session.prompt_tokens,
+        "summary_tokens": estimate_tokens(session.summary),
+        "recent_turns": len(session.history),
+        "recent_tokens": sum(msg.get("tokens", 0) for msg in session.history),
+        "documents": [{"name": d["name"], "tokens": d["tokens"]} for d in session.documents],
+    }
+
+@router.get("/sessions/stats")
+async def session_stats(request: Request):
+    """Reports how many sessions are held and their approximate size."""
+    return await asyncio.to_thread(request.app.state.sessions.stats)
+
+@router.get("/outbox/stats")
+async def outbox_stats(request: Request):
+    """Reports how many submitted FIR PDFs are still waiting to be uploaded."""
+    return {"pending": request.app.state.outbox.pending()}
+
+@router.get("/cache/stats")
+async def cache_stats(request: Request):
+    """Reports hit rates and sizes of the parsed-document and transcript cache."""
+    return await asyncio.to_thread(request.app.state.cache.stats)
+
+@router.get("/ready")
+async def readiness_endpoint(request: Request):
+    """Reports each subsystem's warm-up; 503 until all are warm, for load balancer readiness checks."""
+    readiness = request.app.state.readiness
+    return JSONResponse(
+        {"ready": readiness.ready, "subsystems": readiness.status()},
+        status_code=200 if readiness.ready else 503,
+    )
+
+@router.get("/metrics")
+async def metrics_endpoint():
+    """Request and stage latency histograms, token counts and queue depths for Prometheus."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.post("/submit_fir")
+async def submit_fir_endpoint(request: Request, draft_id: str | None = None):
+    """Accepts FIR form data, renders the PDF and queues it for upload to GCP storage.
+
+    The FIR is recorded in the FIR store, under `draft_id` when it completes a draft.
+    """
     try:
         fir_data = await request.json()
     #     required_fields = [
@@ -294,13 +715,43 @@ async def submit_fir_endpoint(request: Request):
     #             status_code=400
     #         )
         
-        # Upload to GCP
-        upload_result = tools.upload_fir_to_gcp(fir_data)
-        
-        if upload_result.startswith("Success:"):
-            return {"success": True, "message": upload_result}
-        else:
-            return JSONResponse({"success": False, "message": upload_result}, status_code=500)
+        try:
+            pdf_bytes = await request.app.state.render_pool.render(fir_data)
+        except RenderQueueFull as e:
+            return JSONResponse({"success": False, "message": str(e)}, status_code=503)
+
+        # Queue for upload to GCP; the outbox worker retries until it lands.
+        fir_id, destination_blob_name = new_fir_blob_name()
+        await request.app.state.outbox.enqueue(destination_blob_name, pdf_bytes)
+        record_id = await asyncio.to_thread(
+            request.app.state.firs.submit, draft_id, fir_data, fir_id, destination_blob_name
+        )
+        return {
+            "success": True,
+            "message": f"Success: FIR PDF queued for upload with ID {fir_id}",
+            "fir_id": fir_id,
+            "record_id": record_id,
+        }
             
     except Exception as e:
-        return JSONResponse({"success": False, "message": str(e)}, status_code=500)
\ No newline at end of file
+        logger.exception("FIR submission failed")
+        return JSONResponse({"success": False, "message": str(e)}, status_code=500)
+
+
+def create_app() -> FastAPI:
+    """Builds the FastAPI app; `uvicorn --factory main:create_app` calls this in each worker."""
+    load_dotenv()
+    configure_logging()
+    UPLOADS_DIR.mkdir(exist_ok=True)
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(TracingMiddleware)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.state.assets = StaticAssets.from_env()
+    app.include_router(router)
+    return app
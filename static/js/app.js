@@ -1,5 +1,12 @@
 // Test comment
-const sessionId = Math.random().toString().substring(10);
+import { startAudioRecorderWorklet, stopMicrophone } from "./audio-recorder.js";
+
+// The draft ID survives reloads (or comes from ?draft=<id>), so the server-side draft is resumed.
+const sessionId =
+  new URLSearchParams(window.location.search).get("draft") ||
+  localStorage.getItem("firDraftId") ||
+  Math.random().toString().substring(10);
+localStorage.setItem("firDraftId", sessionId);
 const upload_url = "http://" + window.location.host + "/upload/" + sessionId;
 const messageForm = document.getElementById("messageForm");
 const messageInput = document.getElementById("message");
@@ -7,12 +14,25 @@ const messagesDiv = document.getElementById("messages");
 const attachmentButton = document.getElementById("attachmentButton");
 const fileInput = document.getElementById("fileInput");
 let is_audio;
+const extractedInfo = {};
 document.getElementById("sendButton").disabled = false;
 addSubmitHandler();
+resumeDraft();
+
+async function resumeDraft() {
+  try {
+    const resp = await fetch(`http://${window.location.host}/get_extracted_info/${sessionId}`);
+    if (resp.ok) Object.assign(extractedInfo, (await resp.json()).extracted_info || {});
+  } catch (e) {
+    console.error("Failed to load draft:", e);
+  }
+}
 
 function addSubmitHandler() {
   messageForm.onsubmit = function (e) {
     e.preventDefault();
+    // A turn is already streaming; Enter must not start another.
+    if (document.getElementById("sendButton").disabled) return false;
     const message = messageInput.value;
     if (message) {
       const p = document.createElement("p");
@@ -58,14 +78,15 @@ async function uploadFile(file) {
     const result = await response.json();
     if (!response.ok) {
       p.textContent = `Error uploading ${file.name}: ${
-        result.detail || "Server error"
+        result.message || result.detail || "Server error"
       }`;
     } else {
       p.textContent = `Successfully uploaded and parsed ${file.name}.`;
 
       if (result.parsed_content) {
+        // The server keeps the document text and includes what is relevant.
         await chatMessage(
-          `I have uploaded a document (${file.name}). Here is the content: ${result.parsed_content}`
+          `I have uploaded a document (${file.name}). Please extract the FIR details from it.`
         );
       }
     }
@@ -78,29 +99,45 @@ async function uploadFile(file) {
 async function chatMessage(text) {
   const sendButton = document.getElementById("sendButton");
   sendButton.disabled = true;
+  const reply = document.createElement("div");
+  reply.className = "agent-message";
+  let replyText = "";
   try {
-    const resp = await fetch(`http://${window.location.host}/chat`, {
+    const resp = await fetch(`http://${window.location.host}/chat_stream/${sessionId}`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ message: text }),
     });
-    const result = await resp.json();
-    const reply = document.createElement("div");
-    reply.className = "agent-message";
-
-    const formattedText = formatMarkdown(result.text || "[No response]");
-    reply.innerHTML = formattedText;
-
+    if (!resp.ok || !resp.body) throw new Error(`HTTP ${resp.status}`);
     messagesDiv.appendChild(reply);
-    messagesDiv.scrollTop = messagesDiv.scrollHeight;
 
-    if (!firFormModal.classList.contains("hidden")) {
-        if (result.extracted_info) {
-            updateFormFields(result.extracted_info);
+    const reader = resp.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const events = buffer.split("\n\n");
+      buffer = events.pop();
+      for (const raw of events) {
+        if (!raw.startsWith("data: ")) continue;
+        const event = JSON.parse(raw.slice(6));
+        if (event.type === "text") {
+          replyText += event.text;
+          reply.innerHTML = formatMarkdown(replyText);
+          messagesDiv.scrollTop = messagesDiv.scrollHeight;
+        } else if (event.type === "field") {
+          extractedInfo[event.key] = event.value;
+          updateFormFields({ [event.key]: event.value });
+        } else if (event.type === "done") {
+          Object.assign(extractedInfo, event.extracted_info || {});
+          if (!replyText) reply.innerHTML = formatMarkdown(event.text || "[No response]");
+        } else if (event.type === "error") {
+          throw new Error(event.error);
         }
+      }
     }
-
-    console.log("extracted_info",result);
   } catch (e) {
     const err = document.createElement("p");
     err.className = "agent-message";
@@ -181,27 +218,145 @@ stopAudioButton.addEventListener("click", () => {
 async function uploadAudioForTranscription(audioBlob) {
   const formData = new FormData();
   formData.append("audio_file", audioBlob, "recorded_audio.webm");
+  const p = document.createElement("p");
+  p.className = "system-message";
   try {
     const resp = await fetch(`http://${window.location.host}/transcribe_audio`, { method: "POST", body: formData });
     const result = await resp.json();
-    const p = document.createElement("p");
-    p.className = "system-message";
-    if (result.success) {
-      p.textContent = "✅ Audio transcribed successfully";
-      messagesDiv.appendChild(p);
-      if (result.transcription && result.transcription.trim()) {
-        await chatMessage(`[Audio Recording] ${result.transcription}`);
-      }
-    } else {
+    if (!result.success) {
       p.textContent = `Transcription failed: ${result.message || "Unknown error"}`;
       messagesDiv.appendChild(p);
+      return;
     }
+    p.textContent = "Audio uploaded, transcribing...";
+    messagesDiv.appendChild(p);
     messagesDiv.scrollTop = messagesDiv.scrollHeight;
+
+    const events = new EventSource(`/transcribe_audio/${result.job_id}/events`);
+    events.onmessage = async (e) => {
+      const job = JSON.parse(e.data);
+      if (job.status === "done") {
+        events.close();
+        p.textContent = "✅ Audio transcribed successfully";
+        if (job.transcription && job.transcription.trim()) {
+          await chatMessage(`[Audio Recording] ${job.transcription}`);
+        }
+      } else if (job.status === "failed") {
+        events.close();
+        p.textContent = `Transcription failed: ${job.error || "Unknown error"}`;
+      } else {
+        p.textContent = `Transcribing audio (${job.status})...`;
+      }
+      messagesDiv.scrollTop = messagesDiv.scrollHeight;
+    };
+    events.onerror = () => {
+      events.close();
+      p.textContent = "Lost connection while transcribing audio.";
+    };
   } catch (e) {
     console.error("Failed to upload audio:", e);
   }
 }
 
+// Live interview: raw PCM frames go to the server over a binary WebSocket,
+// partial transcripts and extracted fields stream back.
+const LIVE_FRAME_BYTES = 3200; // 100 ms of 16 kHz 16-bit mono audio
+const liveInterviewButton = document.getElementById("liveInterviewButton");
+let liveSocket = null;
+let liveRecorder = null;
+let livePending = [];
+let livePendingBytes = 0;
+let liveTranscript = null;
+
+liveInterviewButton.addEventListener("click", async () => {
+  if (liveSocket) {
+    stopLiveInterview();
+  } else {
+    await startLiveInterview();
+  }
+});
+
+async function startLiveInterview() {
+  liveSocket = new WebSocket(`ws://${window.location.host}/ws/live/${sessionId}`);
+  liveSocket.binaryType = "arraybuffer";
+  liveSocket.onmessage = (e) => handleLiveMessage(JSON.parse(e.data));
+  liveSocket.onclose = () => {
+    liveSocket = null;
+    liveInterviewButton.classList.remove("live");
+  };
+  await new Promise((resolve, reject) => {
+    liveSocket.onopen = resolve;
+    liveSocket.onerror = reject;
+  });
+  try {
+    const [node, context, stream] = await startAudioRecorderWorklet(sendLiveAudio);
+    liveRecorder = { node, context, stream };
+  } catch (err) {
+    console.error("Failed to start live interview:", err);
+    liveSocket.close();
+    return;
+  }
+  liveInterviewButton.classList.add("live");
+  liveTranscript = document.createElement("p");
+  liveTranscript.className = "system-message";
+  liveTranscript.textContent = "Listening...";
+  messagesDiv.appendChild(liveTranscript);
+}
+
+function sendLiveAudio(pcmBuffer) {
+  if (!liveSocket || liveSocket.readyState !== WebSocket.OPEN) return;
+  livePending.push(new Uint8Array(pcmBuffer));
+  livePendingBytes += pcmBuffer.byteLength;
+  if (livePendingBytes < LIVE_FRAME_BYTES) return;
+  const frame = new Uint8Array(livePendingBytes);
+  let offset = 0;
+  for (const chunk of livePending) {
+    frame.set(chunk, offset);
+    offset += chunk.byteLength;
+  }
+  livePending = [];
+  livePendingBytes = 0;
+  liveSocket.send(frame.buffer);
+}
+
+function stopLiveInterview() {
+  if (liveRecorder) {
+    stopMicrophone(liveRecorder.stream);
+    liveRecorder.context.close();
+    liveRecorder = null;
+  }
+  livePending = [];
+  livePendingBytes = 0;
+  if (liveSocket && liveSocket.readyState === WebSocket.OPEN) {
+    liveSocket.send(JSON.stringify({ type: "stop" }));
+  }
+  liveInterviewButton.classList.remove("live");
+}
+
+function handleLiveMessage(message) {
+  if (message.type === "partial") {
+    if (liveTranscript.textContent === "Listening...") liveTranscript.textContent = "";
+    liveTranscript.textContent += message.text;
+  } else if (message.type === "utterance") {
+    const p = document.createElement("p");
+    p.className = "user-message";
+    p.textContent = message.text;
+    messagesDiv.insertBefore(p, liveTranscript);
+    liveTranscript.textContent = "";
+  } else if (message.type === "field") {
+    extractedInfo[message.key] = message.value;
+    updateFormFields({ [message.key]: message.value });
+  } else if (message.type === "reply") {
+    const reply = document.createElement("div");
+    reply.className = "agent-message";
+    reply.innerHTML = formatMarkdown(message.text);
+    messagesDiv.insertBefore(reply, liveTranscript);
+  } else if (message.type === "error") {
+    console.error("Live interview error:", message.error);
+  }
+  messagesDiv.scrollTop = messagesDiv.scrollHeight;
+}
+
 const firFormButton = document.getElementById("firFormButton");
 const firFormModal = document.getElementById("firFormModal");
 const closeFirForm = document.getElementById("closeFirForm");
@@ -222,15 +377,7 @@ firFormButton.addEventListener("click", async () => {
     }
   }
   firFormModal.classList.remove("hidden");
-  try {
-    const resp = await fetch(`http://${window.location.host}/get_extracted_info`);
-    const result = await resp.json();
-    setTimeout(() => {
-        updateFormFields(result.extracted_info);
-      }, 0);
-  } catch (e) {
-    console.log("No extracted info available yet");
-  }
+  updateFormFields(extractedInfo);
 });
 
 function hideFirForm() {
@@ -341,7 +488,7 @@ function attachFormHandlers() {
       // delete firData['sections[]'];
 
       try {
-        const response = await fetch(`http://${window.location.host}/submit_fir`, {
+        const response = await fetch(`http://${window.location.host}/submit_fir?draft_id=${encodeURIComponent(sessionId)}`, {
           method: "POST",
           headers: { "Content-Type": "application/json" },
           body: JSON.stringify(firData),
@@ -349,8 +496,9 @@ function attachFormHandlers() {
         const result = await response.json();
         if (result.success) {
           alert("FIR submitted successfully!");
-          hideFirForm();
-          firForm.reset();
+          // The submitted draft is closed; reload without it to start the next FIR on a new draft ID.
+          localStorage.removeItem("firDraftId");
+          window.location.replace(window.location.pathname);
         } else {
           alert(`Failed to submit FIR: ${result.message || "Unknown error"}`);
         }